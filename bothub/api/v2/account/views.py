@@ -5,11 +5,11 @@ from drf_yasg2.utils import swagger_auto_schema
 from rest_framework import permissions
 from rest_framework import status, mixins
 from rest_framework.authtoken.models import Token
-from rest_framework.filters import SearchFilter
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
 from bothub.api.v2.metadata import Metadata
+from bothub.api.v2.search import IndexedSearchFilter
 from bothub.authentication.models import User, RepositoryOwner
 from bothub.common.models import Repository, RepositoryVersion
 from .serializers import ChangePasswordSerializer
@@ -174,8 +174,8 @@ class UserProfileViewSet(mixins.RetrieveModelMixin, GenericViewSet):
 class SearchUserViewSet(mixins.ListModelMixin, GenericViewSet):
     serializer_class = UserSerializer
     queryset = RepositoryOwner.objects.all()
-    filter_backends = [DjangoFilterBackend, SearchFilter]
-    search_fields = ["=name", "^name", "$name", "=nickname", "^nickname", "$nickname"]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter]
+    search_fields = ["name", "nickname"]
     pagination_class = None
     limit = 5
 
@@ -1,7 +1,6 @@
 import json
-from decimal import Decimal, ROUND_DOWN
 
-from django.core.paginator import Paginator
+from django.core.paginator import InvalidPage, Paginator
 from django.utils.translation import ugettext_lazy as _
 from rest_framework import serializers
 from rest_framework.exceptions import APIException
@@ -220,80 +219,46 @@ class RepositoryEvaluateResultSerializer(serializers.ModelSerializer):
 
     def get_log(self, obj):
         paginate_by = 10
+        query_params = self.context.get("request").query_params
 
         try:
-            page = int(self.context.get("request").query_params.get("page_intent", 1))
+            page = int(query_params.get("page_intent", 1))
         except ValueError:
             raise APIException(
                 {"non_field_errors": ["page_intent requires the value to be integer"]},
                 code=400,
             )
-        intent = self.context.get("request").query_params.get("intent")
-        min_confidence = self.context.get("request").query_params.get("min")
-        max_confidence = self.context.get("request").query_params.get("max")
-
-        def filter_intent(log, intent, min_confidence, max_confidence):
-            if not intent and not min_confidence and not max_confidence:
-                return log
-
-            confidence = float(
-                Decimal(log.get("intent_prediction").get("confidence")).quantize(
-                    Decimal("0.00"), rounding=ROUND_DOWN
-                )
-            )
-
-            has_intent = False
-
-            if min_confidence and max_confidence:
-                min_confidence = float(min_confidence) / 100
-                max_confidence = float(max_confidence) / 100
-
-                has_intent = (
-                    True if min_confidence <= confidence <= max_confidence else False
-                )
-
-            if intent and log.get("intent") != intent:
-                has_intent = False
-
-            if has_intent:
-                return log
-
-        if len(obj.log) > 0:
-            try:
-                result_log = sorted(
-                    json.loads(obj.log),
-                    key=lambda x: (
-                        x["intent_status"] == "error" or x["entity_status"] == "error"
-                        if {"intent_status", "entity_status"} <= x.keys()
-                        else x["intent_status"] == "error"
-                        if "intent_status" in x
-                        else x["entity_status"]
-                        if "entity_status" in x
-                        else {}
-                    ),
-                    reverse=True,
-                )
-            except TypeError:
-                result_log = json.loads(obj.log)
-
-            pagination = Paginator(tuple(result_log), paginate_by)
-
-            results = filter(
-                None,
-                list(
-                    map(
-                        lambda log: filter_intent(
-                            log, intent, min_confidence, max_confidence
-                        ),
-                        pagination.page(page).object_list,
-                    )
-                ),
+        try:
+            min_confidence = float(query_params.get("min") or 0) / 100
+            max_confidence = query_params.get("max")
+            max_confidence = None if not max_confidence else float(max_confidence)
+        except ValueError:
+            raise APIException(
+                {"non_field_errors": ["min and max require the value to be number"]},
+                code=400,
             )
 
-            return {
-                "total_pages": pagination.num_pages,
-                "current_page": page,
-                "results": results,
-            }
+        logs = obj.evaluate_result_log.all()
+        if query_params.get("intent"):
+            logs = logs.filter(intent=query_params.get("intent"))
+        if min_confidence:
+            logs = logs.filter(confidence__gte=min_confidence)
+        if max_confidence is not None:
+            # the confidences are compared rounded down to two decimals
+            logs = logs.filter(confidence__lt=(int(max_confidence) + 1) / 100)
+
+        pagination = Paginator(
+            logs.values_list("data", flat=True),
+            paginate_by,
+            allow_empty_first_page=False,
+        )
+        try:
+            results = [json.loads(log) for log in pagination.page(page).object_list]
+        except InvalidPage:
+            results = []
 
-        return {"total_pages": 0, "current_page": 1, "results": []}
+        return {
+            "total_pages": pagination.num_pages,
+            "current_page": page,
+            "results": results,
+        }
@@ -5,7 +5,6 @@ from rest_framework.viewsets import GenericViewSet
 from rest_framework import mixins
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.filters import SearchFilter
 from rest_framework.filters import OrderingFilter
 
 from django_filters.rest_framework import DjangoFilterBackend
@@ -14,6 +13,8 @@ from bothub.common.models import RepositoryEvaluate
 from bothub.common.models import RepositoryEvaluateResult
 
 from ..metadata import Metadata
+from ..pagination import CursorLimitOffsetPagination
+from ..search import IndexedSearchFilter
 from .serializers import RepositoryEvaluateSerializer
 from .serializers import RepositoryEvaluateResultVersionsSerializer
 from .serializers import RepositoryEvaluateResultSerializer
@@ -126,12 +127,18 @@ class EvaluateViewSet(
     serializer_class = RepositoryEvaluateSerializer
     permission_classes = [IsAuthenticatedOrReadOnly, RepositoryEvaluatePermission]
     metadata_class = Metadata
+    pagination_class = CursorLimitOffsetPagination
 
     def list(self, request, *args, **kwargs):
         self.filter_class = EvaluatesFilter
-        self.filter_backends = [OrderingFilter, SearchFilter, DjangoFilterBackend]
-        self.search_fields = ["$text", "^text", "=text"]
+        self.filter_backends = [
+            OrderingFilter,
+            IndexedSearchFilter,
+            DjangoFilterBackend,
+        ]
+        self.search_fields = ["text"]
         self.ordering_fields = ["created_at"]
+        self.ordering = ["-created_at", "-id"]
         return super().list(request, *args, **kwargs)
 
 
@@ -1,6 +1,6 @@
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db.models import Count
-from django.db.models import Q, F
+from django.db.models import Q
 from django.utils.translation import ugettext_lazy as _
 from django_filters import rest_framework as filters
 from rest_framework.exceptions import NotFound
@@ -8,6 +8,7 @@ from rest_framework.exceptions import PermissionDenied
 
 from bothub.common.models import Repository
 from bothub.common.models import RepositoryExample
+from bothub.common.models import RepositoryTranslatedExample
 
 
 class ExamplesFilter(filters.FilterSet):
@@ -187,63 +188,15 @@ class ExamplesFilter(filters.FilterSet):
         return queryset.filter(intent__pk=value)
 
     def filter_has_valid_entities(self, queryset, name, value):
-        result_queryset = queryset.annotate(
-            original_entities_count=Count(
-                "entities",
-                filter=Q(
-                    translations__original_example__entities__repository_example=F("pk")
-                )
-                & Q(translations__language=value),
-                distinct=True,
-            )
-        ).annotate(
-            entities_count=Count(
-                "translations__entities",
-                filter=Q(
-                    Q(
-                        translations__entities__repository_translated_example__language=value
-                    )
-                    | Q(
-                        translations__entities__repository_translated_example__language=F(
-                            "repository_version_language__repository_version__repository__language"
-                        )
-                    ),
-                    translations__entities__entity__in=F(
-                        "translations__original_example__entities__entity"
-                    ),
-                ),
-                distinct=True,
-            )
+        return queryset.exclude(
+            pk__in=RepositoryTranslatedExample.objects.filter(
+                language=value, has_valid_entities=False
+            ).values("original_example")
         )
-        return result_queryset.filter(original_entities_count=F("entities_count"))
 
     def filter_has_invalid_entities(self, queryset, name, value):
-        result_queryset = queryset.annotate(
-            original_entities_count=Count(
-                "entities",
-                filter=Q(
-                    translations__original_example__entities__repository_example=F("pk")
-                )
-                & Q(translations__language=value),
-                distinct=True,
-            )
-        ).annotate(
-            entities_count=Count(
-                "translations__entities",
-                filter=Q(
-                    Q(
-                        translations__entities__repository_translated_example__language=value
-                    )
-                    | Q(
-                        translations__entities__repository_translated_example__language=F(
-                            "repository_version_language__repository_version__repository__language"
-                        )
-                    ),
-                    translations__entities__entity__in=F(
-                        "translations__original_example__entities__entity"
-                    ),
-                ),
-                distinct=True,
-            )
+        return queryset.filter(
+            pk__in=RepositoryTranslatedExample.objects.filter(
+                language=value, has_valid_entities=False
+            ).values("original_example")
         )
-        return result_queryset.exclude(original_entities_count=F("entities_count"))
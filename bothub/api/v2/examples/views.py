@@ -7,7 +7,7 @@ from drf_yasg2.utils import swagger_auto_schema
 from rest_framework import mixins
 from rest_framework.decorators import action
 from rest_framework.exceptions import PermissionDenied
-from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.filters import OrderingFilter
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
@@ -18,7 +18,9 @@ from ..example.serializers import (
     RepositoriesSearchExamplesSerializer,
     RepositoryExampleSerializer,
 )
+from ..pagination import CursorLimitOffsetPagination
 from ..repository.permissions import RepositoryExamplePermission
+from ..search import IndexedSearchFilter
 from .filters import ExamplesFilter
 
 
@@ -26,10 +28,12 @@ class ExamplesViewSet(mixins.ListModelMixin, GenericViewSet):
     queryset = RepositoryExample.objects
     serializer_class = RepositoryExampleSerializer
     filter_class = ExamplesFilter
-    filter_backends = [OrderingFilter, SearchFilter, DjangoFilterBackend]
-    search_fields = ["$text", "^text", "=text"]
+    filter_backends = [OrderingFilter, IndexedSearchFilter, DjangoFilterBackend]
+    search_fields = ["text"]
     ordering_fields = ["created_at"]
+    ordering = ["-created_at", "-id"]
     permission_classes = [RepositoryExamplePermission]
+    pagination_class = CursorLimitOffsetPagination
 
     @method_decorator(
         name="create",
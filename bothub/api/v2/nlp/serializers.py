@@ -1,8 +1,20 @@
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.translation import ugettext_lazy as _
 from rest_framework import serializers
 
 from bothub.common.models import (
+    RepositoryEntity,
+    RepositoryEvaluateResult,
+    RepositoryEvaluateResultEntity,
+    RepositoryEvaluateResultIntent,
+    RepositoryEvaluateResultScore,
     RepositoryNLPLog,
     RepositoryNLPLogIntent,
+    RepositoryNLPLogPolicy,
+    RepositoryReports,
     RepositoryVersionLanguage,
     RepositoryAuthorization,
 )
@@ -44,17 +56,228 @@ class RepositoryNLPLogSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         log_intent = validated_data.pop("log_intent")
-        validated_data.update({"user": validated_data.get("user").user})
+        nlp_log = validated_data.pop("nlp_log", "")
+        authorization = validated_data.get("user")
+        validated_data.update({"user": authorization.user})
+
+        default = next(
+            (intent for intent in log_intent if intent.get("is_default")), {}
+        )
+        validated_data.update(
+            {"intent": default.get("intent"), "confidence": default.get("confidence")}
+        )
 
         instance = self.Meta.model(**validated_data)
+        instance.set_nlp_log(nlp_log, compact=settings.BOTHUB_NLP_LOG_COMPACT)
+        if settings.BOTHUB_NLP_LOG_COMPACT:
+            instance.set_intent_ranking(log_intent)
+
+        policy = RepositoryNLPLogPolicy.get_policy(authorization)
+        logged = not policy or policy.should_log(
+            instance.from_backend, instance.confidence
+        )
+        # the predictions not stored are counted in the reports too
+        RepositoryReports.count_prediction(
+            instance.repository_version_language, instance.user, logged=logged
+        )
+        if not logged:
+            return instance
+
         instance.save()
 
-        for intent in log_intent:
-            RepositoryNLPLogIntent.objects.create(
-                intent=intent.get("intent"),
-                confidence=intent.get("confidence"),
-                is_default=intent.get("is_default"),
-                repository_nlp_log=instance,
+        if not settings.BOTHUB_NLP_LOG_COMPACT:
+            RepositoryNLPLogIntent.objects.bulk_create(
+                [
+                    RepositoryNLPLogIntent(
+                        intent=intent.get("intent"),
+                        confidence=intent.get("confidence"),
+                        is_default=intent.get("is_default"),
+                        repository_nlp_log=instance,
+                    )
+                    for intent in log_intent
+                ]
             )
 
         return instance
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data["nlp_log"] = instance.get_nlp_log()
+        return data
+
+
+class EvaluateLogField(serializers.ListField):
+    """
+    Log of an evaluation, a list with one dict per sentence. It is also
+    accepted encoded in JSON, as the NLP sends it to evaluate_results
+    """
+
+    child = serializers.DictField()
+    default_error_messages = {
+        "invalid_json": _("Invalid JSON"),
+        "invalid_prediction": _("The intent prediction must be an object"),
+        "invalid_confidence": _("The confidence must be a number"),
+        "invalid_status": _("The status must have at most 32 characters"),
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            try:
+                data = json.loads(data)
+            except ValueError:
+                self.fail("invalid_json")
+        log = super().to_internal_value(data)
+
+        errors = {}
+        for position, entry in enumerate(log):
+            prediction = entry.get("intent_prediction") or {}
+            confidence = (
+                prediction.get("confidence") if isinstance(prediction, dict) else None
+            )
+            status = entry.get("intent_status") or entry.get("status") or ""
+            if not isinstance(prediction, dict):
+                errors[position] = [self.error_messages["invalid_prediction"]]
+            elif confidence is not None and (
+                isinstance(confidence, bool) or not isinstance(confidence, (int, float))
+            ):
+                errors[position] = [self.error_messages["invalid_confidence"]]
+            elif len(str(status)) > 32:
+                errors[position] = [self.error_messages["invalid_status"]]
+        if errors:
+            raise serializers.ValidationError(errors)
+        return log
+
+
+class EvaluateResultsLogSerializer(serializers.Serializer):
+    log = EvaluateLogField(default=list)
+
+
+class EvaluateResultScoreSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RepositoryEvaluateResultScore
+        fields = ["precision", "f1_score", "accuracy", "recall", "support"]
+        ref_name = None
+
+
+class EvaluateReportIntentSerializer(EvaluateResultScoreSerializer):
+    class Meta(EvaluateResultScoreSerializer.Meta):
+        fields = ["intent"] + EvaluateResultScoreSerializer.Meta.fields
+
+    intent = serializers.CharField(allow_blank=True)
+
+
+class EvaluateReportEntitySerializer(EvaluateResultScoreSerializer):
+    class Meta(EvaluateResultScoreSerializer.Meta):
+        fields = ["entity"] + EvaluateResultScoreSerializer.Meta.fields
+
+    entity = serializers.CharField()
+
+
+class EvaluateReportSerializer(serializers.Serializer):
+    """
+    Whole report of an evaluation, the scores of the intents and entities
+    and the log are saved with the result
+    """
+
+    repository_version = serializers.PrimaryKeyRelatedField(
+        queryset=RepositoryVersionLanguage.objects.select_related(
+            "repository_version__repository"
+        )
+    )
+    matrix_chart = serializers.URLField(allow_blank=True, default="")
+    confidence_chart = serializers.URLField(allow_blank=True, default="")
+    cross_validation = serializers.BooleanField(default=False)
+    intent_results = EvaluateResultScoreSerializer()
+    entity_results = EvaluateResultScoreSerializer()
+    intents = EvaluateReportIntentSerializer(many=True, default=list)
+    entities = EvaluateReportEntitySerializer(many=True, default=list)
+    log = EvaluateLogField(default=list)
+
+    def validate_repository_version(self, value):
+        authorization = self.context.get("authorization")
+        if value.repository_version.repository_id != authorization.repository_id:
+            raise serializers.ValidationError(
+                _("The version is not of the repository of the authorization")
+            )
+        return value
+
+    def validate(self, attrs):
+        values = {entity.get("entity") for entity in attrs.get("entities")}
+        attrs["entity_ids"] = dict(
+            RepositoryEntity.objects.filter(
+                repository_version=attrs.get("repository_version").repository_version,
+                value__in=values,
+            ).values_list("value", "pk")
+        )
+        missing = values - attrs.get("entity_ids").keys()
+        if missing:
+            raise serializers.ValidationError(
+                {
+                    "entities": [
+                        _("Entities not found in the version: {}").format(
+                            ", ".join(sorted(missing))
+                        )
+                    ]
+                }
+            )
+        return attrs
+
+    def create(self, validated_data):
+        version_language = validated_data.get("repository_version")
+        repository = version_language.repository_version.repository
+        intents = validated_data.get("intents")
+        entities = validated_data.get("entities")
+
+        with transaction.atomic():
+            scores = RepositoryEvaluateResultScore.objects.bulk_create(
+                [
+                    RepositoryEvaluateResultScore(**score)
+                    for score in [
+                        validated_data.get("intent_results"),
+                        validated_data.get("entity_results"),
+                    ]
+                ]
+                + [
+                    RepositoryEvaluateResultScore(
+                        **{
+                            field: value
+                            for field, value in score.items()
+                            if field not in ["intent", "entity"]
+                        }
+                    )
+                    for score in intents + entities
+                ]
+            )
+            evaluate_result = RepositoryEvaluateResult.objects.create(
+                repository_version_language=version_language,
+                intent_results=scores[0],
+                entity_results=scores[1],
+                matrix_chart=validated_data.get("matrix_chart"),
+                confidence_chart=validated_data.get("confidence_chart"),
+                cross_validation=validated_data.get("cross_validation"),
+                version=repository.next_evaluate_result_version(),
+            )
+            RepositoryEvaluateResultIntent.objects.bulk_create(
+                [
+                    RepositoryEvaluateResultIntent(
+                        evaluate_result=evaluate_result,
+                        intent=intent.get("intent"),
+                        score=score,
+                    )
+                    for intent, score in zip(intents, scores[2:])
+                ]
+            )
+            RepositoryEvaluateResultEntity.objects.bulk_create(
+                [
+                    RepositoryEvaluateResultEntity(
+                        evaluate_result=evaluate_result,
+                        entity_id=validated_data.get("entity_ids").get(
+                            entity.get("entity")
+                        ),
+                        score=score,
+                    )
+                    for entity, score in zip(entities, scores[2 + len(intents) :])
+                ]
+            )
+            evaluate_result.set_log(validated_data.get("log"))
+        return evaluate_result
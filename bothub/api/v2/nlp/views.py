@@ -1,22 +1,35 @@
 import base64
+import hashlib
 
+from botocore.exceptions import ClientError
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.validators import URLValidator
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags, quote_etag
 from django.utils.translation import gettext_lazy as _
-from rest_framework import exceptions
-from rest_framework import mixins, pagination
+from rest_framework import exceptions, status
+from rest_framework import mixins, pagination, parsers
 from rest_framework.decorators import action
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
-from bothub.api.v2.nlp.serializers import NLPSerializer, RepositoryNLPLogSerializer
+from bothub.api.v2.nlp.serializers import (
+    EvaluateReportSerializer,
+    EvaluateResultsLogSerializer,
+    NLPSerializer,
+    RepositoryNLPLogSerializer,
+)
+from bothub.api.v2.pagination import CreatedAtCursorPagination, CursorPaginationMixin
 from bothub.authentication.authorization import NLPAuthentication
 from bothub.authentication.models import User
 from bothub.common import languages
+from bothub.common.exporters import iter_evaluation_rows, iter_ndjson
 from bothub.common.models import (
     RepositoryAuthorization,
     RepositoryVersionLanguage,
@@ -30,7 +43,12 @@ from bothub.common.models import RepositoryEvaluateResult
 from bothub.common.models import RepositoryEvaluateResultEntity
 from bothub.common.models import RepositoryEvaluateResultIntent
 from bothub.common.models import RepositoryEvaluateResultScore
-from bothub.utils import send_bot_data_file_aws
+from bothub.utils import (
+    aws_credentials_configured,
+    encode_bot_data_stream,
+    send_bot_data_file_aws,
+    send_bot_data_stream_aws,
+)
 
 
 def check_auth(request):
@@ -43,10 +61,49 @@ def check_auth(request):
         raise exceptions.AuthenticationFailed(msg)
 
 
-class NLPPagination(pagination.PageNumberPagination):
+def interpreter_etag(
+    version_language_id, total_training_end, rasa_version, no_bot_data=False
+):
+    """
+    Entity tag of a trained interpreter, it only changes when a new training
+    is saved for the version language, so the model blob is never read to build it.
+    The response without the bot data has its own tag
+    """
+    key = "{}:{}:{}".format(version_language_id, total_training_end, rasa_version)
+    if no_bot_data:
+        key += ":no_bot_data"
+    return quote_etag(hashlib.sha1(key.encode()).hexdigest())
+
+
+def evaluations_etag(version_language_id, evaluations_version):
+    """
+    Entity tag of the evaluation dataset, it changes with the version counter
+    of the evaluate sentences
+    """
+    key = "evaluations:{}:{}".format(version_language_id, evaluations_version)
+    return quote_etag(hashlib.sha1(key.encode()).hexdigest())
+
+
+def iter_cached(key, chunks, timeout):
+    """
+    Yields the chunks and caches them joined once they were all sent
+    """
+    sent = []
+    for chunk in chunks:
+        sent.append(chunk)
+        yield chunk
+    cache.set(key, "".join(sent), timeout)
+
+
+class NLPCursorPagination(CreatedAtCursorPagination):
     page_size = 200
 
 
+class NLPPagination(CursorPaginationMixin, pagination.PageNumberPagination):
+    page_size = 200
+    cursor_pagination_class = NLPCursorPagination
+
+
 class RepositoryAuthorizationTrainViewSet(
     mixins.RetrieveModelMixin, mixins.CreateModelMixin, GenericViewSet
 ):
@@ -335,31 +392,54 @@ class RepositoryAuthorizationEvaluateViewSet(mixins.RetrieveModelMixin, GenericV
             version_default=repository_update.repository_version.is_default,
         )
 
-        data = []
+        return Response(list(iter_evaluation_rows(evaluations)))
 
-        for evaluate in evaluations:
-            entities = []
-
-            for evaluate_entity in evaluate.get_entities(repository_update.language):
-                entities.append(
-                    {
-                        "start": evaluate_entity.start,
-                        "end": evaluate_entity.end,
-                        "value": evaluate.text[
-                            evaluate_entity.start : evaluate_entity.end
-                        ],
-                        "entity": evaluate_entity.entity.value,
-                    }
-                )
+    @action(
+        detail=True, methods=["GET"], url_name="evaluations_dataset", lookup_field=[]
+    )
+    def evaluations_dataset(self, request, **kwargs):
+        """
+        Evaluate sentences of the version language streamed as NDJSON, the
+        response has an ETag and is cached until the sentences change
+        """
+        repository_authorization = check_auth(request)
 
-            data.append(
-                {
-                    "text": evaluate.get_text(repository_update.language),
-                    "intent": evaluate.intent,
-                    "entities": entities,
-                }
+        if not repository_authorization.can_contribute:
+            raise PermissionDenied()
+
+        repository_update = get_object_or_404(
+            RepositoryVersionLanguage,
+            pk=request.query_params.get("repository_version"),
+            repository_version__repository=repository_authorization.repository,
+        )
+
+        etag = evaluations_etag(
+            repository_update.pk, repository_update.evaluations_version
+        )
+        if_none_match = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+        if etag in if_none_match or "*" in if_none_match:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        key = "bothub:evaluations:{}:{}".format(
+            repository_update.pk, repository_update.evaluations_version
+        )
+        content = cache.get(key) if settings.BOTHUB_EVALUATIONS_CACHE else None
+        if content is None:
+            content = iter_ndjson(
+                iter_evaluation_rows(
+                    RepositoryEvaluate.objects.filter(
+                        repository_version_language=repository_update
+                    )
+                )
             )
-        return Response(data)
+            if settings.BOTHUB_EVALUATIONS_CACHE:
+                content = iter_cached(key, content, settings.REDIS_TIMEOUT)
+        else:
+            content = [content]
+
+        response = StreamingHttpResponse(content, content_type="application/x-ndjson")
+        response["ETag"] = etag
+        return response
 
     @action(detail=True, methods=["POST"], url_name="evaluate_results", lookup_field=[])
     def evaluate_results(self, request, **kwargs):
@@ -372,27 +452,57 @@ class RepositoryAuthorizationEvaluateViewSet(mixins.RetrieveModelMixin, GenericV
             RepositoryVersionLanguage, pk=request.data.get("repository_version")
         )
 
-        intents_score = RepositoryEvaluateResultScore.objects.create(
-            precision=request.data.get("intentprecision"),
-            f1_score=request.data.get("intentf1_score"),
-            accuracy=request.data.get("intentaccuracy"),
+        log_serializer = EvaluateResultsLogSerializer(
+            data={"log": request.data.get("log") or []}
         )
+        log_serializer.is_valid(raise_exception=True)
 
-        entities_score = RepositoryEvaluateResultScore.objects.create(
-            precision=request.data.get("entityprecision"),
-            f1_score=request.data.get("entityf1_score"),
-            accuracy=request.data.get("entityaccuracy"),
+        with transaction.atomic():
+            intents_score = RepositoryEvaluateResultScore.objects.create(
+                precision=request.data.get("intentprecision"),
+                f1_score=request.data.get("intentf1_score"),
+                accuracy=request.data.get("intentaccuracy"),
+            )
+
+            entities_score = RepositoryEvaluateResultScore.objects.create(
+                precision=request.data.get("entityprecision"),
+                f1_score=request.data.get("entityf1_score"),
+                accuracy=request.data.get("entityaccuracy"),
+            )
+
+            evaluate_result = RepositoryEvaluateResult.objects.create(
+                repository_version_language=repository_update,
+                entity_results=entities_score,
+                intent_results=intents_score,
+                matrix_chart=request.data.get("matrix_chart"),
+                confidence_chart=request.data.get("confidence_chart"),
+                cross_validation=request.data.get("cross_validation"),
+            )
+            evaluate_result.set_log(log_serializer.validated_data.get("log"))
+
+        return Response(
+            {
+                "evaluate_id": evaluate_result.id,
+                "evaluate_version": evaluate_result.version,
+            }
         )
 
-        evaluate_result = RepositoryEvaluateResult.objects.create(
-            repository_version_language=repository_update,
-            entity_results=entities_score,
-            intent_results=intents_score,
-            matrix_chart=request.data.get("matrix_chart"),
-            confidence_chart=request.data.get("confidence_chart"),
-            log=request.data.get("log"),
-            cross_validation=request.data.get("cross_validation"),
+    @action(detail=True, methods=["POST"], url_name="evaluate_report", lookup_field=[])
+    def evaluate_report(self, request, **kwargs):
+        """
+        Saves the whole report of an evaluation in one request, the summary
+        scores, the scores of each intent and entity and the log
+        """
+        repository_authorization = check_auth(request)
+
+        if not repository_authorization.can_contribute:
+            raise PermissionDenied()
+
+        serializer = EvaluateReportSerializer(
+            data=request.data, context={"authorization": repository_authorization}
         )
+        serializer.is_valid(raise_exception=True)
+        evaluate_result = serializer.save()
 
         return Response(
             {
@@ -498,6 +608,8 @@ class RepositoryUpdateInterpretersViewSet(
     permission_classes = [AllowAny]
     authentication_classes = [NLPAuthentication]
 
+    CHANGED_MAX_INTERPRETERS = 1000
+
     def retrieve(self, request, *args, **kwargs):
         check_auth(request)
 
@@ -507,10 +619,17 @@ class RepositoryUpdateInterpretersViewSet(
         )
         no_bot_data = request.query_params.get("no_bot_data")
 
+        etag = interpreter_etag(
+            update.pk, update.total_training_end, rasa_version, bool(no_bot_data)
+        )
+        if_none_match = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+        if etag in if_none_match or "*" in if_none_match:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
         validator = URLValidator()
         aws = False
 
-        if no_bot_data:  # pragma: no cover
+        if no_bot_data:
             return Response(
                 {
                     "version_id": update.id,
@@ -518,18 +637,21 @@ class RepositoryUpdateInterpretersViewSet(
                     "total_training_end": update.total_training_end,
                     "language": update.language,
                     "from_aws": aws,
-                }
+                },
+                headers={"ETag": etag},
             )
 
         try:
-            validator(str(update.get_trainer(rasa_version).bot_data))
-            bot_data = update.get_trainer(rasa_version).bot_data
-            aws = True
-        except ValidationError:
             bot_data = update.get_trainer(rasa_version).bot_data
         except Exception:
             bot_data = b""
 
+        try:
+            validator(str(bot_data))
+            aws = True
+        except ValidationError:
+            pass
+
         return Response(
             {
                 "version_id": update.id,
@@ -538,9 +660,135 @@ class RepositoryUpdateInterpretersViewSet(
                 "language": update.language,
                 "bot_data": str(bot_data),
                 "from_aws": aws,
+            },
+            headers={"ETag": etag},
+        )
+
+    @action(detail=True, methods=["POST"], url_name="changed", lookup_field=[])
+    def changed(self, request, **kwargs):
+        """
+        Freshness check of many loaded interpreters in a single request, the
+        NLP service sends the version_id and total_training_end it has in memory
+        and only the interpreters returned with changed=True must be reloaded
+        """
+        check_auth(request)
+
+        rasa_version = request.data.get(
+            "rasa_version", settings.BOTHUB_NLP_RASA_VERSION
+        )
+        interpreters = request.data.get("interpreters")
+
+        if not isinstance(interpreters, list):
+            raise exceptions.ValidationError(
+                {"interpreters": [_("Expected a list of interpreters.")]}
+            )
+        if len(interpreters) > self.CHANGED_MAX_INTERPRETERS:
+            raise exceptions.ValidationError(
+                {
+                    "interpreters": [
+                        _("Ensure this field has no more than {} items.").format(
+                            self.CHANGED_MAX_INTERPRETERS
+                        )
+                    ]
+                }
+            )
+
+        loaded = {}
+        for interpreter in interpreters:
+            try:
+                total_training_end = interpreter.get("total_training_end")
+                loaded[int(interpreter.get("version_id"))] = (
+                    None if total_training_end is None else int(total_training_end)
+                )
+            except (AttributeError, TypeError, ValueError):
+                raise exceptions.ValidationError(
+                    {"interpreters": [_("Each interpreter needs a valid version_id.")]}
+                )
+
+        current = RepositoryVersionLanguage.objects.filter(
+            pk__in=loaded.keys()
+        ).values_list("pk", "total_training_end")
+
+        data = []
+        for version_id, total_training_end in current:
+            data.append(
+                {
+                    "version_id": version_id,
+                    "total_training_end": total_training_end,
+                    "etag": interpreter_etag(
+                        version_id, total_training_end, rasa_version
+                    ),
+                    "changed": loaded.get(version_id) != total_training_end,
+                }
+            )
+
+        found = {interpreter["version_id"] for interpreter in data}
+
+        return Response(
+            {
+                "interpreters": data,
+                "not_found": [pk for pk in loaded.keys() if pk not in found],
             }
         )
 
+    @action(
+        detail=True,
+        methods=["POST"],
+        url_name="upload",
+        lookup_field=[],
+        parser_classes=[parsers.MultiPartParser],
+    )
+    def upload(self, request, **kwargs):
+        """
+        Receives the trained model as a stream (raw body or a multipart file
+        named bot_data) instead of a base64 field in a JSON body, so the model
+        is never loaded in memory at once, with AWS_SEND it is sent to the
+        bucket with a multipart upload
+        """
+        repository_authorization = check_auth(request)
+
+        if not repository_authorization.can_contribute:
+            raise PermissionDenied()
+
+        id = request.query_params.get("id")
+        rasa_version = request.query_params.get(
+            "rasa_version", settings.BOTHUB_NLP_RASA_VERSION
+        )
+        checksum = request.query_params.get("checksum")
+        repository = get_object_or_404(
+            RepositoryVersionLanguage,
+            pk=id,
+            repository_version__repository=repository_authorization.repository,
+        )
+
+        if settings.AWS_SEND and not aws_credentials_configured():
+            raise exceptions.APIException(
+                _("The AWS credentials to send the bot data are not configured.")
+            )
+
+        if request.content_type.startswith("multipart/form-data"):
+            stream = request.FILES.get("bot_data")
+        else:
+            stream = request.stream
+
+        if stream is None:
+            raise exceptions.ValidationError(
+                {"bot_data": [_("The bot data is empty.")]}
+            )
+
+        if settings.AWS_SEND:
+            try:
+                bot_data, checksum = send_bot_data_stream_aws(id, stream, checksum)
+            except ClientError:
+                raise exceptions.APIException(
+                    _("Could not send the bot data to the bucket.")
+                )
+        else:
+            bot_data, checksum = encode_bot_data_stream(stream, checksum)
+
+        repository.save_training(bot_data, rasa_version)
+        return Response({"checksum": checksum, "from_aws": settings.AWS_SEND})
+
     def create(self, request, *args, **kwargs):
         repository_authorization = check_auth(request)
 
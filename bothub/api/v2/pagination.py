@@ -0,0 +1,120 @@
+import json
+
+from django.db import connections
+from rest_framework import pagination
+from rest_framework.compat import coreapi, coreschema
+from rest_framework.response import Response
+
+APPROXIMATE_COUNT_QUERY_PARAM = "approximate_count"
+
+
+def estimate_count(queryset):
+    """
+    Total of rows of the queryset estimated by the query planner statistics,
+    the rows are not counted. Other databases than PostgreSQL count them
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return queryset.count()
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0].get("Plan").get("Plan Rows")
+
+
+def approximate_count_requested(request):
+    return request.query_params.get(APPROXIMATE_COUNT_QUERY_PARAM) in ("true", "1")
+
+
+class CreatedAtCursorPagination(pagination.CursorPagination):
+    """
+    Cursor pagination on (created_at, id), deep pages cost the same as the
+    first one
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size_query_param = "limit"
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if approximate_count_requested(request):
+            self.count = estimate_count(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = [
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]
+        if self.count is not None:
+            response.insert(0, ("count", self.count))
+        return Response(dict(response))
+
+
+class CursorPaginationMixin:
+    """
+    Switches to cursor_pagination_class when the request has its cursor
+    parameter, the first page is requested with an empty cursor
+    """
+
+    cursor_pagination_class = CreatedAtCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_pagination = None
+        if self.cursor_pagination_class.cursor_query_param in request.query_params:
+            self.cursor_pagination = self.cursor_pagination_class()
+            return self.cursor_pagination.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_pagination:
+            return self.cursor_pagination.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_fields(self, view):
+        fields = super().get_schema_fields(view)
+        return fields + [
+            coreapi.Field(
+                name=self.cursor_pagination_class.cursor_query_param,
+                required=False,
+                location="query",
+                schema=coreschema.String(
+                    title="Cursor",
+                    description="The pagination cursor value, send it empty for "
+                    "the first page to paginate by cursor",
+                ),
+            ),
+            coreapi.Field(
+                name=APPROXIMATE_COUNT_QUERY_PARAM,
+                required=False,
+                location="query",
+                schema=coreschema.Boolean(
+                    title="Approximate count",
+                    description="Estimate the count of results instead of "
+                    "counting them",
+                ),
+            ),
+        ]
+
+
+class CursorLimitOffsetPagination(
+    CursorPaginationMixin, pagination.LimitOffsetPagination
+):
+    """
+    Limit offset pagination for lists with many rows, they can also be
+    paginated by cursor
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.approximate_count = approximate_count_requested(request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count(self, queryset):
+        if self.approximate_count:
+            return estimate_count(queryset)
+        return super().get_count(queryset)
@@ -1,5 +1,4 @@
 from django.core.exceptions import ValidationError as DjangoValidationError
-from django.db.models import Q
 from django.utils.translation import ugettext_lazy as _
 from django_filters import rest_framework as filters
 from rest_framework.exceptions import NotFound
@@ -8,6 +7,7 @@ from rest_framework.exceptions import PermissionDenied
 from bothub.common.models import (
     Repository,
     RepositoryNLPLog,
+    RepositoryNLPLogPolicy,
     RepositoryEntity,
     RepositoryQueueTask,
     RepositoryIntent,
@@ -136,17 +136,40 @@ class RepositoryNLPLogFilter(filters.FilterSet):
         return queryset.filter(repository_version_language__repository_version=value)
 
     def filter_intent(self, queryset, name, value):
-        return queryset.filter(
-            repository_nlp_log__intent=value, repository_nlp_log__is_default=True
-        )
+        return queryset.filter(intent=value)
 
     def filter_confidence(self, queryset, name, value):
-        query = queryset.filter(
-            Q(repository_nlp_log__confidence__gte=int(value.start) / 100),
-            Q(repository_nlp_log__confidence__lte=int(value.stop) / 100),
-        )
-        print(query.query)
-        return query
+        if value.start is not None:
+            queryset = queryset.filter(confidence__gte=int(value.start) / 100)
+        if value.stop is not None:
+            queryset = queryset.filter(confidence__lte=int(value.stop) / 100)
+        return queryset
+
+
+class RepositoryNLPLogPolicyFilter(filters.FilterSet):
+    class Meta:
+        model = RepositoryNLPLogPolicy
+        fields = ["repository_uuid"]
+
+    repository_uuid = filters.CharFilter(
+        field_name="repository_uuid",
+        method="filter_repository_uuid",
+        required=True,
+        help_text=_("Repository's UUID"),
+    )
+
+    def filter_repository_uuid(self, queryset, name, value):
+        request = self.request
+        try:
+            repository = Repository.objects.get(uuid=value)
+            authorization = repository.get_user_authorization(request.user)
+            if not authorization.is_admin:
+                raise PermissionDenied()
+            return queryset.filter(repository=repository)
+        except Repository.DoesNotExist:
+            raise NotFound(_("Repository {} does not exist").format(value))
+        except DjangoValidationError:
+            raise NotFound(_("Invalid repository UUID"))
 
 
 class RepositoryEntitiesFilter(filters.FilterSet):
@@ -67,6 +67,16 @@ class RepositoryExamplePermission(permissions.BasePermission):
         return authorization.can_contribute
 
 
+class RepositoryNLPLogPermission(permissions.BasePermission):
+    def has_object_permission(self, request, view, obj):
+        authorization = obj.repository_version_language.repository_version.repository.get_user_authorization(
+            request.user
+        )
+        if request.method in READ_METHODS:
+            return authorization.can_contribute
+        return authorization.can_write
+
+
 class RepositoryEntityHasPermission(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         authorization = obj.repository_version.repository.get_user_authorization(
@@ -1,10 +1,13 @@
 import json
+import uuid
 
 from django.conf import settings
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from rest_framework import serializers
 from rest_framework.exceptions import PermissionDenied
+from rest_framework.settings import api_settings
 
 from bothub import utils
 from bothub.api.v2.example.serializers import RepositoryExampleEntitySerializer
@@ -17,6 +20,7 @@ from bothub.api.v2.fields import (
 from bothub.authentication.models import RepositoryOwner
 from bothub.celery import app as celery_app
 from bothub.common import languages
+from bothub.common.importers import get_or_create_values
 from bothub.common.languages import LANGUAGE_CHOICES
 from bothub.common.models import (
     Organization,
@@ -29,9 +33,12 @@ from bothub.common.models import (
     RepositoryEvaluate,
     RepositoryExample,
     RepositoryExampleEntity,
+    RepositoryImportJob,
+    RepositoryDump,
     RepositoryIntent,
     RepositoryMigrate,
     RepositoryNLPLog,
+    RepositoryNLPLogPolicy,
     RepositoryNLPTrain,
     RepositoryQueueTask,
     RepositoryScore,
@@ -39,6 +46,7 @@ from bothub.common.models import (
     RepositoryTranslatedExampleEntity,
     RepositoryTranslator,
     RepositoryVersion,
+    RepositoryVersionLanguage,
     RepositoryVote,
     RequestRepositoryAuthorization,
 )
@@ -1218,14 +1226,148 @@ class RepositoryTranslatedExampleSerializer(serializers.ModelSerializer):
         help_text=_("Example's ID"),
     )
     from_language = serializers.SerializerMethodField()
-    has_valid_entities = serializers.SerializerMethodField()
+    has_valid_entities = serializers.BooleanField(read_only=True)
     entities = RepositoryTranslatedExampleEntitySeralizer(many=True, read_only=True)
 
     def get_from_language(self, obj):
         return obj.original_example.repository_version_language.language
 
-    def get_has_valid_entities(self, obj):
-        return obj.has_valid_entities
+
+class RepositoryExampleListSerializer(serializers.ListSerializer):
+    """
+    Bulk creation of examples, the intents and entities of the whole batch are
+    resolved at once and the rows are inserted with bulk_create.
+    With partial_success in the context the valid items are created and the
+    invalid ones are reported in item_errors, otherwise any error fails the
+    whole batch.
+    """
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            raise serializers.ValidationError(
+                {
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        self.error_messages["not_a_list"].format(
+                            input_type=type(data).__name__
+                        )
+                    ]
+                },
+                code="not_a_list",
+            )
+        if not self.allow_empty and len(data) == 0:
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [self.error_messages["empty"]]},
+                code="empty",
+            )
+
+        ret = []
+        self.indexes = []
+        self.item_errors = []
+        for index, item in enumerate(data):
+            try:
+                ret.append(self.child.run_validation(item))
+                self.indexes.append(index)
+                self.item_errors.append({})
+            except serializers.ValidationError as exc:
+                self.item_errors.append(exc.detail)
+
+        if any(self.item_errors) and not (self.context.get("partial_success") and ret):
+            raise serializers.ValidationError(self.item_errors)
+        return ret
+
+    def create(self, validated_data):
+        version_languages = {}
+        items = []
+        for index, data in zip(self.indexes, validated_data):
+            repository = data.get("repository")
+            repository_version = data.get("repository_version_language")
+            language = data.get("language") or None
+            key = (repository.pk, repository_version.pk, language)
+            if key not in version_languages:
+                version_languages[key] = repository.get_specific_version_id(
+                    repository_version=repository_version.pk, language=language
+                )
+            items.append((index, version_languages.get(key), data))
+
+        existing = set(
+            RepositoryExample.objects.filter(
+                repository_version_language__in=version_languages.values(),
+                text__in=[data.get("text") for index, vl, data in items],
+            ).values_list("repository_version_language", "text", "intent__text")
+        )
+        valid = []
+        for index, version_language, data in items:
+            key = (version_language.pk, data.get("text"), data.get("intent"))
+            if key in existing:
+                self.item_errors[index] = {
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        _("Intention and Sentence already exists")
+                    ]
+                }
+                continue
+            existing.add(key)
+            valid.append((index, version_language, data))
+
+        if len(valid) != len(items) and not (
+            self.context.get("partial_success") and valid
+        ):
+            raise serializers.ValidationError(self.item_errors)
+
+        intents = get_or_create_values(
+            RepositoryIntent,
+            "text",
+            [
+                (version_language.repository_version_id, data.get("intent"))
+                for index, version_language, data in valid
+            ],
+        )
+        entities = get_or_create_values(
+            RepositoryEntity,
+            "value",
+            [
+                (version_language.repository_version_id, entity.get("entity"))
+                for index, version_language, data in valid
+                for entity in data.get("entities")
+            ],
+        )
+
+        now = timezone.now()
+        examples = RepositoryExample.objects.bulk_create(
+            [
+                RepositoryExample(
+                    repository_version_language=version_language,
+                    text=data.get("text"),
+                    intent_id=intents.get(
+                        (version_language.repository_version_id, data.get("intent"))
+                    ),
+                    is_corrected=data.get("is_corrected", False),
+                    last_update=now,
+                )
+                for index, version_language, data in valid
+            ]
+        )
+        RepositoryExampleEntity.objects.bulk_create(
+            [
+                RepositoryExampleEntity(
+                    repository_example=example,
+                    start=entity.get("start"),
+                    end=entity.get("end"),
+                    entity_id=entities.get(
+                        (version_language.repository_version_id, entity.get("entity"))
+                    ),
+                )
+                for example, (index, version_language, data) in zip(examples, valid)
+                for entity in data.get("entities")
+            ]
+        )
+        RepositoryVersionLanguage.objects.filter(
+            pk__in=[version_language.pk for index, version_language, data in valid]
+        ).update(last_update=now)
+
+        self.ids = [None] * len(self.item_errors)
+        for example, (index, version_language, data) in zip(examples, valid):
+            self.ids[index] = example.pk
+        return examples
 
 
 class RepositoryExampleSerializer(serializers.ModelSerializer):
@@ -1245,6 +1387,7 @@ class RepositoryExampleSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = []
         ref_name = None
+        list_serializer_class = RepositoryExampleListSerializer
 
     id = serializers.PrimaryKeyRelatedField(read_only=True, style={"show": False})
     text = EntityText(style={"entities_field": "entities"}, required=False)
@@ -1368,12 +1511,14 @@ class RepositoryMigrateSerializer(serializers.ModelSerializer):
             "user",
             "repository_version",
             "auth_token",
+            "file",
             "language",
             "classifier",
             "created",
         ]
 
         read_only_fields = ["user", "created_at"]
+        extra_kwargs = {"file": {"write_only": True}}
 
     repository_version = serializers.PrimaryKeyRelatedField(
         queryset=RepositoryVersion.objects,
@@ -1384,6 +1529,20 @@ class RepositoryMigrateSerializer(serializers.ModelSerializer):
     language = serializers.ChoiceField(LANGUAGE_CHOICES, label=_("Language"))
     classifier = serializers.ChoiceField(classifier_choice(), label=_("Classifier"))
 
+    def validate(self, attrs):
+        classifier_type = RepositoryVersion.get_migration_types().get(
+            attrs.get("classifier")
+        )
+        if classifier_type.requires_file and not attrs.get("file"):
+            raise serializers.ValidationError(
+                {"file": _("This classifier is imported from a file.")}
+            )
+        if not classifier_type.requires_file and not attrs.get("auth_token"):
+            raise serializers.ValidationError(
+                {"auth_token": _("This field is required.")}
+            )
+        return attrs
+
     def create(self, validated_data):
         validated_data.update({"user": self.context.get("request").user})
         repository_version = validated_data.get("repository_version")
@@ -1395,7 +1554,13 @@ class RepositoryMigrateSerializer(serializers.ModelSerializer):
 
         celery_app.send_task(
             "migrate_repository",
-            args=[repository_version.pk, auth_token, language, classifier],
+            args=[
+                repository_version.pk,
+                auth_token,
+                language,
+                classifier,
+                instance.file.name or None,
+            ],
         )
         return instance
 
@@ -1421,6 +1586,27 @@ class TrainSerializer(serializers.Serializer):
     repository_version = serializers.IntegerField(required=False)
 
 
+class BulkTrainSerializer(serializers.Serializer):
+    MAX_REPOSITORIES = 100
+
+    repositories = serializers.ListField(
+        child=serializers.UUIDField(), allow_empty=False
+    )
+    only_default = serializers.BooleanField(default=True)
+
+    def validate_repositories(self, value):
+        if len(value) > self.MAX_REPOSITORIES:
+            raise serializers.ValidationError(
+                _("Ensure this field has no more than {} items.").format(
+                    self.MAX_REPOSITORIES
+                )
+            )
+        repositories = list(Repository.objects.filter(uuid__in=value))
+        if len(repositories) != len(set(value)):
+            raise serializers.ValidationError(_("Repository not found."))
+        return repositories
+
+
 class EvaluateSerializer(serializers.Serializer):
     language = serializers.ChoiceField(LANGUAGE_CHOICES, required=True)
     repository_version = serializers.IntegerField(required=False)
@@ -1451,7 +1637,7 @@ class RepositoryUpload(serializers.Serializer):
     pass
 
 
-class RepositoryNLPLogSerializer(serializers.ModelSerializer):
+class ShortRepositoryNLPLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = RepositoryNLPLog
         fields = [
@@ -1462,31 +1648,94 @@ class RepositoryNLPLogSerializer(serializers.ModelSerializer):
             "user_agent",
             "nlp_log",
             "user",
-            "log_intent",
+            "intent",
+            "confidence",
             "created_at",
         ]
         ref_name = None
 
-    log_intent = serializers.SerializerMethodField()
     nlp_log = serializers.SerializerMethodField()
     version_name = serializers.SerializerMethodField()
 
+    def get_nlp_log(self, obj):
+        return json.loads(obj.get_nlp_log())
+
+    def get_version_name(self, obj):
+        return obj.repository_version_language.repository_version.name
+
+
+class RepositoryNLPLogSerializer(ShortRepositoryNLPLogSerializer):
+    class Meta(ShortRepositoryNLPLogSerializer.Meta):
+        fields = ShortRepositoryNLPLogSerializer.Meta.fields + ["log_intent"]
+
+    log_intent = serializers.SerializerMethodField()
+
     def get_log_intent(self, obj):
         intents = {}
-        for intent in obj.intents(obj):
-            intents[intent.pk] = {
-                "intent": intent.intent,
-                "confidence": intent.confidence,
-                "is_default": intent.is_default,
-            }
+        for intent in obj.get_intents():
+            intents[intent.pop("id")] = intent
 
         return intents
 
-    def get_nlp_log(self, obj):
-        return json.loads(obj.nlp_log)
 
-    def get_version_name(self, obj):
-        return obj.repository_version_language.repository_version.name
+class RepositoryNLPLogPolicySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RepositoryNLPLogPolicy
+        fields = [
+            "id",
+            "repository",
+            "user",
+            "sample_rate",
+            "max_confidence",
+            "skip_from_backend",
+            "daily_limit",
+            "created_at",
+        ]
+        read_only_fields = ["created_at"]
+        ref_name = None
+
+    repository = serializers.PrimaryKeyRelatedField(
+        queryset=Repository.objects, style={"show": False}, required=True
+    )
+    user = serializers.SlugRelatedField(
+        source="repository_authorization.user",
+        slug_field="nickname",
+        queryset=RepositoryOwner.objects,
+        required=False,
+        allow_null=True,
+        help_text=_("Nickname of the user of the policy, empty for all users"),
+    )
+
+    def validate(self, attrs):
+        # the repository of a policy can not be changed
+        if self.instance:
+            attrs["repository"] = self.instance.repository
+        repository = attrs.get("repository")
+        authorization = repository.get_user_authorization(
+            self.context.get("request").user
+        )
+        if not authorization.is_admin:
+            raise PermissionDenied()
+
+        if "repository_authorization" in attrs:
+            user = attrs.pop("repository_authorization").get("user")
+            attrs["repository_authorization"] = (
+                repository.get_user_authorization(user) if user else None
+            )
+        elif self.instance:
+            attrs["repository_authorization"] = self.instance.repository_authorization
+
+        policies = RepositoryNLPLogPolicy.objects.filter(
+            repository=repository,
+            repository_authorization=attrs.get("repository_authorization"),
+        )
+        if self.instance:
+            policies = policies.exclude(pk=self.instance.pk)
+        if policies.exists():
+            raise serializers.ValidationError(
+                {"user": [_("There is already a policy for this user.")]}
+            )
+        return attrs
 
 
 class RepositoryEntitySerializer(serializers.ModelSerializer):
@@ -1527,8 +1776,12 @@ class RasaUploadSerializer(serializers.Serializer):
 
 
 class ObjectRasaSerializer(serializers.Serializer):
-    regex_features = serializers.ListField(required=True)
-    entity_synonyms = serializers.ListField(required=True)
+    # sections of the Rasa format without a model in the repository
+    IGNORED_SECTIONS = ["regex_features", "entity_synonyms", "lookup_tables"]
+
+    regex_features = serializers.ListField(child=serializers.DictField(), default=list)
+    entity_synonyms = serializers.ListField(child=serializers.DictField(), default=list)
+    lookup_tables = serializers.ListField(child=serializers.DictField(), default=list)
     common_examples = serializers.ListField(required=True)
 
 
@@ -1572,6 +1825,99 @@ class RepositoryQueueTaskSerializer(serializers.ModelSerializer):
         }
 
 
+class RepositoryImportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RepositoryImportJob
+        fields = [
+            "id",
+            "repository_version",
+            "file",
+            "file_format",
+            "language",
+            "status",
+            "phase",
+            "processed",
+            "added",
+            "rejected",
+            "has_rejected_file",
+            "error",
+            "created_at",
+            "end_training",
+        ]
+        read_only_fields = ["phase", "processed", "added", "rejected", "error"]
+        ref_name = None
+
+    repository_version = serializers.PrimaryKeyRelatedField(
+        queryset=RepositoryVersion.objects,
+        style={"show": False},
+        required=True,
+        validators=[CanContributeInRepositoryVersionValidator()],
+    )
+    file = serializers.FileField(write_only=True)
+    file_format = serializers.ChoiceField(
+        RepositoryImportJob.FORMAT_CHOICES, default=RepositoryImportJob.FORMAT_EXAMPLES
+    )
+    language = serializers.ChoiceField(
+        LANGUAGE_CHOICES, label=_("Language"), required=False
+    )
+    status = serializers.IntegerField(source="task.status", read_only=True)
+    has_rejected_file = serializers.SerializerMethodField()
+    created_at = serializers.DateTimeField(source="task.created_at", read_only=True)
+    end_training = serializers.DateTimeField(source="task.end_training", read_only=True)
+
+    def get_has_rejected_file(self, obj):
+        return bool(obj.rejected_file)
+
+    def validate(self, attrs):
+        if attrs.get(
+            "file_format"
+        ) == RepositoryImportJob.FORMAT_RASA and not attrs.get("language"):
+            raise serializers.ValidationError(
+                {"language": _("This field is required for Rasa files.")}
+            )
+        return attrs
+
+    def create(self, validated_data):
+        repository_version = validated_data.get("repository_version")
+        language = (
+            validated_data.get("language") or repository_version.repository.language
+        )
+        id_queue = str(uuid.uuid4())
+
+        task = repository_version.get_version_language(language).create_task(
+            id_queue=id_queue,
+            from_queue=RepositoryQueueTask.QUEUE_CELERY,
+            type_processing=RepositoryQueueTask.TYPE_PROCESSING_IMPORT,
+        )
+        validated_data.update(
+            {"task": task, "created_by": self.context.get("request").user}
+        )
+        instance = super().create(validated_data)
+
+        celery_app.send_task("import_examples", args=[instance.pk], task_id=id_queue)
+        return instance
+
+
+class RepositoryNLPLogReportsDailySerializer(serializers.Serializer):
+    start_date = serializers.DateField(write_only=True)
+    end_date = serializers.DateField(write_only=True)
+    repository_uuid = serializers.UUIDField(required=False, write_only=True)
+    organization_nickname = serializers.CharField(required=False, write_only=True)
+    date = serializers.DateField(read_only=True)
+    total_count = serializers.IntegerField(read_only=True)
+
+    def validate(self, attrs):
+        if attrs.get("end_date") < attrs.get("start_date"):
+            raise serializers.ValidationError(
+                {"end_date": _("The end date must be after the start date")}
+            )
+        if (attrs.get("end_date") - attrs.get("start_date")).days >= 366:
+            raise serializers.ValidationError(
+                {"end_date": _("The date range can not be longer than a year")}
+            )
+        return attrs
+
+
 class RepositoryNLPLogReportsSerializer(serializers.ModelSerializer):
     class Meta:
         model = Repository
@@ -1626,3 +1972,99 @@ class RepositoryScoreSerializer(serializers.ModelSerializer):
 
 class RepositoryExampleSuggestionSerializer(serializers.Serializer):
     pass
+
+
+class RepositoryDumpSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RepositoryDump
+        fields = [
+            "id",
+            "repository",
+            "repository_version",
+            "dump_type",
+            "file",
+            "status",
+            "has_file",
+            "manifest",
+            "error",
+            "created_at",
+            "end_training",
+        ]
+        read_only_fields = ["error"]
+        ref_name = None
+
+    repository = serializers.PrimaryKeyRelatedField(
+        queryset=Repository.objects, style={"show": False}, required=True
+    )
+    repository_version = serializers.PrimaryKeyRelatedField(
+        queryset=RepositoryVersion.objects,
+        style={"show": False},
+        required=False,
+        allow_null=True,
+    )
+    dump_type = serializers.ChoiceField(
+        RepositoryDump.TYPE_CHOICES, default=RepositoryDump.TYPE_DUMP
+    )
+    file = serializers.FileField(write_only=True, required=False)
+    status = serializers.IntegerField(source="task.status", read_only=True)
+    has_file = serializers.SerializerMethodField()
+    manifest = serializers.SerializerMethodField()
+    created_at = serializers.DateTimeField(source="task.created_at", read_only=True)
+    end_training = serializers.DateTimeField(source="task.end_training", read_only=True)
+
+    def get_has_file(self, obj):
+        return obj.dump_type == RepositoryDump.TYPE_DUMP and bool(obj.file)
+
+    def get_manifest(self, obj):
+        return json.loads(obj.manifest) if obj.manifest else None
+
+    def validate(self, attrs):
+        repository = attrs.get("repository")
+        authorization = repository.get_user_authorization(
+            self.context.get("request").user
+        )
+        if not authorization.can_write:
+            raise PermissionDenied()
+
+        repository_version = attrs.get("repository_version")
+        if repository_version and repository_version.repository != repository:
+            raise serializers.ValidationError(
+                {"repository_version": _("Version not found in the repository.")}
+            )
+        if attrs.get("dump_type") == RepositoryDump.TYPE_RESTORE:
+            if not attrs.get("file"):
+                raise serializers.ValidationError(
+                    {"file": _("This field is required to restore a dump.")}
+                )
+            attrs["repository_version"] = None
+        else:
+            attrs.pop("file", None)
+        return attrs
+
+    def create(self, validated_data):
+        repository = validated_data.get("repository")
+        repository_version = (
+            validated_data.get("repository_version")
+            or repository.current_version().repository_version
+        )
+        restore = validated_data.get("dump_type") == RepositoryDump.TYPE_RESTORE
+        id_queue = str(uuid.uuid4())
+
+        task = repository_version.get_version_language(repository.language).create_task(
+            id_queue=id_queue,
+            from_queue=RepositoryQueueTask.QUEUE_CELERY,
+            type_processing=RepositoryQueueTask.TYPE_PROCESSING_RESTORE
+            if restore
+            else RepositoryQueueTask.TYPE_PROCESSING_DUMP,
+        )
+        validated_data.update(
+            {"task": task, "created_by": self.context.get("request").user}
+        )
+        instance = super().create(validated_data)
+
+        celery_app.send_task(
+            "repository_restore" if restore else "repository_dump",
+            args=[instance.pk],
+            task_id=id_queue,
+        )
+        return instance
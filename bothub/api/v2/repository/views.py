@@ -1,7 +1,10 @@
 import json
+from datetime import timedelta
 
 from django.core.exceptions import ValidationError as DjangoValidationError
-from django.db.models import Q
+from django.http import FileResponse
+from django.db import transaction
+from django.db.models import Q, Sum
 from django.shortcuts import get_object_or_404
 from django.utils.decorators import method_decorator
 from django.utils.translation import ugettext_lazy as _
@@ -12,21 +15,24 @@ from rest_framework import mixins, parsers, permissions, status
 from rest_framework.decorators import action
 from rest_framework.exceptions import (
     APIException,
+    NotFound,
     PermissionDenied,
     UnsupportedMediaType,
     ValidationError,
 )
-from rest_framework.filters import SearchFilter
 from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
 from bothub.api.v2.mixins import MultipleFieldLookupMixin
+from bothub.api.v2.pagination import CursorLimitOffsetPagination
+from bothub.api.v2.search import IndexedSearchFilter
 from bothub.authentication.authorization import TranslatorAuthentication
 from bothub.authentication.models import RepositoryOwner
 from bothub.celery import app as celery_app
 from bothub.common import languages
+from bothub.common.importers import ExamplesImporter, iter_json_array
 from bothub.common.models import (
     OrganizationAuthorization,
     Repository,
@@ -34,10 +40,15 @@ from bothub.common.models import (
     RepositoryCategory,
     RepositoryEntity,
     RepositoryExample,
+    RepositoryImportJob,
+    RepositoryDump,
     RepositoryIntent,
     RepositoryMigrate,
     RepositoryNLPLog,
+    RepositoryNLPLogPolicy,
     RepositoryQueueTask,
+    RepositoryReports,
+    RepositoryTrainSchedule,
     RepositoryTranslator,
     RepositoryVersion,
     RepositoryVote,
@@ -52,6 +63,7 @@ from .filters import (
     RepositoryEntitiesFilter,
     RepositoryIntentFilter,
     RepositoryNLPLogFilter,
+    RepositoryNLPLogPolicyFilter,
     RepositoryNLPLogReportsFilter,
     RepositoryQueueTaskFilter,
 )
@@ -62,13 +74,16 @@ from .permissions import (
     RepositoryInfoPermission,
     RepositoryIntentPermission,
     RepositoryMigratePermission,
+    RepositoryNLPLogPermission,
     RepositoryPermission,
 )
 from .serializers import (
     AnalyzeTextSerializer,
+    BulkTrainSerializer,
     DebugParseSerializer,
     EvaluateSerializer,
     NewRepositorySerializer,
+    ObjectRasaSerializer,
     RasaSerializer,
     RasaUploadSerializer,
     RepositoryAuthorizationRoleSerializer,
@@ -78,8 +93,12 @@ from .serializers import (
     RepositoryContributionsSerializer,
     RepositoryEntitySerializer,
     RepositoryExampleSerializer,
+    RepositoryImportJobSerializer,
+    RepositoryDumpSerializer,
     RepositoryIntentSerializer,
     RepositoryMigrateSerializer,
+    RepositoryNLPLogPolicySerializer,
+    RepositoryNLPLogReportsDailySerializer,
     RepositoryNLPLogReportsSerializer,
     RepositoryNLPLogSerializer,
     RepositoryPermissionSerializer,
@@ -91,6 +110,7 @@ from .serializers import (
     RepositoryVotesSerializer,
     RequestRepositoryAuthorizationSerializer,
     RepositoryExampleSuggestionSerializer,
+    ShortRepositoryNLPLogSerializer,
     ShortRepositorySerializer,
     TrainSerializer,
     WordDistributionSerializer,
@@ -270,6 +290,15 @@ class RepositoryViewSet(
         serializer.is_valid(raise_exception=True)  # pragma: no cover
         if not user_authorization.can_write:
             raise PermissionDenied()
+        version = repository.versions.filter(
+            **(
+                {"pk": serializer.data.get("repository_version")}
+                if serializer.data.get("repository_version")
+                else {"is_default": True}
+            )
+        ).first()
+        if version is not None and version.is_already_trained(compute=True):
+            raise ValidationError(_("This bot version has already been trained."))
         request = repository.request_nlp_train(
             user_authorization, serializer.data
         )  # pragma: no cover
@@ -510,7 +539,8 @@ class RepositoryVotesViewSet(
 
 class RepositoryMigrateViewSet(mixins.CreateModelMixin, GenericViewSet):
     """
-    Repository migrate all senteces wit.
+    Repository migrate all sentences from other classifiers, Wit.ai with the
+    app token and Dialogflow or Rasa Markdown from an uploaded file.
     """
 
     queryset = RepositoryMigrate.objects
@@ -527,8 +557,8 @@ class RepositoriesViewSet(mixins.ListModelMixin, GenericViewSet):
     serializer_class = ShortRepositorySerializer
     queryset = Repository.objects.all().publics().order_by_relevance()
     filter_class = RepositoriesFilter
-    filter_backends = [DjangoFilterBackend, SearchFilter]
-    search_fields = ["$name", "^name", "=name"]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter]
+    search_fields = ["name"]
 
 
 @method_decorator(
@@ -596,8 +626,8 @@ class SearchRepositoriesViewSet(mixins.ListModelMixin, GenericViewSet):
     serializer_class = RepositorySerializer
     lookup_field = "nickname"
     filter_class = RepositoriesFilter
-    filter_backends = [DjangoFilterBackend, SearchFilter]
-    search_fields = ["$name", "^name", "=name"]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter]
+    search_fields = ["name"]
 
     def get_queryset(self, *args, **kwargs):
         try:
@@ -807,39 +837,27 @@ class RepositoryExampleViewSet(
             raise PermissionDenied()
 
         user_authorization = repository.get_user_authorization(request.user)
-        if not user_authorization.can_write:
+        if (
+            not user_authorization.can_write
+            or repository_version.repository_id != repository.pk
+        ):
             raise PermissionDenied()
 
         f = request.FILES.get("file")
-        try:
-            json_data = json.loads(f.read().decode())
-        except json.decoder.JSONDecodeError:
+        if f is None:
             raise UnsupportedMediaType("json")
 
-        count_added = 0
-        not_added = []
+        # nothing is saved when the file can not be read until its end
+        with transaction.atomic():
+            importer = ExamplesImporter(repository_version)
+            try:
+                for data in iter_json_array(f):
+                    importer.add(data)
+            except (json.decoder.JSONDecodeError, UnicodeDecodeError):
+                raise UnsupportedMediaType("json")
+            result = importer.finish()
 
-        for data in json_data:
-            response_data = data
-            response_data["repository"] = request.data.get("repository")
-            response_data["repository_version"] = repository_version.pk
-
-            intent, created = RepositoryIntent.objects.get_or_create(
-                text=response_data.get("intent"), repository_version=repository_version
-            )
-
-            response_data.update({"intent": intent.pk})
-
-            serializer = RepositoryExampleSerializer(
-                data=response_data, context={"request": request}
-            )
-            if serializer.is_valid():
-                serializer.save()
-                count_added += 1
-            else:
-                not_added.append(data)
-
-        return Response({"added": count_added, "not_added": not_added})
+        return Response(result)
 
     @action(
         detail=True,
@@ -894,12 +912,44 @@ class RepositoryNLPLogViewSet(
     mixins.DestroyModelMixin,
     GenericViewSet,
 ):
-    queryset = RepositoryNLPLog.objects
-    serializer_class = RepositoryNLPLogSerializer
-    permission_classes = [permissions.IsAuthenticated, RepositoryPermission]
+    queryset = RepositoryNLPLog.objects.select_related(
+        "repository_version_language__repository_version"
+    )
+    serializer_class = ShortRepositoryNLPLogSerializer
+    permission_classes = [permissions.IsAuthenticated, RepositoryNLPLogPermission]
     filter_class = RepositoryNLPLogFilter
-    filter_backends = [SearchFilter, DjangoFilterBackend]
-    search_fields = ["$text", "^text", "=text"]
+    filter_backends = [IndexedSearchFilter, DjangoFilterBackend]
+    search_fields = ["text"]
+    pagination_class = CursorLimitOffsetPagination
+
+    def retrieve(self, request, *args, **kwargs):
+        self.serializer_class = RepositoryNLPLogSerializer
+        return super().retrieve(request, *args, **kwargs)
+
+
+class RepositoryNLPLogPolicyViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.UpdateModelMixin,
+    mixins.DestroyModelMixin,
+    mixins.ListModelMixin,
+    GenericViewSet,
+):
+    """
+    Manage the policies that decide which predictions of a repository are
+    stored as logs, the reports count every prediction
+    """
+
+    queryset = RepositoryNLPLogPolicy.objects.select_related(
+        "repository", "repository_authorization__user"
+    ).order_by("created_at")
+    serializer_class = RepositoryNLPLogPolicySerializer
+    permission_classes = [IsAuthenticated, RepositoryAdminManagerAuthorization]
+    metadata_class = Metadata
+
+    def list(self, request, *args, **kwargs):
+        self.filter_class = RepositoryNLPLogPolicyFilter
+        return super().list(request, *args, **kwargs)
 
 
 class RepositoryEntitiesViewSet(
@@ -929,35 +979,34 @@ class RasaUploadViewSet(
     parser_classes = (MultiPartParser,)
     metadata_class = Metadata
 
-    def update(self, request, *args, **kwargs):  # pragma: no cover
+    def update(self, request, *args, **kwargs):
+        """
+        Import the common examples of a Rasa NLU json file, the synonyms,
+        regex features and lookup tables are accepted but not stored
+        """
+        repository_version = self.get_object()
+
         serializer = RasaUploadSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        serializer_rasa = RasaSerializer(data=json.load(request.data.get("file")))
-        serializer_rasa.is_valid(raise_exception=True)
+        try:
+            data = json.load(request.data.get("file"))
+        except (json.decoder.JSONDecodeError, UnicodeDecodeError):
+            raise UnsupportedMediaType("json")
 
-        for example in serializer_rasa.data.get("rasa_nlu_data", {}).get(
-            "common_examples", []
-        ):
-            if RepositoryExample.objects.filter(
-                repository_version_language__repository_version=kwargs.get("pk"),
-                text=example["text"],
-                intent__text=example["intent"],
-                repository_version_language__language=serializer.data.get("language"),
-            ).count():
-                continue
-
-            example["repository"] = kwargs.get("repository__uuid")
-            example["repository_version"] = kwargs.get("pk")
-            example["language"] = serializer.data.get("language")
-
-            serializer_example = RepositoryExampleSerializer(
-                data=example, context={"request": request}
-            )
-            if serializer_example.is_valid():
-                serializer_example.save()
+        serializer_rasa = RasaSerializer(data=data)
+        serializer_rasa.is_valid(raise_exception=True)
+        rasa_nlu_data = serializer_rasa.validated_data.get("rasa_nlu_data")
 
-        return Response(202)
+        importer = ExamplesImporter(
+            repository_version, language=serializer.validated_data.get("language")
+        )
+        result = importer.add_many(rasa_nlu_data.get("common_examples"))
+        result["ignored"] = {
+            section: len(rasa_nlu_data.get(section))
+            for section in ObjectRasaSerializer.IGNORED_SECTIONS
+        }
+        return Response(result)
 
 
 class RepositoryTaskQueueViewSet(mixins.ListModelMixin, GenericViewSet):
@@ -965,14 +1014,137 @@ class RepositoryTaskQueueViewSet(mixins.ListModelMixin, GenericViewSet):
     serializer_class = RepositoryQueueTaskSerializer
     filter_class = RepositoryQueueTaskFilter
     permission_classes = []
+    pagination_class = CursorLimitOffsetPagination
 
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
 
+class RepositoryImportJobViewSet(
+    mixins.CreateModelMixin, mixins.RetrieveModelMixin, GenericViewSet
+):
+    """
+    Import a file of examples in background, the job reports the progress and
+    the examples that could not be added
+    """
+
+    queryset = RepositoryImportJob.objects.select_related(
+        "repository_version__repository", "task"
+    )
+    serializer_class = RepositoryImportJobSerializer
+    permission_classes = [IsAuthenticated]
+    parser_classes = (MultiPartParser,)
+    metadata_class = Metadata
+
+    def get_object(self):
+        job = super().get_object()
+        authorization = job.repository_version.repository.get_user_authorization(
+            self.request.user
+        )
+        if not authorization.can_contribute:
+            raise PermissionDenied()
+        return job
+
+    @action(detail=True, methods=["GET"], url_name="rejected")
+    def rejected(self, request, **kwargs):
+        """
+        Download the examples that were not added as a JSON array
+        """
+        job = self.get_object()
+        if not job.rejected_file:
+            raise NotFound()
+        return FileResponse(
+            job.rejected_file.open("rb"),
+            as_attachment=True,
+            filename="rejected-{}.json".format(job.pk),
+            content_type="application/json",
+        )
+
+
+class RepositoryDumpViewSet(
+    mixins.CreateModelMixin, mixins.RetrieveModelMixin, GenericViewSet
+):
+    """
+    Dump the versions of a repository to a zip archive of NDJSON files, or
+    restore an archive as new versions of a repository, in background
+    """
+
+    queryset = RepositoryDump.objects.select_related("repository", "task")
+    serializer_class = RepositoryDumpSerializer
+    permission_classes = [IsAuthenticated]
+    parser_classes = (parsers.JSONParser, MultiPartParser)
+    metadata_class = Metadata
+
+    def get_object(self):
+        dump = super().get_object()
+        authorization = dump.repository.get_user_authorization(self.request.user)
+        if not authorization.can_write:
+            raise PermissionDenied()
+        return dump
+
+    @action(detail=True, methods=["GET"], url_name="download")
+    def download(self, request, **kwargs):
+        """
+        Download the archive of a finished dump
+        """
+        dump = self.get_object()
+        if dump.dump_type != RepositoryDump.TYPE_DUMP or not dump.file:
+            raise NotFound()
+        return FileResponse(
+            dump.file.open("rb"),
+            as_attachment=True,
+            filename="{}.zip".format(dump.repository.slug),
+            content_type="application/zip",
+        )
+
+
+class RepositoryBulkTrainViewSet(
+    mixins.CreateModelMixin, mixins.ListModelMixin, GenericViewSet
+):
+    """
+    Schedule the train of many repositories, the trains are sent to the NLP
+    respecting the concurrency of the train scheduler
+    """
+
+    queryset = RepositoryTrainSchedule.objects
+    serializer_class = BulkTrainSerializer
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request, *args, **kwargs):
+        """
+        Depth of the train queue
+        """
+        return Response(RepositoryTrainSchedule.objects.depth())
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        repositories = serializer.validated_data.get("repositories")
+        for repository in repositories:
+            if not repository.get_user_authorization(request.user).can_write:
+                raise PermissionDenied()
+
+        versions = RepositoryVersion.objects.filter(repository__in=repositories)
+        if serializer.validated_data.get("only_default"):
+            versions = versions.filter(is_default=True)
+
+        scheduled, skipped = RepositoryTrainSchedule.objects.schedule(versions)
+
+        return Response(
+            {
+                "scheduled": [schedule.repository_version.pk for schedule in scheduled],
+                "skipped": skipped,
+                **RepositoryTrainSchedule.objects.depth(),
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+
 class RepositoryNLPLogReportsViewSet(mixins.ListModelMixin, GenericViewSet):
     """
-    List all public repositories.
+    List the repositories used by the user, or by the organization, with the
+    total of predictions in the date range
     """
 
     serializer_class = RepositoryNLPLogReportsSerializer
@@ -981,10 +1153,7 @@ class RepositoryNLPLogReportsViewSet(mixins.ListModelMixin, GenericViewSet):
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
 
-    def get_queryset(self, *args, **kwargs):
-        if getattr(self, "swagger_fake_view", False):
-            # queryset just for schema generation metadata
-            return Repository.objects.none()
+    def get_report_user(self):
         user = self.request.user
         if self.request.query_params.get("organization_nickname", None):
             owner = get_object_or_404(
@@ -995,18 +1164,67 @@ class RepositoryNLPLogReportsViewSet(mixins.ListModelMixin, GenericViewSet):
                 auth_org = OrganizationAuthorization.objects.filter(
                     organization=owner, user=self.request.user
                 ).first()
-                if auth_org.can_read:
+                if auth_org and auth_org.can_read:
                     user = owner
+        return user
+
+    def get_queryset(self, *args, **kwargs):
+        if getattr(self, "swagger_fake_view", False):
+            # queryset just for schema generation metadata
+            return Repository.objects.none()
         return (
             self.queryset.count_logs(
                 start_date=self.request.query_params.get("start_date", None),
                 end_date=self.request.query_params.get("end_date", None),
-                user=user,
+                user=self.get_report_user(),
             )
             .exclude(total_count=0)
             .order_by("-total_count")
         )
 
+    @swagger_auto_schema(
+        query_serializer=RepositoryNLPLogReportsDailySerializer,
+        responses={200: RepositoryNLPLogReportsDailySerializer(many=True)},
+    )
+    @action(
+        detail=True,
+        methods=["GET"],
+        url_name="daily",
+        lookup_field=[],
+        filter_class=None,
+        pagination_class=None,
+    )
+    def daily(self, request, **kwargs):
+        """
+        Total of predictions of each day of the date range, the days without
+        predictions are returned with zero
+        """
+        serializer = RepositoryNLPLogReportsDailySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        start_date = serializer.validated_data.get("start_date")
+        end_date = serializer.validated_data.get("end_date")
+
+        reports = RepositoryReports.objects.filter(
+            user=self.get_report_user(), report_date__range=(start_date, end_date)
+        )
+        if serializer.validated_data.get("repository_uuid"):
+            reports = reports.filter(
+                repository=serializer.validated_data.get("repository_uuid")
+            )
+        totals = dict(
+            reports.values("report_date")
+            .annotate(total_count=Sum("count_reports"))
+            .values_list("report_date", "total_count")
+        )
+
+        days = (end_date - start_date).days + 1
+        return Response(
+            [
+                {"date": day, "total_count": totals.get(day, 0)}
+                for day in (start_date + timedelta(days=i) for i in range(days))
+            ]
+        )
+
 
 class RepositoryIntentViewSet(
     mixins.ListModelMixin,
@@ -1077,7 +1295,11 @@ class RepositoryIntentViewSet(
 
 
 class RepositoryExamplesBulkViewSet(mixins.CreateModelMixin, GenericViewSet):
-    """Allows bulk creation of Examples inside an array."""
+    """
+    Allows bulk creation of Examples inside an array, the batch is created in
+    one transaction. Use ?partial_success=true to create the valid examples
+    and get the errors of the others.
+    """
 
     queryset = RepositoryExample.objects
     serializer_class = RepositoryExampleSerializer
@@ -1087,3 +1309,23 @@ class RepositoryExamplesBulkViewSet(mixins.CreateModelMixin, GenericViewSet):
             kwargs["many"] = True
 
         return super().get_serializer(*args, **kwargs)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["partial_success"] = self.request.query_params.get(
+            "partial_success", ""
+        ).lower() in ["true", "1"]
+        return context
+
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save()
+        return Response(
+            {"ids": serializer.ids, "errors": serializer.item_errors},
+            status=status.HTTP_201_CREATED,
+        )
@@ -10,10 +10,13 @@ from .organization.views import (
 from .repository.views import (
     RepositoryViewSet,
     RepositoryNLPLogViewSet,
+    RepositoryNLPLogPolicyViewSet,
     RepositoryEntitiesViewSet,
     NewRepositoryViewSet,
     RasaUploadViewSet,
     RepositoryTaskQueueViewSet,
+    RepositoryImportJobViewSet,
+    RepositoryDumpViewSet,
     RepositoriesPermissionsViewSet,
     RepositoryNLPLogReportsViewSet,
     RepositoryIntentViewSet,
@@ -22,6 +25,7 @@ from .repository.views import (
     RepositoryExamplesBulkViewSet,
 )
 from .repository.views import RepositoryVotesViewSet
+from .repository.views import RepositoryBulkTrainViewSet
 from .repository.views import RepositoryMigrateViewSet
 from .repository.views import RepositoriesViewSet
 from .repository.views import RepositoriesContributionsViewSet
@@ -133,6 +137,7 @@ router = Router()
 router.register("repository/repository-details", RepositoryViewSet)
 router.register("repository/info", NewRepositoryViewSet)
 router.register("repository/train/info", RepositoryTrainInfoViewSet)
+router.register("repository/train/bulk", RepositoryBulkTrainViewSet)
 router.register("repository/repository-votes", RepositoryVotesViewSet)
 router.register("repository/repositories", RepositoriesViewSet)
 router.register(
@@ -162,8 +167,11 @@ router.register("repository/translation", RepositoryTranslatedExampleViewSet)
 router.register("repository/translation-export", RepositoryTranslatedExporterViewSet)
 router.register("repository/version", RepositoryVersionViewSet)
 router.register("repository/log", RepositoryNLPLogViewSet)
+router.register("repository/log-policies", RepositoryNLPLogPolicyViewSet)
 router.register("repository/entities", RepositoryEntitiesViewSet)
 router.register("repository/task-queue", RepositoryTaskQueueViewSet)
+router.register("repository/import-jobs", RepositoryImportJobViewSet)
+router.register("repository/dumps", RepositoryDumpViewSet)
 router.register("repository/upload-rasa-file", RasaUploadViewSet)
 router.register("repository/entity/group", RepositoryEntityGroupViewSet)
 router.register("repository/repository-migrate", RepositoryMigrateViewSet)
@@ -0,0 +1,75 @@
+import coreapi
+import coreschema
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils.translation import ugettext_lazy as _
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import SearchFilter
+
+from bothub.common.models import Repository
+from bothub.common.search import SEARCH_TYPES, search_queryset
+
+
+class IndexedSearchFilter(SearchFilter):
+    """
+    Search filter that uses the trigram and full text indexes of the
+    search_fields, the match is chosen by the search_type param and the
+    words are split by the language param or the repository language
+    """
+
+    search_type_param = "search_type"
+    search_type_description = _(
+        "How the search is matched: contains (default), prefix, exact, fuzzy "
+        "or words"
+    )
+
+    def get_search_text(self, request):
+        return request.query_params.get(self.search_param, "").replace("\x00", "")
+
+    def get_search_type(self, request):
+        search_type = request.query_params.get(self.search_type_param)
+        if search_type and search_type not in SEARCH_TYPES:
+            raise ValidationError({self.search_type_param: [_("Invalid search type")]})
+        return search_type
+
+    def get_search_language(self, request):
+        language = request.query_params.get("language")
+        if language:
+            return language
+        repository_uuid = request.query_params.get("repository_uuid")
+        if not repository_uuid:
+            return None
+        try:
+            return (
+                Repository.objects.filter(uuid=repository_uuid)
+                .values_list("language", flat=True)
+                .first()
+            )
+        except DjangoValidationError:
+            return None
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = getattr(view, "search_fields", None)
+        text = self.get_search_text(request).strip()
+        if not search_fields or not text:
+            return queryset
+        return search_queryset(
+            queryset,
+            search_fields,
+            text,
+            search_type=self.get_search_type(request),
+            language=self.get_search_language(request),
+        )
+
+    def get_schema_fields(self, view):
+        return super().get_schema_fields(view) + [
+            coreapi.Field(
+                name=self.search_type_param,
+                required=False,
+                location="query",
+                schema=coreschema.Enum(
+                    SEARCH_TYPES,
+                    title=self.search_type_param,
+                    description=str(self.search_type_description),
+                ),
+            )
+        ]
@@ -1,4 +1,7 @@
 import json
+from unittest import mock
+
+from django.core.management import call_command
 from django.test import RequestFactory
 from django.test import TestCase
 from rest_framework import status
@@ -580,8 +583,8 @@ class ListEvaluateResultTestCase(TestCase):
                 entity_results=entity_results,
                 matrix_chart="{}/confmat.png".format(sample_url),
                 confidence_chart="{}/hist.png".format(sample_url),
-                log=json.dumps(evaluate_log),
             )
+            evaluate_result.set_log(evaluate_log)
 
             intent_score_1 = RepositoryEvaluateResultScore.objects.create(
                 precision=1.0, recall=1.0, f1_score=1.0, support=11
@@ -721,8 +724,8 @@ class ListEvaluateResultTestFilterCase(TestCase):
             entity_results=entity_results,
             matrix_chart="{}/confmat.png".format(sample_url),
             confidence_chart="{}/hist.png".format(sample_url),
-            log=json.dumps(evaluate_log),
         )
+        self.evaluate_result.set_log(evaluate_log)
 
         intent_score_1 = RepositoryEvaluateResultScore.objects.create(
             precision=1.0, recall=1.0, f1_score=1.0, support=11
@@ -830,6 +833,71 @@ class ListEvaluateResultTestFilterCase(TestCase):
         self.assertEqual(len(content_data["log"]["results"]), 1)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_okay_only_intent_filter(self):
+        response, content_data = self.request(
+            self.owner_token,
+            "?repository_uuid={}&intent=restaurant_search".format(self.repository.uuid),
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(content_data["log"]["total_pages"], 1)
+        self.assertEqual(
+            [log.get("text") for log in content_data["log"]["results"]],
+            ["test with nlu"],
+        )
+
+    def test_error_first(self):
+        response, content_data = self.request(
+            self.owner_token, "?repository_uuid={}".format(self.repository.uuid)
+        )
+        self.assertEqual(
+            [log.get("status") for log in content_data["log"]["results"]],
+            ["error", "success", "success", "success"],
+        )
+
+    def test_pages_filtered(self):
+        self.evaluate_result.set_log(
+            [
+                {
+                    "text": "hello {}".format(i),
+                    "intent": "greet",
+                    "intent_prediction": {"name": "greet", "confidence": 0.9},
+                    "status": "success",
+                }
+                for i in range(15)
+            ]
+        )
+        response, content_data = self.request(
+            self.owner_token,
+            "?repository_uuid={}&intent=greet&min=85&max=100&page_intent=2".format(
+                self.repository.uuid
+            ),
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(content_data["log"]["total_pages"], 2)
+        self.assertEqual(len(content_data["log"]["results"]), 6)
+
+    def test_fill_evaluate_result_logs(self):
+        log = list(
+            self.evaluate_result.evaluate_result_log.order_by("position").values_list(
+                "data", flat=True
+            )
+        )
+        self.evaluate_result.evaluate_result_log.all().delete()
+        RepositoryEvaluateResult.objects.filter(pk=self.evaluate_result.pk).update(
+            log="[{}]".format(", ".join(log))
+        )
+
+        with mock.patch("builtins.print"):
+            call_command("fill_evaluate_result_logs")
+
+        self.evaluate_result.refresh_from_db()
+        self.assertEqual(self.evaluate_result.log, "")
+        self.assertEqual(self.evaluate_result.evaluate_result_log.count(), 4)
+        self.assertEqual(
+            self.evaluate_result.evaluate_result_log.filter(is_error=True).get().text,
+            "test with nlu",
+        )
+
     def test_crossvalidation_false_filter(self):
         response, content_data = self.request(
             self.owner_token,
@@ -1,4 +1,5 @@
 import json
+from urllib.parse import parse_qs, urlparse
 
 from django.test import TestCase
 from django.test import RequestFactory
@@ -8,7 +9,9 @@ from bothub.common.models import Repository, RepositoryIntent
 from bothub.common.models import RepositoryExample
 from bothub.common.models import RepositoryTranslatedExample
 from bothub.common.models import RepositoryExampleEntity
+from bothub.common.models import RepositoryTranslatedExampleEntity
 from bothub.common import languages
+from bothub.common.search import SEARCH_WORDS, search_queryset
 
 from bothub.api.v2.tests.utils import create_user_and_token
 from bothub.api.v2.examples.views import ExamplesViewSet
@@ -119,6 +122,41 @@ class ListExamplesAPITestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(content_data.get("count"), 3)
 
+    def test_cursor_pagination(self):
+        data = {"repository_uuid": self.repository.uuid, "limit": 3, "cursor": ""}
+        response, content_data = self.request(data, self.owner_token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("count", content_data)
+        self.assertIsNone(content_data.get("previous"))
+        texts = [example.get("text") for example in content_data.get("results")]
+
+        response, content_data = self.request(
+            {
+                **data,
+                "cursor": parse_qs(urlparse(content_data.get("next")).query).get(
+                    "cursor"
+                )[0],
+            },
+            self.owner_token,
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(content_data.get("next"))
+        texts += [example.get("text") for example in content_data.get("results")]
+        self.assertEqual(texts, ["bye bye", "bye", "hello", "hi"])
+
+    def test_approximate_count(self):
+        response, content_data = self.request(
+            {
+                "repository_uuid": self.repository.uuid,
+                "cursor": "",
+                "approximate_count": "true",
+            },
+            self.owner_token,
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(content_data.get("count"), int)
+        self.assertEqual(len(content_data.get("results")), 4)
+
     def test_withuout_repository_uuid(self):
         response, content_data = self.request()
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -139,6 +177,52 @@ class ListExamplesAPITestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(content_data.get("count"), 2)
 
+    def test_search_type(self):
+        for search_type, search, count in [
+            ("contains", "e", 3),
+            ("prefix", "he", 1),
+            ("exact", "BYE", 1),
+            ("fuzzy", "helo", 1),
+            ("words", "by", 2),
+            ("words", "ye", 0),
+        ]:
+            response, content_data = self.request(
+                {
+                    "repository_uuid": self.repository.uuid,
+                    "search": search,
+                    "search_type": search_type,
+                },
+                self.owner_token,
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(content_data.get("count"), count, search_type)
+
+    def test_search_words_without_spaces(self):
+        examples = RepositoryExample.objects.filter(
+            repository_version_language=self.repository.current_version()
+        )
+        self.assertEqual(
+            search_queryset(examples, ["text"], "ye", SEARCH_WORDS).count(), 0
+        )
+        self.assertEqual(
+            search_queryset(
+                examples, ["text"], "ye", SEARCH_WORDS, language=languages.LANGUAGE_JA
+            ).count(),
+            2,
+        )
+
+    def test_invalid_search_type(self):
+        response, content_data = self.request(
+            {
+                "repository_uuid": self.repository.uuid,
+                "search": "h",
+                "search_type": "regex",
+            },
+            self.owner_token,
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("search_type", content_data)
+
     def test_filter_language(self):
         response, content_data = self.request(
             {
@@ -247,3 +331,43 @@ class ListExamplesAPITestCase(TestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(content_data.get("count"), 1)
+
+    def test_filter_has_valid_entities(self):
+        translated = RepositoryTranslatedExample.objects.create(
+            original_example=self.example_1, language=languages.LANGUAGE_PT, text="oi"
+        )
+        RepositoryTranslatedExample.objects.create(
+            original_example=self.example_2, language=languages.LANGUAGE_PT, text="ola"
+        )
+
+        response, content_data = self.request(
+            {
+                "repository_uuid": self.repository.uuid,
+                "has_invalid_entities": languages.LANGUAGE_PT,
+            },
+            self.owner_token,
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(content_data.get("count"), 1)
+        self.assertEqual(content_data.get("results")[0].get("id"), self.example_1.id)
+
+        response, content_data = self.request(
+            {
+                "repository_uuid": self.repository.uuid,
+                "has_valid_entities": languages.LANGUAGE_PT,
+            },
+            self.owner_token,
+        )
+        self.assertEqual(content_data.get("count"), 3)
+
+        RepositoryTranslatedExampleEntity.objects.create(
+            repository_translated_example=translated, start=0, end=2, entity="hi"
+        )
+        response, content_data = self.request(
+            {
+                "repository_uuid": self.repository.uuid,
+                "has_invalid_entities": languages.LANGUAGE_PT,
+            },
+            self.owner_token,
+        )
+        self.assertEqual(content_data.get("count"), 0)
@@ -1,21 +1,36 @@
 import json
+from datetime import timedelta
+from unittest import mock
 
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test import RequestFactory
 from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+from redis.exceptions import ResponseError
 from rest_framework import status
 
 from bothub.api.v2.nlp.views import RepositoryNLPLogsViewSet
-from bothub.api.v2.repository.views import RepositoryNLPLogViewSet
+from bothub.api.v2.repository.views import (
+    RepositoryNLPLogPolicyViewSet,
+    RepositoryNLPLogReportsViewSet,
+    RepositoryNLPLogViewSet,
+)
 from bothub.api.v2.tests.utils import create_user_and_token
-from bothub.common import languages
+from bothub.common import counters, languages
 from bothub.common.models import (
     Repository,
     RepositoryAuthorization,
     RepositoryNLPLog,
     RepositoryNLPLogIntent,
+    RepositoryNLPLogPolicy,
     RepositoryIntent,
+    RepositoryReports,
+    RepositoryReportsFlush,
 )
 from bothub.common.models import RepositoryExample
+from bothub.common.tasks import flush_usage_counters
 
 
 class RepositoryNLPLogTestCase(TestCase):
@@ -54,8 +69,8 @@ class RepositoryNLPLogTestCase(TestCase):
         content_data = json.loads(response.content)
         return (response, content_data)
 
-    def test_okay(self):
-        data = {
+    def log_data(self):
+        return {
             "text": "test",
             "user_agent": "python-requests/2.20.1",
             "from_backend": True,
@@ -78,11 +93,31 @@ class RepositoryNLPLogTestCase(TestCase):
                     "language": str(self.repository.language),
                 }
             ),
-            "log_intent": [],
+            "log_intent": [
+                {"intent": "doubt", "confidence": 0.03, "is_default": False},
+                {"intent": "bias", "confidence": 0.99, "is_default": True},
+            ],
         }
+
+    def test_okay(self):
+        data = self.log_data()
         response, content_data = self.request(data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
+        log = RepositoryNLPLog.objects.get(pk=content_data.get("id"))
+        self.assertEqual(log.intent, "bias")
+        self.assertEqual(log.confidence, 0.99)
+        self.assertEqual(log.nlp_log, "")
+        self.assertEqual(log.get_nlp_log(), data.get("nlp_log"))
+        self.assertEqual(log.intents(log).count(), 0)
+        self.assertEqual(
+            log.get_intents(),
+            [
+                {"id": 2, "intent": "bias", "confidence": 0.99, "is_default": True},
+                {"id": 1, "intent": "doubt", "confidence": 0.03, "is_default": False},
+            ],
+        )
+
         self.assertEqual(data.get("user_agent"), content_data.get("user_agent"))
         self.assertEqual(data.get("text"), content_data.get("text"))
         self.assertEqual(data.get("nlp_log"), content_data.get("nlp_log"))
@@ -91,6 +126,180 @@ class RepositoryNLPLogTestCase(TestCase):
         )
         self.assertEqual(data.get("language"), content_data.get("language"))
 
+    @override_settings(BOTHUB_NLP_LOG_COMPACT=False)
+    def test_not_compact(self):
+        data = self.log_data()
+        response, content_data = self.request(data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(data.get("nlp_log"), content_data.get("nlp_log"))
+
+        log = RepositoryNLPLog.objects.get(pk=content_data.get("id"))
+        self.assertEqual(log.nlp_log, data.get("nlp_log"))
+        self.assertIsNone(log.intent_ranking)
+        self.assertEqual(log.intents(log).count(), 2)
+        self.assertEqual(log.intent, "bias")
+
+    def assertReport(self, count_reports, count_logs):
+        report = RepositoryReports.objects.get(
+            repository_version_language=self.repository.current_version()
+        )
+        self.assertEqual(report.count_reports, count_reports)
+        self.assertEqual(report.count_logs, count_logs)
+
+    def test_policy_skip_from_backend(self):
+        RepositoryNLPLogPolicy.objects.create(
+            repository=self.repository, skip_from_backend=True
+        )
+        response, content_data = self.request(self.log_data())
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIsNone(content_data.get("id"))
+        self.assertFalse(RepositoryNLPLog.objects.exists())
+        self.assertReport(1, 0)
+
+        response, content_data = self.request(
+            {**self.log_data(), "from_backend": False}
+        )
+        self.assertEqual(RepositoryNLPLog.objects.count(), 1)
+        self.assertReport(2, 1)
+
+    def test_policy_max_confidence(self):
+        RepositoryNLPLogPolicy.objects.create(
+            repository=self.repository, max_confidence=0.5
+        )
+        self.request(self.log_data())
+        self.assertFalse(RepositoryNLPLog.objects.exists())
+        self.assertReport(1, 0)
+
+    def test_policy_sample_rate(self):
+        RepositoryNLPLogPolicy.objects.create(repository=self.repository, sample_rate=0)
+        self.request(self.log_data())
+        self.assertFalse(RepositoryNLPLog.objects.exists())
+        self.assertReport(1, 0)
+
+    def test_policy_daily_limit(self):
+        RepositoryNLPLogPolicy.objects.create(repository=self.repository, daily_limit=2)
+        for i in range(3):
+            self.request(self.log_data())
+        self.assertEqual(RepositoryNLPLog.objects.count(), 2)
+        self.assertReport(3, 2)
+
+    def test_authorization_policy(self):
+        RepositoryNLPLogPolicy.objects.create(repository=self.repository, sample_rate=0)
+        RepositoryNLPLogPolicy.objects.create(
+            repository=self.repository,
+            repository_authorization=self.repository_auth,
+            daily_limit=1,
+        )
+        self.request(self.log_data())
+        self.request(self.log_data())
+        self.assertEqual(RepositoryNLPLog.objects.count(), 1)
+        self.assertReport(2, 1)
+
+
+class RepositoryNLPLogPolicyTestCase(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+        self.owner, self.owner_token = create_user_and_token("owner")
+        self.user, self.user_token = create_user_and_token("user")
+
+        self.repository = Repository.objects.create(
+            owner=self.owner,
+            name="Testing",
+            slug="test",
+            language=languages.LANGUAGE_EN,
+        )
+
+    def request(self, method, data, token, **kwargs):
+        authorization_header = {"HTTP_AUTHORIZATION": "Token {}".format(token.key)}
+        if method == "get":
+            request = self.factory.get(
+                "/v2/repository/log-policies/", data, **authorization_header
+            )
+        else:
+            request = getattr(self.factory, method)(
+                "/v2/repository/log-policies/",
+                json.dumps(data),
+                content_type="application/json",
+                **authorization_header,
+            )
+        action = {"get": "list", "post": "create", "patch": "partial_update"}[method]
+        response = RepositoryNLPLogPolicyViewSet.as_view({method: action})(
+            request, **kwargs
+        )
+        response.render()
+        content_data = json.loads(response.content)
+        return (response, content_data)
+
+    def test_okay(self):
+        response, content_data = self.request(
+            "post",
+            {"repository": str(self.repository.uuid), "sample_rate": 0.1},
+            self.owner_token,
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIsNone(content_data.get("user"))
+
+        response, content_data = self.request(
+            "post",
+            {
+                "repository": str(self.repository.uuid),
+                "user": self.user.nickname,
+                "skip_from_backend": True,
+            },
+            self.owner_token,
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(content_data.get("user"), self.user.nickname)
+        policy = RepositoryNLPLogPolicy.objects.get(pk=content_data.get("id"))
+        self.assertEqual(
+            policy.repository_authorization,
+            self.repository.get_user_authorization(self.user),
+        )
+
+        response, content_data = self.request(
+            "patch", {"daily_limit": 10}, self.owner_token, pk=policy.pk
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(content_data.get("daily_limit"), 10)
+        self.assertEqual(content_data.get("user"), self.user.nickname)
+
+        response, content_data = self.request(
+            "get", {"repository_uuid": str(self.repository.uuid)}, self.owner_token
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(content_data.get("count"), 2)
+
+    def test_already_exists(self):
+        RepositoryNLPLogPolicy.objects.create(repository=self.repository)
+        response, content_data = self.request(
+            "post",
+            {"repository": str(self.repository.uuid), "sample_rate": 0.5},
+            self.owner_token,
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("user", content_data)
+
+    def test_invalid_sample_rate(self):
+        response, content_data = self.request(
+            "post",
+            {"repository": str(self.repository.uuid), "sample_rate": 2},
+            self.owner_token,
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("sample_rate", content_data)
+
+    def test_permission_denied(self):
+        response, content_data = self.request(
+            "post", {"repository": str(self.repository.uuid)}, self.user_token
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response, content_data = self.request(
+            "get", {"repository_uuid": str(self.repository.uuid)}, self.user_token
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
 
 class ListRepositoryNLPLogTestCase(TestCase):
     def setUp(self):
@@ -114,7 +323,7 @@ class ListRepositoryNLPLogTestCase(TestCase):
             intent=self.example_intent_1,
         )
 
-        nlp_log = RepositoryNLPLog.objects.create(
+        self.nlp_log = nlp_log = RepositoryNLPLog.objects.create(
             text="test",
             user_agent="python-requests/2.20.1",
             from_backend=True,
@@ -183,4 +392,384 @@ class ListRepositoryNLPLogTestCase(TestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(content_data.get("count"), 1)
-        self.assertEqual(len(content_data.get("results")[0].get("log_intent")), 4)
+        log = content_data.get("results")[0]
+        self.assertEqual(log.get("intent"), "bias")
+        self.assertEqual(log.get("confidence"), 0.9994810819625854)
+        self.assertNotIn("log_intent", log)
+
+    def retrieve(self):
+        request = self.factory.get(
+            "/v2/repository/log/",
+            {"repository_uuid": str(self.repository.uuid)},
+            HTTP_AUTHORIZATION="Token {}".format(self.owner_token.key),
+        )
+        response = RepositoryNLPLogViewSet.as_view({"get": "retrieve"})(
+            request, pk=self.nlp_log.pk
+        )
+        response.render()
+        content_data = json.loads(response.content)
+        return (response, content_data)
+
+    def test_retrieve(self):
+        response, content_data = self.retrieve()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(content_data.get("intent"), "bias")
+        self.assertEqual(len(content_data.get("log_intent")), 4)
+
+    def test_filter_intent_and_confidence(self):
+        for filters, count in [
+            ({"intent": "bias"}, 1),
+            ({"intent": "doubt"}, 0),
+            ({"confidence_min": 90}, 1),
+            ({"confidence_min": 10, "confidence_max": 50}, 0),
+            ({"confidence_max": 100}, 1),
+        ]:
+            response, content_data = self.request(
+                {"repository_uuid": str(self.repository.uuid), **filters},
+                self.owner_token,
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(content_data.get("count"), count, filters)
+
+    def test_fill_nlp_logs_intent(self):
+        RepositoryNLPLog.objects.update(intent=None, confidence=None)
+
+        with mock.patch("builtins.print"):
+            call_command("fill_nlp_logs_intent")
+
+        self.nlp_log.refresh_from_db()
+        self.assertEqual(self.nlp_log.intent, "bias")
+        self.assertEqual(self.nlp_log.confidence, 0.9994810819625854)
+
+    def test_compact_nlp_logs(self):
+        response, verbose = self.retrieve()
+
+        with mock.patch("builtins.print"):
+            call_command("compact_nlp_logs")
+
+        self.nlp_log.refresh_from_db()
+        self.assertEqual(self.nlp_log.nlp_log, "")
+        self.assertIsNotNone(self.nlp_log.intent_ranking)
+        self.assertFalse(RepositoryNLPLogIntent.objects.exists())
+
+        response, compact = self.retrieve()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(compact.get("nlp_log"), verbose.get("nlp_log"))
+        self.assertEqual(
+            list(compact.get("log_intent").values()),
+            list(verbose.get("log_intent").values()),
+        )
+
+    def test_compact_nlp_logs_fills_intent(self):
+        RepositoryNLPLog.objects.update(intent=None, confidence=None)
+
+        with mock.patch("builtins.print"):
+            call_command("compact_nlp_logs")
+
+        self.nlp_log.refresh_from_db()
+        self.assertEqual(self.nlp_log.intent, "bias")
+        self.assertEqual(self.nlp_log.confidence, 0.9994810819625854)
+
+
+class RepositoryNLPLogReportsTestCase(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+        self.owner, self.owner_token = create_user_and_token("owner")
+
+        self.repository = Repository.objects.create(
+            owner=self.owner,
+            name="Testing",
+            slug="test",
+            language=languages.LANGUAGE_EN,
+        )
+        self.other_repository = Repository.objects.create(
+            owner=self.owner, name="Other", slug="other", language=languages.LANGUAGE_EN
+        )
+
+        self.today = timezone.now().date()
+        for repository, count in [(self.repository, 3), (self.other_repository, 1)]:
+            for i in range(count):
+                RepositoryNLPLog.objects.create(
+                    text="test",
+                    user_agent="python-requests/2.20.1",
+                    from_backend=True,
+                    repository_version_language=repository.current_version(),
+                    nlp_log="{}",
+                    user=self.owner,
+                )
+        RepositoryReports.objects.add_counts(
+            [
+                (self.repository.current_version().pk, self.owner.pk, self.today, 3, 3),
+                (
+                    self.other_repository.current_version().pk,
+                    self.owner.pk,
+                    self.today,
+                    1,
+                    1,
+                ),
+                (
+                    self.repository.current_version().pk,
+                    self.owner.pk,
+                    self.today - timedelta(days=2),
+                    5,
+                    0,
+                ),
+            ]
+        )
+
+    def request(self, action, data, token):
+        request = self.factory.get(
+            "/v2/repository/repository-reports/",
+            data,
+            **{"HTTP_AUTHORIZATION": "Token {}".format(token.key)},
+        )
+        response = RepositoryNLPLogReportsViewSet.as_view({"get": action})(request)
+        response.render()
+        content_data = json.loads(response.content)
+        return (response, content_data)
+
+    def date_range(self):
+        return {
+            "start_date": str(self.today - timedelta(days=3)),
+            "end_date": str(self.today),
+        }
+
+    def test_list(self):
+        response, content_data = self.request(
+            "list", self.date_range(), self.owner_token
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                (repository.get("uuid"), repository.get("total_count"))
+                for repository in content_data.get("results")
+            ],
+            [(str(self.repository.uuid), 8), (str(self.other_repository.uuid), 1)],
+        )
+
+    def test_daily(self):
+        response, content_data = self.request(
+            "daily",
+            {**self.date_range(), "repository_uuid": str(self.repository.uuid)},
+            self.owner_token,
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([day.get("total_count") for day in content_data], [0, 5, 0, 3])
+        self.assertEqual(content_data[-1].get("date"), str(self.today))
+
+    def test_daily_invalid_range(self):
+        response, content_data = self.request(
+            "daily",
+            {"start_date": str(self.today), "end_date": str(self.today - timedelta(1))},
+            self.owner_token,
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("end_date", content_data)
+
+    def test_add_counts(self):
+        RepositoryReports.objects.add_counts(
+            [(self.repository.current_version().pk, self.owner.pk, self.today, 2, 1)]
+            * 2
+        )
+
+        report = RepositoryReports.objects.get(
+            repository_version_language=self.repository.current_version(),
+            report_date=self.today,
+        )
+        self.assertEqual(report.repository, self.repository)
+        self.assertEqual(report.count_reports, 7)
+        self.assertEqual(report.count_logs, 5)
+
+    def test_rebuild_reports(self):
+        RepositoryReports.objects.filter(
+            repository=self.repository, report_date=self.today
+        ).update(count_reports=100, count_logs=0)
+        RepositoryReports.objects.filter(repository=self.other_repository).delete()
+
+        with mock.patch("builtins.print"):
+            call_command(
+                "rebuild_reports",
+                start_date=str(self.today - timedelta(days=2)),
+                end_date=str(self.today),
+            )
+
+        self.assertEqual(
+            RepositoryReports.objects.filter(report_date__lt=self.today)
+            .values_list("count_reports", "count_logs")
+            .get(),
+            (5, 0),
+        )
+        report = RepositoryReports.objects.get(
+            repository=self.repository, report_date=self.today
+        )
+        self.assertEqual(report.count_reports, 100)
+        self.assertEqual(report.count_logs, 3)
+        report = RepositoryReports.objects.get(repository=self.other_repository)
+        self.assertEqual(
+            report.repository_version_language.repository_version.repository,
+            self.other_repository,
+        )
+        self.assertEqual(report.count_reports, 1)
+        self.assertEqual(report.count_logs, 1)
+
+    def test_rebuild_reports_raises_count_reports(self):
+        RepositoryReports.objects.filter(
+            repository=self.repository, report_date=self.today
+        ).update(count_reports=1)
+
+        with mock.patch("builtins.print"):
+            call_command(
+                "rebuild_reports", start_date=str(self.today), end_date=str(self.today)
+            )
+
+        report = RepositoryReports.objects.get(
+            repository=self.repository, report_date=self.today
+        )
+        self.assertEqual(report.count_reports, 3)
+
+    def test_rebuild_reports_deleted_logs(self):
+        with self.assertRaises(CommandError):
+            call_command(
+                "rebuild_reports",
+                start_date=str(self.today - timedelta(days=91)),
+                end_date=str(self.today),
+            )
+        self.assertTrue(
+            RepositoryReports.objects.filter(
+                report_date=self.today - timedelta(days=2)
+            ).exists()
+        )
+
+
+class FakeRedis:
+    """
+    The Redis commands used by the usage counters, over dicts of hashes
+    """
+
+    def __init__(self):
+        self.hashes = {}
+        self.calls = []
+        self.delete_error = None
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def execute(self):
+        pass
+
+    def lock(self, name, timeout=None):
+        return mock.Mock(**{"acquire.return_value": True})
+
+    def hincrby(self, key, field, amount):
+        fields = self.hashes.setdefault(key, {})
+        fields[field.encode()] = fields.get(field.encode(), 0) + amount
+
+    def renamenx(self, src, dst):
+        self.calls.append("renamenx")
+        if src not in self.hashes:
+            raise ResponseError("no such key")
+        if dst in self.hashes:
+            return False
+        self.hashes[dst] = self.hashes.pop(src)
+        return True
+
+    def hgetall(self, key):
+        return {
+            field: str(value).encode()
+            for field, value in self.hashes.get(key, {}).items()
+        }
+
+    def hsetnx(self, key, field, value):
+        self.hashes[key].setdefault(field.encode(), value)
+
+    def hget(self, key, field):
+        return self.hashes[key][field.encode()].encode()
+
+    def delete(self, key):
+        self.calls.append("delete")
+        if self.delete_error:
+            raise self.delete_error
+        self.hashes.pop(key, None)
+
+
+@override_settings(BOTHUB_USAGE_COUNTERS_REDIS=True)
+class UsageCountersTestCase(TestCase):
+    def setUp(self):
+        self.owner, self.owner_token = create_user_and_token("owner")
+        self.repository = Repository.objects.create(
+            owner=self.owner,
+            name="Testing",
+            slug="test",
+            language=languages.LANGUAGE_EN,
+        )
+        self.language = self.repository.current_version()
+        self.today = timezone.now().date()
+
+        self.redis = FakeRedis()
+        patcher = mock.patch(
+            "bothub.common.counters.get_redis_connection", return_value=self.redis
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def report(self, report_date):
+        return RepositoryReports.objects.values_list("count_reports", "count_logs").get(
+            repository_version_language=self.language, report_date=report_date
+        )
+
+    def test_flush(self):
+        yesterday = self.today - timedelta(days=1)
+        counters.increment(self.language.pk, self.owner.pk, self.today, 2, 1)
+        counters.increment(self.language.pk, self.owner.pk, self.today, 1, 0)
+        counters.increment(self.language.pk, self.owner.pk, yesterday, 4, 4)
+
+        self.assertEqual(flush_usage_counters(), 2)
+        self.assertEqual(self.report(self.today), (3, 1))
+        self.assertEqual(self.report(yesterday), (4, 4))
+        self.assertEqual(self.redis.hashes, {})
+
+    def test_flush_nothing_counted(self):
+        self.assertEqual(flush_usage_counters(), 0)
+        self.assertEqual(self.redis.calls, ["renamenx"])
+        self.assertFalse(RepositoryReports.objects.exists())
+
+    def test_delete_after_add_counts(self):
+        counters.increment(self.language.pk, self.owner.pk, self.today, 1, 1)
+
+        def add_counts(counts, flush_id):
+            self.redis.calls.append("add_counts")
+            self.assertEqual(
+                counts, [(self.language.pk, self.owner.pk, self.today, 1, 1)]
+            )
+            self.assertIn(counters.FLUSHING_KEY, self.redis.hashes)
+
+        counters.flush(add_counts)
+        self.assertEqual(self.redis.calls, ["renamenx", "add_counts", "delete"])
+
+    def test_failed_flush_retried(self):
+        counters.increment(self.language.pk, self.owner.pk, self.today, 2, 2)
+        with mock.patch.object(
+            RepositoryReports.objects, "add_counts", side_effect=RuntimeError
+        ), self.assertRaises(RuntimeError):
+            flush_usage_counters()
+        counters.increment(self.language.pk, self.owner.pk, self.today, 1, 0)
+
+        # the counters of the failed flush are flushed before the new ones
+        self.assertEqual(flush_usage_counters(), 1)
+        self.assertEqual(self.report(self.today), (2, 2))
+        self.assertEqual(flush_usage_counters(), 1)
+        self.assertEqual(self.report(self.today), (3, 2))
+
+    def test_failed_delete_not_added_again(self):
+        counters.increment(self.language.pk, self.owner.pk, self.today, 2, 1)
+        self.redis.delete_error = ConnectionError()
+        with self.assertRaises(ConnectionError):
+            flush_usage_counters()
+        self.assertEqual(self.report(self.today), (2, 1))
+
+        self.redis.delete_error = None
+        flush_usage_counters()
+        self.assertEqual(self.report(self.today), (2, 1))
+        self.assertEqual(self.redis.hashes, {})
+        self.assertEqual(RepositoryReportsFlush.objects.count(), 1)
@@ -1,19 +1,34 @@
+import base64
+import hashlib
 import json
 import uuid
+from unittest import mock
 
+from django.core.management import call_command
 from django.test import TestCase
+from django.test import TransactionTestCase
 from django.test import RequestFactory
+from django.test import override_settings
 from rest_framework import status
 
 from bothub.api.v2.nlp.views import RepositoryAuthorizationTrainViewSet
 from bothub.api.v2.nlp.views import RepositoryAuthorizationInfoViewSet
+from bothub.api.v2.nlp.views import RepositoryAuthorizationEvaluateViewSet
+from bothub.api.v2.nlp.views import RepositoryUpdateInterpretersViewSet
 from bothub.common import languages
 from bothub.common.models import (
     RepositoryAuthorization,
+    RepositoryEntity,
+    RepositoryNLPTrain,
+    RepositoryEvaluate,
+    RepositoryEvaluateEntity,
+    RepositoryEvaluateResult,
+    RepositoryEvaluateResultScore,
     RepositoryVersion,
     RepositoryVersionLanguage,
     RepositoryIntent,
 )
+from bothub.common.management.commands.transfer_train_aws import RateLimiter, transfer
 from bothub.common.models import RepositoryExample
 from bothub.common.models import RepositoryExampleEntity
 from bothub.common.models import Repository
@@ -198,3 +213,827 @@ class AuthorizationInfoTestCase(TestCase):
     def test_not_auth(self):
         response, content_data = self.request(str(uuid.uuid4()))
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TrainGetExamplesTestCase(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+        self.owner, self.owner_token = create_user_and_token("owner")
+
+        self.repository = Repository.objects.create(
+            owner=self.owner,
+            name="Testing",
+            slug="test",
+            language=languages.LANGUAGE_EN,
+        )
+
+        self.repository_authorization = RepositoryAuthorization.objects.create(
+            user=self.owner, repository=self.repository, role=3
+        )
+
+        self.repository_version_language = self.repository.current_version()
+        intent = RepositoryIntent.objects.create(
+            text="greet",
+            repository_version=self.repository_version_language.repository_version,
+        )
+        for text in ["hi", "hello", "hey"]:
+            RepositoryExample.objects.create(
+                repository_version_language=self.repository_version_language,
+                text=text,
+                intent=intent,
+            )
+
+    def request(self, data):
+        request = self.factory.get(
+            "/v2/repository/nlp/authorization/train/get_examples/",
+            {"repository_version": self.repository_version_language.pk, **data},
+            **{
+                "HTTP_AUTHORIZATION": "Bearer {}".format(
+                    self.repository_authorization.uuid
+                )
+            }
+        )
+        response = RepositoryAuthorizationTrainViewSet.as_view({"get": "get_examples"})(
+            request
+        )
+        response.render()
+        content_data = json.loads(response.content)
+        return (response, content_data)
+
+    def test_ok(self):
+        response, content_data = self.request({})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(content_data.get("count"), 3)
+
+    def test_cursor(self):
+        response, content_data = self.request({"cursor": ""})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(content_data.get("next"))
+        self.assertEqual(
+            [example.get("text") for example in content_data.get("results")],
+            ["hey", "hello", "hi"],
+        )
+
+
+class EvaluateResultsTestCase(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+        self.owner, self.owner_token = create_user_and_token("owner")
+
+        self.repository = Repository.objects.create(
+            owner=self.owner,
+            name="Testing",
+            slug="test",
+            language=languages.LANGUAGE_EN,
+        )
+
+        self.repository_authorization = RepositoryAuthorization.objects.create(
+            user=self.owner, repository=self.repository, role=3
+        )
+
+    def request(self, log):
+        request = self.factory.post(
+            "/v2/repository/nlp/authorization/evaluate/evaluate_results/",
+            json.dumps(
+                {
+                    "repository_version": self.repository.current_version().pk,
+                    "matrix_chart": "https://bothub.it/matrix.png",
+                    "confidence_chart": "https://bothub.it/confidence.png",
+                    "log": log,
+                    "intentprecision": 1,
+                    "intentf1_score": 1,
+                    "intentaccuracy": 1,
+                    "entityprecision": 1,
+                    "entityf1_score": 1,
+                    "entityaccuracy": 1,
+                    "cross_validation": False,
+                }
+            ),
+            content_type="application/json",
+            **{
+                "HTTP_AUTHORIZATION": "Bearer {}".format(
+                    self.repository_authorization.uuid
+                )
+            }
+        )
+        response = RepositoryAuthorizationEvaluateViewSet.as_view(
+            {"post": "evaluate_results"}
+        )(request)
+        response.render()
+        content_data = json.loads(response.content)
+        return (response, content_data)
+
+    def test_ok(self):
+        response, content_data = self.request(
+            json.dumps(
+                [
+                    {
+                        "text": "hi",
+                        "intent": "greet",
+                        "intent_prediction": {"name": "greet", "confidence": 0.9},
+                        "intent_status": "success",
+                    },
+                    {
+                        "text": "bye",
+                        "intent": "goodbye",
+                        "intent_prediction": {"name": "greet", "confidence": 0.4},
+                        "intent_status": "error",
+                    },
+                ]
+            )
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        result = RepositoryEvaluateResult.objects.get(pk=content_data["evaluate_id"])
+        self.assertEqual(result.log, "")
+        log = result.evaluate_result_log.first()
+        self.assertEqual(log.text, "bye")
+        self.assertEqual(log.predicted_intent, "greet")
+        self.assertEqual(log.confidence, 0.4)
+        self.assertTrue(log.is_error)
+
+    def test_invalid_log(self):
+        response, content_data = self.request("[{")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("log", content_data)
+
+    def test_invalid_log_entries(self):
+        for log in [
+            {"text": "hi"},
+            ["hi"],
+            [{"text": "hi", "intent_prediction": "greet"}],
+            [{"text": "hi", "intent_prediction": {"confidence": "high"}}],
+        ]:
+            response, content_data = self.request(json.dumps(log))
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("log", content_data)
+        self.assertFalse(RepositoryEvaluateResult.objects.exists())
+        self.assertFalse(RepositoryEvaluateResultScore.objects.exists())
+
+    def test_rollback(self):
+        with mock.patch(
+            "bothub.common.models.RepositoryEvaluateResult.set_log",
+            side_effect=RuntimeError,
+        ):
+            with self.assertRaises(RuntimeError):
+                self.request("[]")
+        self.assertFalse(RepositoryEvaluateResultScore.objects.exists())
+
+    def report_request(self, data):
+        request = self.factory.post(
+            "/v2/repository/nlp/authorization/evaluate/evaluate_report/",
+            json.dumps(
+                {
+                    "repository_version": self.repository.current_version().pk,
+                    "matrix_chart": "https://bothub.it/matrix.png",
+                    "confidence_chart": "https://bothub.it/confidence.png",
+                    "intent_results": {"precision": 0.9, "f1_score": 0.8},
+                    "entity_results": {"accuracy": 0.7},
+                    **data,
+                }
+            ),
+            content_type="application/json",
+            **{
+                "HTTP_AUTHORIZATION": "Bearer {}".format(
+                    self.repository_authorization.uuid
+                )
+            }
+        )
+        response = RepositoryAuthorizationEvaluateViewSet.as_view(
+            {"post": "evaluate_report"}
+        )(request)
+        response.render()
+        content_data = json.loads(response.content)
+        return (response, content_data)
+
+    def test_report(self):
+        RepositoryEntity.objects.create(
+            repository_version=self.repository.current_version().repository_version,
+            value="name",
+        )
+        response, content_data = self.report_request(
+            {
+                "intents": [
+                    {"intent": "greet", "precision": 1, "support": 3},
+                    {"intent": "goodbye", "f1_score": 0.5, "support": 2},
+                ],
+                "entities": [{"entity": "name", "recall": 0.25, "support": 1}],
+                "log": [
+                    {
+                        "text": "bye",
+                        "intent": "goodbye",
+                        "intent_prediction": {"name": "greet", "confidence": 0.4},
+                        "intent_status": "error",
+                    }
+                ],
+            }
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(content_data["evaluate_version"], 1)
+
+        result = RepositoryEvaluateResult.objects.get(pk=content_data["evaluate_id"])
+        self.assertEqual(float(result.intent_results.f1_score), 0.8)
+        self.assertEqual(float(result.entity_results.accuracy), 0.7)
+        self.assertEqual(
+            {
+                intent.intent: intent.score.support
+                for intent in result.evaluate_result_intent.all()
+            },
+            {"greet": 3, "goodbye": 2},
+        )
+        entity = result.evaluate_result_entity.get()
+        self.assertEqual(entity.entity.value, "name")
+        self.assertEqual(float(entity.score.recall), 0.25)
+        self.assertEqual(result.evaluate_result_log.get().predicted_intent, "greet")
+
+    def test_report_version(self):
+        self.request("[]")
+        response, content_data = self.report_request({})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(content_data["evaluate_version"], 2)
+        self.repository.refresh_from_db()
+        self.assertEqual(self.repository.evaluate_results_version, 2)
+
+    def test_report_unknown_entity(self):
+        response, content_data = self.report_request(
+            {"entities": [{"entity": "name", "recall": 0.25}]}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("entities", content_data)
+        self.assertFalse(RepositoryEvaluateResult.objects.exists())
+
+    def test_report_invalid_log(self):
+        response, content_data = self.report_request(
+            {"log": [{"text": "hi", "intent_prediction": {"confidence": "high"}}]}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("0", content_data.get("log"))
+        self.assertFalse(RepositoryEvaluateResult.objects.exists())
+
+    def test_report_other_repository(self):
+        other = Repository.objects.create(
+            owner=self.owner, name="Other", slug="other", language=languages.LANGUAGE_EN
+        )
+        response, content_data = self.report_request(
+            {"repository_version": other.current_version().pk}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("repository_version", content_data)
+
+
+class EvaluationsDatasetTestCase(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+        self.owner, self.owner_token = create_user_and_token("owner")
+
+        self.repository = Repository.objects.create(
+            owner=self.owner,
+            name="Testing",
+            slug="test",
+            language=languages.LANGUAGE_EN,
+        )
+
+        self.repository_authorization = RepositoryAuthorization.objects.create(
+            user=self.owner, repository=self.repository, role=3
+        )
+
+        self.repository_version_language = self.repository.current_version()
+        for text in ["my name is douglas", "my name is john", "hi"]:
+            evaluate = RepositoryEvaluate.objects.create(
+                repository_version_language=self.repository_version_language,
+                text=text,
+                intent="greet",
+            )
+            if text.startswith("my name"):
+                RepositoryEvaluateEntity.objects.create(
+                    repository_evaluate=evaluate, start=11, end=len(text), entity="name"
+                )
+
+    def request(self, pk=None, **headers):
+        authorization_header = {
+            "HTTP_AUTHORIZATION": "Bearer {}".format(self.repository_authorization.uuid)
+        }
+        authorization_header.update(headers)
+        request = self.factory.get(
+            "/v2/repository/nlp/authorization/evaluate/evaluations_dataset/",
+            {"repository_version": pk or self.repository_version_language.pk},
+            **authorization_header
+        )
+        return RepositoryAuthorizationEvaluateViewSet.as_view(
+            {"get": "evaluations_dataset"}
+        )(request)
+
+    def read(self, response):
+        content = b"".join(response.streaming_content).decode()
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_okay(self):
+        response = self.request()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertIn("ETag", response)
+        self.assertEqual(
+            self.read(response),
+            [
+                {
+                    "text": "my name is douglas",
+                    "intent": "greet",
+                    "entities": [
+                        {"start": 11, "end": 18, "value": "douglas", "entity": "name"}
+                    ],
+                },
+                {
+                    "text": "my name is john",
+                    "intent": "greet",
+                    "entities": [
+                        {"start": 11, "end": 15, "value": "john", "entity": "name"}
+                    ],
+                },
+                {"text": "hi", "intent": "greet", "entities": []},
+            ],
+        )
+
+    def test_num_queries(self):
+        response = self.request()
+        # sentences ids, sentences and entities with their RepositoryEntity
+        with self.assertNumQueries(3):
+            self.assertEqual(len(self.read(response)), 3)
+
+    def test_not_modified(self):
+        etag = self.request()["ETag"]
+
+        response = self.request(HTTP_IF_NONE_MATCH=etag)
+        response.render()
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_modified(self):
+        etag = self.request()["ETag"]
+
+        evaluate = RepositoryEvaluate.objects.get(text="hi")
+        evaluate.intent = "bye"
+        evaluate.save()
+
+        response = self.request(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(self.read(response)[-1].get("intent"), "bye")
+
+    def test_modified_entity(self):
+        etag = self.request()["ETag"]
+
+        RepositoryEvaluateEntity.objects.filter(entity__value="name").delete()
+
+        response = self.request(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(
+            any(evaluate.get("entities") for evaluate in self.read(response))
+        )
+
+    @override_settings(
+        BOTHUB_EVALUATIONS_CACHE=True,
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        },
+    )
+    def test_cache(self):
+        content = self.read(self.request())
+
+        response = self.request()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.read(response), content)
+
+        RepositoryEvaluate.objects.create(
+            repository_version_language=self.repository_version_language,
+            text="hello",
+            intent="greet",
+        )
+        self.assertEqual(len(self.read(self.request())), 4)
+
+    def test_other_repository(self):
+        other = Repository.objects.create(
+            owner=self.owner, name="Other", slug="other", language=languages.LANGUAGE_EN
+        )
+        response = self.request(other.current_version().pk)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class UpdateInterpretersTestCase(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+        self.owner, self.owner_token = create_user_and_token("owner")
+
+        self.repository = Repository.objects.create(
+            owner=self.owner,
+            name="Testing",
+            slug="test",
+            language=languages.LANGUAGE_EN,
+        )
+
+        self.repository_authorization = RepositoryAuthorization.objects.create(
+            user=self.owner, repository=self.repository, role=3
+        )
+
+        self.repository_version_language = self.repository.current_version()
+        self.repository_version_language.save_training("bot_data", "1.4.3")
+
+    def request(self, token, pk, data=None, **headers):
+        authorization_header = {"HTTP_AUTHORIZATION": "Bearer {}".format(token)}
+        authorization_header.update(headers)
+        request = self.factory.get(
+            "/v2/repository/nlp/update_interpreters/{}/".format(pk),
+            {"rasa_version": "1.4.3", **(data or {})},
+            **authorization_header
+        )
+        response = RepositoryUpdateInterpretersViewSet.as_view({"get": "retrieve"})(
+            request, pk=pk
+        )
+        response.render()
+        return response
+
+    def request_changed(self, token, data):
+        authorization_header = {"HTTP_AUTHORIZATION": "Bearer {}".format(token)}
+        request = self.factory.post(
+            "/v2/repository/nlp/update_interpreters/changed/",
+            json.dumps(data),
+            content_type="application/json",
+            **authorization_header
+        )
+        response = RepositoryUpdateInterpretersViewSet.as_view({"post": "changed"})(
+            request
+        )
+        response.render()
+        content_data = json.loads(response.content)
+        return (response, content_data)
+
+    def test_etag(self):
+        response = self.request(
+            str(self.repository_authorization.uuid), self.repository_version_language.pk
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("ETag", response)
+        self.assertEqual(json.loads(response.content).get("bot_data"), "bot_data")
+
+    def test_not_modified(self):
+        response = self.request(
+            str(self.repository_authorization.uuid), self.repository_version_language.pk
+        )
+        etag = response["ETag"]
+
+        response = self.request(
+            str(self.repository_authorization.uuid),
+            self.repository_version_language.pk,
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+
+    def test_no_bot_data_etag(self):
+        response = self.request(
+            str(self.repository_authorization.uuid),
+            self.repository_version_language.pk,
+            {"no_bot_data": "true"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("bot_data", json.loads(response.content))
+        etag = response["ETag"]
+
+        response = self.request(
+            str(self.repository_authorization.uuid),
+            self.repository_version_language.pk,
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(json.loads(response.content).get("bot_data"), "bot_data")
+
+    def test_modified_after_training(self):
+        response = self.request(
+            str(self.repository_authorization.uuid), self.repository_version_language.pk
+        )
+        etag = response["ETag"]
+
+        self.repository_version_language.save_training("new_bot_data", "1.4.3")
+
+        response = self.request(
+            str(self.repository_authorization.uuid),
+            self.repository_version_language.pk,
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(json.loads(response.content).get("bot_data"), "new_bot_data")
+
+    def test_changed(self):
+        response, content_data = self.request_changed(
+            str(self.repository_authorization.uuid),
+            {
+                "rasa_version": "1.4.3",
+                "interpreters": [
+                    {
+                        "version_id": self.repository_version_language.pk,
+                        "total_training_end": 1,
+                    },
+                    {"version_id": 0, "total_training_end": 1},
+                ],
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(content_data.get("interpreters")), 1)
+        self.assertFalse(content_data.get("interpreters")[0].get("changed"))
+        self.assertEqual(content_data.get("not_found"), [0])
+
+        self.repository_version_language.save_training("new_bot_data", "1.4.3")
+
+        response, content_data = self.request_changed(
+            str(self.repository_authorization.uuid),
+            {
+                "rasa_version": "1.4.3",
+                "interpreters": [
+                    {
+                        "version_id": self.repository_version_language.pk,
+                        "total_training_end": 1,
+                    }
+                ],
+            },
+        )
+        self.assertTrue(content_data.get("interpreters")[0].get("changed"))
+        self.assertEqual(
+            content_data.get("interpreters")[0].get("total_training_end"), 2
+        )
+
+    def test_changed_invalid(self):
+        response, content_data = self.request_changed(
+            str(self.repository_authorization.uuid), {"interpreters": "invalid"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_changed_not_auth(self):
+        response, content_data = self.request_changed(
+            str(uuid.uuid4()), {"interpreters": []}
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class FakeS3Client:
+    def __init__(self):
+        self.meta = mock.Mock(endpoint_url="http://s3.local")
+        self.parts = []
+        self.completed = False
+        self.aborted = False
+
+    def create_multipart_upload(self, **kwargs):
+        return {"UploadId": "upload"}
+
+    def upload_part(self, **kwargs):
+        self.parts.append(kwargs.get("Body"))
+        return {"ETag": str(kwargs.get("PartNumber"))}
+
+    def complete_multipart_upload(self, **kwargs):
+        self.completed = True
+
+    def abort_multipart_upload(self, **kwargs):
+        self.aborted = True
+
+
+class UploadInterpreterTestCase(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+        self.owner, self.owner_token = create_user_and_token("owner")
+
+        self.repository = Repository.objects.create(
+            owner=self.owner,
+            name="Testing",
+            slug="test",
+            language=languages.LANGUAGE_EN,
+        )
+
+        self.repository_authorization = RepositoryAuthorization.objects.create(
+            user=self.owner, repository=self.repository, role=3
+        )
+
+        self.repository_version_language = self.repository.current_version()
+        self.bot_data = b"trained model" * 10
+
+    def request(self, token, data, checksum=None, version_language=None):
+        authorization_header = {"HTTP_AUTHORIZATION": "Bearer {}".format(token)}
+        params = "id={}&rasa_version=1.4.3".format(
+            (version_language or self.repository_version_language).pk
+        )
+        if checksum:
+            params += "&checksum={}".format(checksum)
+        request = self.factory.post(
+            "/v2/repository/nlp/update_interpreters/upload/?{}".format(params),
+            data,
+            content_type="application/octet-stream",
+            **authorization_header
+        )
+        response = RepositoryUpdateInterpretersViewSet.as_view({"post": "upload"})(
+            request
+        )
+        response.render()
+        content_data = json.loads(response.content)
+        return (response, content_data)
+
+    def test_okay(self):
+        response, content_data = self.request(
+            str(self.repository_authorization.uuid), self.bot_data
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            content_data.get("checksum"), hashlib.sha256(self.bot_data).hexdigest()
+        )
+        self.assertFalse(content_data.get("from_aws"))
+        self.assertEqual(
+            self.repository_version_language.get_trainer("1.4.3").bot_data,
+            base64.b64encode(self.bot_data).decode(),
+        )
+
+    @override_settings(
+        AWS_SEND=True,
+        AWS_ACCESS_KEY_ID="key",
+        AWS_SECRET_ACCESS_KEY="secret",
+        AWS_BUCKET_NAME="bucket",
+        AWS_MULTIPART_CHUNK_SIZE=16,
+    )
+    def test_multipart_upload(self):
+        client = FakeS3Client()
+        with mock.patch("bothub.utils.get_s3_client", return_value=client):
+            response, content_data = self.request(
+                str(self.repository_authorization.uuid),
+                self.bot_data,
+                hashlib.sha256(self.bot_data).hexdigest(),
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(content_data.get("from_aws"))
+        self.assertTrue(client.completed)
+        self.assertEqual(len(client.parts), 9)
+        self.assertEqual(b"".join(client.parts), self.bot_data)
+        self.assertTrue(
+            self.repository_version_language.get_trainer("1.4.3").bot_data.startswith(
+                "http://s3.local/bucket/"
+            )
+        )
+
+    @override_settings(
+        AWS_SEND=True,
+        AWS_ACCESS_KEY_ID="key",
+        AWS_SECRET_ACCESS_KEY="secret",
+        AWS_BUCKET_NAME="bucket",
+        AWS_MULTIPART_CHUNK_SIZE=16,
+    )
+    def test_checksum_mismatch(self):
+        client = FakeS3Client()
+        with mock.patch("bothub.utils.get_s3_client", return_value=client):
+            response, content_data = self.request(
+                str(self.repository_authorization.uuid), self.bot_data, "invalid"
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("checksum", content_data)
+        self.assertTrue(client.aborted)
+        self.assertFalse(client.completed)
+
+    def test_empty(self):
+        response, content_data = self.request(
+            str(self.repository_authorization.uuid), b""
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("bot_data", content_data)
+
+    def test_not_auth(self):
+        response, content_data = self.request(str(uuid.uuid4()), self.bot_data)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_other_repository(self):
+        other_repository = Repository.objects.create(
+            owner=self.owner, name="Other", slug="other", language=languages.LANGUAGE_EN
+        )
+        version_language = other_repository.current_version()
+
+        response, content_data = self.request(
+            str(self.repository_authorization.uuid),
+            self.bot_data,
+            version_language=version_language,
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(
+            RepositoryNLPTrain.objects.filter(
+                repositoryversionlanguage=version_language
+            ).exists()
+        )
+
+    @override_settings(AWS_SEND=True, AWS_ACCESS_KEY_ID="", AWS_BUCKET_NAME="")
+    def test_aws_not_configured(self):
+        with mock.patch("bothub.utils.get_s3_client") as get_s3_client:
+            response, content_data = self.request(
+                str(self.repository_authorization.uuid), self.bot_data
+            )
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertIn("AWS credentials", content_data.get("detail"))
+        get_s3_client.assert_not_called()
+
+
+class FailingS3Client(FakeS3Client):
+    def __init__(self, failing_ids):
+        super().__init__()
+        self.failing_keys = ["repository_{}/".format(pk) for pk in failing_ids]
+
+    def upload_part(self, **kwargs):
+        if any(kwargs.get("Key").startswith(key) for key in self.failing_keys):
+            raise ValueError("upload failed")
+        return super().upload_part(**kwargs)
+
+
+@override_settings(
+    AWS_SEND=True,
+    AWS_ACCESS_KEY_ID="key",
+    AWS_SECRET_ACCESS_KEY="secret",
+    AWS_BUCKET_NAME="bucket",
+    AWS_MULTIPART_CHUNK_SIZE=16,
+)
+class TransferTrainAWSTestCase(TransactionTestCase):
+    # the uploads run in threads with their own connections, the rows must be
+    # committed to be seen by them
+
+    def setUp(self):
+        self.owner, self.owner_token = create_user_and_token("owner")
+        self.repository = Repository.objects.create(
+            owner=self.owner,
+            name="Testing",
+            slug="test",
+            language=languages.LANGUAGE_EN,
+        )
+        version_language = self.repository.current_version()
+        self.bot_data = [b"bot data %d" % i * 4 for i in range(3)]
+        self.trains = [
+            RepositoryNLPTrain.objects.create(
+                repositoryversionlanguage=version_language,
+                rasa_version="1.4.{}".format(i),
+                bot_data=base64.b64encode(bot_data).decode(),
+            )
+            for i, bot_data in enumerate(self.bot_data)
+        ]
+        self.sent = RepositoryNLPTrain.objects.create(
+            repositoryversionlanguage=version_language,
+            rasa_version="1.4.9",
+            bot_data="http://s3.local/bucket/repository_0/bot_data.tar.gz",
+        )
+
+    def transfer(self, client, **options):
+        with mock.patch("bothub.utils.get_s3_client", return_value=client):
+            with mock.patch("builtins.print") as mock_print:
+                call_command("transfer_train_aws", workers=2, batch_size=2, **options)
+        return [str(call[0][0]) for call in mock_print.call_args_list]
+
+    def bot_data_urls(self):
+        return list(
+            RepositoryNLPTrain.objects.filter(
+                pk__in=[train.pk for train in self.trains]
+            )
+            .order_by("pk")
+            .values_list("bot_data", flat=True)
+        )
+
+    def test_transfer(self):
+        client = FakeS3Client()
+        output = self.transfer(client)
+
+        urls = self.bot_data_urls()
+        for train, url in zip(self.trains, urls):
+            self.assertTrue(
+                url.startswith("http://s3.local/bucket/repository_{}/".format(train.pk))
+            )
+        # each model of 40 bytes is sent in 3 parts of at most 16 bytes
+        self.assertEqual(len(client.parts), 9)
+        self.assertEqual(sum(map(len, client.parts)), 120)
+        self.sent.refresh_from_db()
+        self.assertTrue(self.sent.bot_data.endswith("repository_0/bot_data.tar.gz"))
+        self.assertIn("Transferred: 3, skipped: 0, failed: 0", output[-1])
+
+    def test_resume(self):
+        output = self.transfer(FakeS3Client(), start_id=self.trains[0].pk)
+        self.assertIn("Transferred: 2", output[-1])
+        self.assertFalse(self.bot_data_urls()[0].startswith("http"))
+
+        # the models already sent are not listed again
+        client = FakeS3Client()
+        output = self.transfer(client)
+        self.assertIn("Transferred: 1, skipped: 0, failed: 0", output[-1])
+        self.assertEqual(b"".join(client.parts), self.bot_data[0])
+
+    def test_skip_sent(self):
+        self.assertFalse(transfer(self.sent.pk, RateLimiter(0)))
+
+    def test_failed_ids(self):
+        failed = self.trains[1].pk
+        output = self.transfer(FailingS3Client([failed]))
+
+        self.assertIn("Transferred: 2, skipped: 0, failed: 1", output[-2])
+        self.assertEqual(output[-1], "Failed ids: {}".format(failed))
+        self.assertFalse(self.bot_data_urls()[1].startswith("http"))
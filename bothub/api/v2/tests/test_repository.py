@@ -1,10 +1,15 @@
 import json
+import shutil
+import tempfile
 import uuid
+from unittest import mock
+from django.core.files.storage import default_storage
 
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import RequestFactory
 from django.test import TestCase
-from django.test.client import MULTIPART_CONTENT
+from django.test import override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
 from rest_framework import status
 
 from bothub.api.v2.repository.serializers import NewRepositorySerializer
@@ -12,15 +17,20 @@ from bothub.api.v2.repository.views import (
     RepositoriesContributionsViewSet,
     RepositoryEntitiesViewSet,
     NewRepositoryViewSet,
+    RasaUploadViewSet,
     RepositoryIntentViewSet,
     RepositoryTrainInfoViewSet,
     RepositoryExamplesBulkViewSet,
+    RepositoryDumpViewSet,
 )
 from bothub.api.v2.repository.views import RepositoriesViewSet
+from bothub.api.v2.repository.views import RepositoryBulkTrainViewSet
 from bothub.api.v2.repository.views import RepositoryAuthorizationRequestsViewSet
 from bothub.api.v2.repository.views import RepositoryAuthorizationViewSet
 from bothub.api.v2.repository.views import RepositoryCategoriesView
 from bothub.api.v2.repository.views import RepositoryExampleViewSet
+from bothub.api.v2.repository.views import RepositoryImportJobViewSet
+from bothub.api.v2.repository.views import RepositoryMigrateViewSet
 from bothub.api.v2.repository.views import RepositoryViewSet
 from bothub.api.v2.repository.views import RepositoryVotesViewSet
 from bothub.api.v2.repository.views import SearchRepositoriesViewSet
@@ -38,9 +48,15 @@ from bothub.common.models import RepositoryAuthorization
 from bothub.common.models import RepositoryCategory
 from bothub.common.models import RepositoryExample
 from bothub.common.models import RepositoryExampleEntity
+from bothub.common.models import RepositoryDump
+from bothub.common.models import RepositoryImportJob
+from bothub.common.models import RepositoryQueueTask
+from bothub.common.importers import ExamplesImporter
+from bothub.common.models import RepositoryTrainSchedule
 from bothub.common.models import RepositoryTranslatedExample
 from bothub.common.models import RepositoryVote
 from bothub.common.models import RequestRepositoryAuthorization
+from bothub.common.tasks import import_examples, repository_dump, repository_restore
 
 
 def get_valid_mockups(categories):
@@ -1299,9 +1315,11 @@ class RepositoryExampleUploadTestCase(TestCase):
             language=languages.LANGUAGE_EN,
         )
 
-    def request(self, token):
+    def request(self, token, examples=None):
         authorization_header = {"HTTP_AUTHORIZATION": "Token {}".format(token.key)}
-        examples = b"""[
+        examples = (
+            examples
+            or b"""[
                     {
                         "text": "yes",
                         "language": "en",
@@ -1325,6 +1343,7 @@ class RepositoryExampleUploadTestCase(TestCase):
                         "intent": "greet"
                     }
                 ]"""
+        )
 
         uploaded_file = SimpleUploadedFile(
             "examples.json", examples, "multipart/form-data"
@@ -1357,6 +1376,565 @@ class RepositoryExampleUploadTestCase(TestCase):
         response, content_data = self.request(self.user_token)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
+    def test_intent_and_entities(self):
+        self.request(self.owner_token)
+        example = RepositoryExample.objects.get(text="alright")
+        self.assertEqual(example.intent.text, "greet")
+        self.assertEqual(example.entities.get().entity.value, "_yes")
+        self.assertIsNotNone(self.repository.current_version().last_update)
+
+    def test_not_added(self):
+        self.request(self.owner_token)
+        examples = [
+            {"text": "yes", "language": "en", "entities": [], "intent": "greet"},
+            {"text": "no", "language": "en", "entities": [], "intent": "Deny"},
+            {
+                "text": "no",
+                "language": "en",
+                "entities": [{"entity": "no", "start": 0, "end": 5}],
+                "intent": "deny",
+            },
+            {"text": "nope", "language": "en", "entities": [], "intent": "deny"},
+            {"text": "nope", "language": "en", "entities": [], "intent": "deny"},
+        ]
+        response, content_data = self.request(
+            self.owner_token, json.dumps(examples).encode()
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(content_data.get("added"), 1)
+        self.assertEqual(content_data.get("not_added"), examples[:3] + examples[4:])
+
+    def test_invalid_json(self):
+        response, content_data = self.request(self.owner_token, b'[{"text": ')
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+    def test_invalid_json_after_batches(self):
+        examples = json.dumps(
+            [
+                {"text": text, "language": "en", "entities": [], "intent": "greet"}
+                for text in ["hi", "hello", "hey"]
+            ]
+        )
+        with mock.patch.object(ExamplesImporter, "BATCH_SIZE", 1):
+            response, content_data = self.request(
+                self.owner_token, examples[:-1].encode() + b', {"text": '
+            )
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        self.assertFalse(
+            RepositoryExample.objects.filter(
+                repository_version_language__repository_version__repository=self.repository
+            ).exists()
+        )
+        self.assertFalse(RepositoryIntent.objects.filter(text="greet").exists())
+
+    def test_trim(self):
+        examples = [
+            {
+                "text": " yes ",
+                "language": "en",
+                "entities": [{"entity": " _yes ", "start": 0, "end": 3}],
+                "intent": "greet",
+            }
+        ]
+        response, content_data = self.request(
+            self.owner_token, json.dumps(examples).encode()
+        )
+        self.assertEqual(content_data.get("added"), 1)
+        example = RepositoryExample.objects.get(text="yes")
+        self.assertEqual(example.entities.get().entity.value, "_yes")
+
+
+class RepositoryImportJobTestCase(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+        self.owner, self.owner_token = create_user_and_token("owner")
+        self.user, self.user_token = create_user_and_token()
+
+        self.repository = Repository.objects.create(
+            owner=self.owner.repository_owner,
+            name="Testing",
+            slug="test",
+            language=languages.LANGUAGE_EN,
+        )
+        self.repository_version = self.repository.current_version().repository_version
+
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def request(self, token, content, **data):
+        authorization_header = {"HTTP_AUTHORIZATION": "Token {}".format(token.key)}
+        data.update(
+            {
+                "file": SimpleUploadedFile("examples.json", content),
+                "repository_version": self.repository_version.pk,
+            }
+        )
+        request = self.factory.post(
+            "/v2/repository/import-jobs/",
+            data,
+            format="multipart",
+            **authorization_header,
+        )
+        with mock.patch(
+            "bothub.api.v2.repository.serializers.celery_app.send_task"
+        ) as send_task:
+            response = RepositoryImportJobViewSet.as_view({"post": "create"})(request)
+        response.render()
+        content_data = json.loads(response.content)
+        if response.status_code == status.HTTP_201_CREATED:
+            send_task.assert_called_once_with(
+                "import_examples",
+                args=[content_data.get("id")],
+                task_id=RepositoryImportJob.objects.get(
+                    pk=content_data.get("id")
+                ).task.id_queue,
+            )
+        return (response, content_data)
+
+    def retrieve(self, token, job_id, action="retrieve"):
+        authorization_header = {"HTTP_AUTHORIZATION": "Token {}".format(token.key)}
+        request = self.factory.get(
+            "/v2/repository/import-jobs/{}/".format(job_id), **authorization_header
+        )
+        response = RepositoryImportJobViewSet.as_view({"get": action})(
+            request, pk=job_id
+        )
+        if action == "retrieve":
+            response.render()
+        return response
+
+    def test_okay(self):
+        response, content_data = self.request(
+            self.owner_token,
+            b"""[
+                {"text": "yes", "intent": "affirm", "language": "en"},
+                {"text": "no", "intent": "deny", "language": "en",
+                 "entities": [{"entity": "answer", "start": 0, "end": 2}]},
+                {"text": "broken", "intent": "bad intent"}
+            ]""",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(content_data.get("status"), RepositoryQueueTask.STATUS_PENDING)
+        self.assertEqual(content_data.get("phase"), RepositoryImportJob.PHASE_UPLOADED)
+
+        job = RepositoryImportJob.objects.get(pk=content_data.get("id"))
+        self.assertEqual(
+            job.task.type_processing, RepositoryQueueTask.TYPE_PROCESSING_IMPORT
+        )
+        import_examples(job.pk)
+
+        content_data = json.loads(self.retrieve(self.owner_token, job.pk).content)
+        self.assertEqual(content_data.get("status"), RepositoryQueueTask.STATUS_SUCCESS)
+        self.assertEqual(content_data.get("phase"), RepositoryImportJob.PHASE_FINISHED)
+        self.assertEqual(content_data.get("processed"), 3)
+        self.assertEqual(content_data.get("added"), 2)
+        self.assertEqual(content_data.get("rejected"), 1)
+        self.assertTrue(content_data.get("has_rejected_file"))
+        self.assertEqual(
+            RepositoryExample.objects.filter(
+                repository_version_language__repository_version=self.repository_version
+            ).count(),
+            2,
+        )
+
+        response = self.retrieve(self.owner_token, job.pk, action="rejected")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            json.loads(b"".join(response.streaming_content)),
+            [{"text": "broken", "intent": "bad intent"}],
+        )
+
+    def test_rasa(self):
+        response, content_data = self.request(
+            self.owner_token,
+            json.dumps(
+                {
+                    "rasa_nlu_data": {
+                        "common_examples": [
+                            {"text": "oi", "intent": "greet", "entities": []}
+                        ]
+                    }
+                }
+            ).encode(),
+            file_format=RepositoryImportJob.FORMAT_RASA,
+            language=languages.LANGUAGE_PT,
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        import_examples(content_data.get("id"))
+
+        job = RepositoryImportJob.objects.get(pk=content_data.get("id"))
+        self.assertEqual(job.added, 1)
+        self.assertFalse(job.rejected_file)
+        self.assertTrue(
+            RepositoryExample.objects.filter(
+                text="oi", repository_version_language__language=languages.LANGUAGE_PT
+            ).exists()
+        )
+
+    def test_rasa_without_language(self):
+        response, content_data = self.request(
+            self.owner_token, b"{}", file_format=RepositoryImportJob.FORMAT_RASA
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("language", content_data.keys())
+
+    def test_invalid_json(self):
+        response, content_data = self.request(self.owner_token, b"[{")
+        import_examples(content_data.get("id"))
+
+        job = RepositoryImportJob.objects.get(pk=content_data.get("id"))
+        self.assertEqual(job.task.status, RepositoryQueueTask.STATUS_FAILED)
+        self.assertTrue(job.error)
+
+    def test_unexpected_error(self):
+        response, content_data = self.request(self.owner_token, b"[]")
+        job = RepositoryImportJob.objects.get(pk=content_data.get("id"))
+        file_name = job.file.name
+        self.assertTrue(default_storage.exists(file_name))
+
+        with mock.patch(
+            "bothub.common.tasks.iter_json_array", side_effect=RuntimeError("broken")
+        ):
+            with self.assertRaises(RuntimeError):
+                import_examples(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.task.status, RepositoryQueueTask.STATUS_FAILED)
+        self.assertEqual(job.error, "broken")
+        self.assertFalse(job.file)
+        self.assertFalse(default_storage.exists(file_name))
+
+    def test_permission_denied(self):
+        response, content_data = self.request(self.user_token, b"[]")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response, content_data = self.request(self.owner_token, b"[]")
+        response = self.retrieve(self.user_token, content_data.get("id"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class RepositoryDumpTestCase(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+        self.owner, self.owner_token = create_user_and_token("owner")
+        self.user, self.user_token = create_user_and_token()
+
+        self.repository = Repository.objects.create(
+            owner=self.owner.repository_owner,
+            name="Testing",
+            slug="test",
+            language=languages.LANGUAGE_EN,
+        )
+        self.repository_version = self.repository.current_version().repository_version
+        RepositoryExample.objects.create(
+            repository_version_language=self.repository.current_version(),
+            text="hi",
+            intent=RepositoryIntent.objects.create(
+                text="greet", repository_version=self.repository_version
+            ),
+        )
+
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def request(self, token, data, task_name="repository_dump"):
+        authorization_header = {"HTTP_AUTHORIZATION": "Token {}".format(token.key)}
+        request = self.factory.post(
+            "/v2/repository/dumps/", data, format="multipart", **authorization_header
+        )
+        with mock.patch(
+            "bothub.api.v2.repository.serializers.celery_app.send_task"
+        ) as send_task:
+            response = RepositoryDumpViewSet.as_view({"post": "create"})(request)
+        response.render()
+        content_data = json.loads(response.content)
+        if response.status_code == status.HTTP_201_CREATED:
+            send_task.assert_called_once_with(
+                task_name,
+                args=[content_data.get("id")],
+                task_id=RepositoryDump.objects.get(
+                    pk=content_data.get("id")
+                ).task.id_queue,
+            )
+        return (response, content_data)
+
+    def retrieve(self, token, dump_id, action="retrieve"):
+        authorization_header = {"HTTP_AUTHORIZATION": "Token {}".format(token.key)}
+        request = self.factory.get(
+            "/v2/repository/dumps/{}/".format(dump_id), **authorization_header
+        )
+        response = RepositoryDumpViewSet.as_view({"get": action})(request, pk=dump_id)
+        if action == "retrieve":
+            response.render()
+        return response
+
+    def test_okay(self):
+        response, content_data = self.request(
+            self.owner_token, {"repository": str(self.repository.uuid)}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(content_data.get("status"), RepositoryQueueTask.STATUS_PENDING)
+        repository_dump(content_data.get("id"))
+
+        dump = json.loads(
+            self.retrieve(self.owner_token, content_data.get("id")).content
+        )
+        self.assertEqual(dump.get("status"), RepositoryQueueTask.STATUS_SUCCESS)
+        self.assertTrue(dump.get("has_file"))
+        self.assertIn(
+            {"name": "examples", "file": "examples.ndjson", "rows": 1},
+            dump.get("manifest").get("tables"),
+        )
+
+        response = self.retrieve(self.owner_token, dump.get("id"), action="download")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        archive = b"".join(response.streaming_content)
+
+        response, content_data = self.request(
+            self.owner_token,
+            {
+                "repository": str(self.repository.uuid),
+                "dump_type": RepositoryDump.TYPE_RESTORE,
+                "file": SimpleUploadedFile("test.zip", archive),
+            },
+            task_name="repository_restore",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        repository_restore(content_data.get("id"))
+
+        restore = RepositoryDump.objects.get(pk=content_data.get("id"))
+        self.assertEqual(restore.task.status, RepositoryQueueTask.STATUS_SUCCESS)
+        self.assertFalse(restore.file)
+        self.assertEqual(self.repository.versions.count(), 2)
+        self.assertEqual(
+            RepositoryExample.objects.filter(
+                text="hi",
+                repository_version_language__repository_version__repository=self.repository,
+            ).count(),
+            2,
+        )
+
+    def test_restore_without_file(self):
+        response, content_data = self.request(
+            self.owner_token,
+            {
+                "repository": str(self.repository.uuid),
+                "dump_type": RepositoryDump.TYPE_RESTORE,
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("file", content_data.keys())
+
+    def test_invalid_archive(self):
+        response, content_data = self.request(
+            self.owner_token,
+            {
+                "repository": str(self.repository.uuid),
+                "dump_type": RepositoryDump.TYPE_RESTORE,
+                "file": SimpleUploadedFile("test.zip", b"not a zip"),
+            },
+            task_name="repository_restore",
+        )
+        repository_restore(content_data.get("id"))
+
+        restore = RepositoryDump.objects.get(pk=content_data.get("id"))
+        self.assertEqual(restore.task.status, RepositoryQueueTask.STATUS_FAILED)
+        self.assertTrue(restore.error)
+
+    def test_permission_denied(self):
+        response, content_data = self.request(
+            self.user_token, {"repository": str(self.repository.uuid)}
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response, content_data = self.request(
+            self.owner_token, {"repository": str(self.repository.uuid)}
+        )
+        response = self.retrieve(self.user_token, content_data.get("id"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class RasaUploadTestCase(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+        self.owner, self.owner_token = create_user_and_token("owner")
+        self.user, self.user_token = create_user_and_token()
+
+        self.repository = Repository.objects.create(
+            owner=self.owner.repository_owner,
+            name="Testing",
+            slug="test",
+            language=languages.LANGUAGE_EN,
+        )
+        self.repository_version = self.repository.current_version().repository_version
+
+        RepositoryExample.objects.create(
+            repository_version_language=self.repository.current_version(),
+            text="hi",
+            intent=RepositoryIntent.objects.create(
+                text="greet", repository_version=self.repository_version
+            ),
+        )
+
+    def request(self, token, data):
+        authorization_header = {"HTTP_AUTHORIZATION": "Token {}".format(token.key)}
+        request = self.factory.put(
+            "/v2/repository/upload-rasa-file/",
+            encode_multipart(
+                BOUNDARY,
+                {
+                    "file": SimpleUploadedFile("rasa.json", json.dumps(data).encode()),
+                    "language": languages.LANGUAGE_EN,
+                },
+            ),
+            content_type=MULTIPART_CONTENT,
+            **authorization_header,
+        )
+        response = RasaUploadViewSet.as_view({"put": "update"})(
+            request,
+            repository__uuid=str(self.repository.uuid),
+            pk=self.repository_version.pk,
+        )
+        response.render()
+        content_data = json.loads(response.content)
+        return (response, content_data)
+
+    def test_okay(self):
+        response, content_data = self.request(
+            self.owner_token,
+            {
+                "rasa_nlu_data": {
+                    "common_examples": [
+                        {"text": "hi", "intent": "greet", "entities": []},
+                        {
+                            "text": "show me chinese restaurants",
+                            "intent": "restaurant_search",
+                            "entities": [
+                                {
+                                    "start": 8,
+                                    "end": 15,
+                                    "value": "chinese",
+                                    "entity": "cuisine",
+                                }
+                            ],
+                        },
+                    ],
+                    "entity_synonyms": [
+                        {"value": "chinese", "synonyms": ["chines", "chinés"]}
+                    ],
+                    "regex_features": [{"name": "zipcode", "pattern": "[0-9]{5}"}],
+                }
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(content_data.get("added"), 1)
+        self.assertEqual(len(content_data.get("not_added")), 1)
+        self.assertEqual(
+            content_data.get("ignored"),
+            {"regex_features": 1, "entity_synonyms": 1, "lookup_tables": 0},
+        )
+        example = RepositoryExample.objects.get(text="show me chinese restaurants")
+        self.assertEqual(example.intent.text, "restaurant_search")
+        self.assertEqual(example.entities.get().entity.value, "cuisine")
+
+    def test_invalid_file(self):
+        response, content_data = self.request(self.owner_token, {"rasa_nlu_data": {}})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_permission_denied(self):
+        response, content_data = self.request(
+            self.user_token, {"rasa_nlu_data": {"common_examples": []}}
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class RepositoryMigrateTestCase(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+        self.owner, self.owner_token = create_user_and_token("owner")
+
+        self.repository = Repository.objects.create(
+            owner=self.owner.repository_owner,
+            name="Testing",
+            slug="test",
+            language=languages.LANGUAGE_EN,
+        )
+        self.repository_version = self.repository.current_version().repository_version
+
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def request(self, token, data):
+        authorization_header = {"HTTP_AUTHORIZATION": "Token {}".format(token.key)}
+        data.update(
+            {
+                "repository_version": self.repository_version.pk,
+                "language": languages.LANGUAGE_EN,
+            }
+        )
+        request = self.factory.post(
+            "/v2/repository/repository-migrate/",
+            data,
+            format="multipart",
+            **authorization_header,
+        )
+        with mock.patch(
+            "bothub.api.v2.repository.serializers.celery_app.send_task"
+        ) as send_task:
+            response = RepositoryMigrateViewSet.as_view({"post": "create"})(request)
+        response.render()
+        content_data = json.loads(response.content)
+        return (response, content_data, send_task)
+
+    def test_file(self):
+        response, content_data, send_task = self.request(
+            self.owner_token,
+            {
+                "classifier": "rasa_markdown",
+                "file": SimpleUploadedFile("nlu.md", b"## intent:greet\n- hi"),
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        args = send_task.call_args[1].get("args")
+        self.assertEqual(
+            args[:4], [self.repository_version.pk, None, "en", "rasa_markdown"]
+        )
+        self.assertTrue(args[4].startswith("migrations/"))
+
+    def test_file_required(self):
+        response, content_data, send_task = self.request(
+            self.owner_token, {"classifier": "dialogflow"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("file", content_data.keys())
+
+    def test_auth_token_required(self):
+        response, content_data, send_task = self.request(
+            self.owner_token, {"classifier": "wit"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("auth_token", content_data.keys())
+        send_task.assert_not_called()
+
 
 class RepositoryExampleDestroyTestCase(TestCase):
     def setUp(self):
@@ -1895,6 +2473,103 @@ class TrainRepositoryTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
 
+class BulkTrainTestCase(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+        self.owner, self.owner_token = create_user_and_token("owner")
+        self.user, self.user_token = create_user_and_token()
+
+        self.repository = Repository.objects.create(
+            owner=self.owner,
+            name="Testing",
+            slug="test",
+            language=languages.LANGUAGE_EN,
+        )
+        self.empty_repository = Repository.objects.create(
+            owner=self.owner, name="Empty", slug="empty", language=languages.LANGUAGE_EN
+        )
+        self.empty_repository.current_version()
+
+        for intent, texts in [("greet", ["hi", "hello"]), ("bye", ["bye", "see ya"])]:
+            repository_intent = RepositoryIntent.objects.create(
+                text=intent,
+                repository_version=self.repository.current_version().repository_version,
+            )
+            for text in texts:
+                RepositoryExample.objects.create(
+                    repository_version_language=self.repository.current_version(),
+                    text=text,
+                    intent=repository_intent,
+                )
+
+    def request(self, token, data):
+        authorization_header = {"HTTP_AUTHORIZATION": "Token {}".format(token.key)}
+        request = self.factory.post(
+            "/v2/repository/train/bulk/",
+            json.dumps(data),
+            content_type="application/json",
+            **authorization_header,
+        )
+        response = RepositoryBulkTrainViewSet.as_view({"post": "create"})(request)
+        response.render()
+        content_data = json.loads(response.content)
+        return (response, content_data)
+
+    def test_okay(self):
+        response, content_data = self.request(
+            self.owner_token,
+            {
+                "repositories": [
+                    str(self.repository.uuid),
+                    str(self.empty_repository.uuid),
+                ]
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            content_data.get("scheduled"),
+            [self.repository.current_version().repository_version.pk],
+        )
+        self.assertEqual(
+            content_data.get("skipped"),
+            [self.empty_repository.current_version().repository_version.pk],
+        )
+        self.assertEqual(content_data.get("pending"), 1)
+
+    def test_already_scheduled(self):
+        self.request(self.owner_token, {"repositories": [str(self.repository.uuid)]})
+        response, content_data = self.request(
+            self.owner_token, {"repositories": [str(self.repository.uuid)]}
+        )
+        self.assertEqual(content_data.get("scheduled"), [])
+        self.assertEqual(RepositoryTrainSchedule.objects.count(), 1)
+
+    def test_repository_not_found(self):
+        response, content_data = self.request(
+            self.owner_token, {"repositories": [str(uuid.uuid4())]}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("repositories", content_data)
+
+    def test_permission_denied(self):
+        response, content_data = self.request(
+            self.user_token, {"repositories": [str(self.repository.uuid)]}
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_depth(self):
+        self.request(self.owner_token, {"repositories": [str(self.repository.uuid)]})
+        request = self.factory.get(
+            "/v2/repository/train/bulk/",
+            **{"HTTP_AUTHORIZATION": "Token {}".format(self.owner_token.key)},
+        )
+        response = RepositoryBulkTrainViewSet.as_view({"get": "list"})(request)
+        response.render()
+        content_data = json.loads(response.content)
+        self.assertEqual(content_data, {"pending": 1, "processing": 0})
+
+
 class AnalyzeRepositoryTestCase(TestCase):
     def setUp(self):
         self.factory = RequestFactory()
@@ -2179,10 +2854,12 @@ class RepositoryExamplesBulkTestCase(TestCase):
             },
         ]
 
-    def request(self, token):
+    def request(self, token, partial_success=False):
         authorization_header = {"HTTP_AUTHORIZATION": "Token {}".format(token.key)}
         request = self.factory.post(
-            "/v2/repository/example-bulk/",
+            "/v2/repository/example-bulk/{}".format(
+                "?partial_success=true" if partial_success else ""
+            ),
             data=json.dumps(self.data),
             content_type="application/json",
             **authorization_header,
@@ -2194,18 +2871,36 @@ class RepositoryExamplesBulkTestCase(TestCase):
 
     def test_okay(self):
         response, content_data = self.request(self.owner_token)
-        for count, content in enumerate(content_data):
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(content_data.get("errors"), [{}, {}])
+        for count, pk in enumerate(content_data.get("ids")):
+            example = RepositoryExample.objects.get(pk=pk)
             self.assertEqual(
-                content.get("repository_version"),
+                example.repository_version_language.repository_version.pk,
                 self.data[count].get("repository_version"),
             )
-            self.assertEqual(content.get("text"), self.data[count].get("text"))
-            self.assertEqual(content.get("intent"), self.data[count].get("intent"))
-            self.assertEqual(content.get("language"), self.data[count].get("language"))
-            self.assertNotEqual(
-                content.get("entities"), self.data[count].get("entities")
-            )
+            self.assertEqual(example.text, self.data[count].get("text"))
+            self.assertEqual(example.intent.text, self.data[count].get("intent"))
+            self.assertEqual(example.language, self.data[count].get("language"))
+            self.assertEqual(example.entities.get().entity.value, "_yes")
+
+    def test_duplicated(self):
+        self.data.append(self.data[0])
+        response, content_data = self.request(self.owner_token)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(content_data[:2], [{}, {}])
+        self.assertIn("non_field_errors", content_data[2])
+        self.assertFalse(RepositoryExample.objects.exists())
+
+    def test_partial_success(self):
+        self.data.append(self.data[0])
+        self.data.append(dict(self.data[0], intent="Not valid"))
+        response, content_data = self.request(self.owner_token, partial_success=True)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(content_data.get("ids")[2:], [None, None])
+        self.assertIn("non_field_errors", content_data.get("errors")[2])
+        self.assertIn("intent", content_data.get("errors")[3])
+        self.assertEqual(RepositoryExample.objects.count(), 2)
 
     def test_null_data(self):
         self.data = {}
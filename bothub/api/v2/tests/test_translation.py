@@ -1,16 +1,24 @@
+import csv
+import io
 import json
 import uuid
 
+import openpyxl
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
 from django.test import RequestFactory
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
 from rest_framework import status
 
 from bothub.common import languages
+from bothub.common.exporters import write_translation_xlsx
 from bothub.common.models import Repository, RepositoryExampleEntity, RepositoryIntent
 from bothub.common.models import RepositoryExample
 from bothub.common.models import RepositoryTranslatedExample
+from bothub.common.models import RepositoryTranslatedExampleEntity
 
 from bothub.api.v2.translation.views import RepositoryTranslatedExampleViewSet
+from bothub.api.v2.translation.views import RepositoryTranslatedExporterViewSet
 
 from .utils import create_user_and_token
 
@@ -515,3 +523,300 @@ class TranslationsViewTest(TestCase):
             content_data.get("results")[0].get("original_example"), self.example.pk
         )
         self.assertEqual(content_data.get("results")[0].get("text"), "oi")
+
+
+class RepositoryTranslatedExporterTestCase(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+        self.owner, self.owner_token = create_user_and_token("owner")
+        self.user, self.user_token = create_user_and_token()
+
+        self.repository = Repository.objects.create(
+            owner=self.owner.repository_owner,
+            name="Testing",
+            slug="test",
+            language=languages.LANGUAGE_EN,
+        )
+        self.repository_version = self.repository.current_version().repository_version
+        intent = RepositoryIntent.objects.create(
+            text="greet", repository_version=self.repository_version
+        )
+
+        self.example = RepositoryExample.objects.create(
+            repository_version_language=self.repository.current_version(),
+            text="hi mary",
+            intent=intent,
+        )
+        RepositoryExampleEntity.objects.create(
+            repository_example=self.example, start=3, end=7, entity="name"
+        )
+        translated = RepositoryTranslatedExample.objects.create(
+            original_example=self.example,
+            language=languages.LANGUAGE_PT,
+            text="oi mary",
+        )
+        RepositoryTranslatedExampleEntity.objects.create(
+            repository_translated_example=translated, start=3, end=7, entity="name"
+        )
+        self.example_2 = RepositoryExample.objects.create(
+            repository_version_language=self.repository.current_version(),
+            text="hello",
+            intent=intent,
+        )
+
+    def request(self, token, **params):
+        params.update(
+            {
+                "of_the_language": languages.LANGUAGE_EN,
+                "for_the_language": languages.LANGUAGE_PT,
+            }
+        )
+        request = self.factory.get(
+            "/v2/repository/translation-export/",
+            params,
+            HTTP_AUTHORIZATION="Token {}".format(token.key),
+        )
+        response = RepositoryTranslatedExporterViewSet.as_view({"get": "retrieve"})(
+            request,
+            repository__uuid=self.repository.uuid,
+            pk=self.repository_version.pk,
+        )
+        return response
+
+    def test_xlsx(self):
+        response = self.request(self.owner_token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        workbook = openpyxl.load_workbook(
+            io.BytesIO(b"".join(response.streaming_content))
+        )
+        rows = [
+            [cell.value for cell in row]
+            for row in workbook["Translate"].iter_rows(min_row=4)
+        ]
+        self.assertEqual(rows[0][1], "name")
+        self.assertEqual(
+            rows[10][1:7],
+            [
+                "ID",
+                "Repository Version",
+                "Language",
+                "Original Text",
+                "Translate",
+                "Translation Error",
+            ],
+        )
+        self.assertEqual(
+            rows[11][1:6],
+            [
+                str(self.example.pk),
+                str(self.repository_version.pk),
+                languages.LANGUAGE_EN,
+                "hi [mary](name)",
+                "oi [mary](name)",
+            ],
+        )
+        self.assertEqual(
+            rows[12][1:6],
+            [
+                str(self.example_2.pk),
+                str(self.repository_version.pk),
+                languages.LANGUAGE_EN,
+                "hello",
+                None,
+            ],
+        )
+
+    def test_csv(self):
+        response = self.request(self.owner_token, file_format="csv")
+        content = b"".join(response.streaming_content).decode()
+        self.assertEqual(
+            list(csv.reader(io.StringIO(content))),
+            [
+                ["id", "repository_version", "language", "text", "translation"],
+                [
+                    str(self.example.pk),
+                    str(self.repository_version.pk),
+                    "en",
+                    "hi [mary](name)",
+                    "oi [mary](name)",
+                ],
+                [
+                    str(self.example_2.pk),
+                    str(self.repository_version.pk),
+                    "en",
+                    "hello",
+                    "",
+                ],
+            ],
+        )
+
+    def test_ndjson_without_translation(self):
+        response = self.request(
+            self.owner_token, file_format="ndjson", with_translation=False
+        )
+        content = b"".join(response.streaming_content).decode()
+        self.assertEqual(
+            [json.loads(line) for line in content.splitlines()],
+            [
+                {
+                    "id": self.example_2.pk,
+                    "repository_version": self.repository_version.pk,
+                    "language": "en",
+                    "text": "hello",
+                    "translation": None,
+                }
+            ],
+        )
+
+    def test_permission_denied(self):
+        response = self.request(self.user_token)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class RepositoryTranslatedImporterTestCase(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+        self.owner, self.owner_token = create_user_and_token("owner")
+        self.user, self.user_token = create_user_and_token()
+
+        self.repository = Repository.objects.create(
+            owner=self.owner.repository_owner,
+            name="Testing",
+            slug="test",
+            language=languages.LANGUAGE_EN,
+        )
+        self.repository_version = self.repository.current_version().repository_version
+        intent = RepositoryIntent.objects.create(
+            text="greet", repository_version=self.repository_version
+        )
+
+        self.example = RepositoryExample.objects.create(
+            repository_version_language=self.repository.current_version(),
+            text="hi mary",
+            intent=intent,
+        )
+        RepositoryExampleEntity.objects.create(
+            repository_example=self.example, start=3, end=7, entity="name"
+        )
+        RepositoryTranslatedExample.objects.create(
+            original_example=self.example,
+            language=languages.LANGUAGE_PT,
+            text="oi mary",
+        )
+        self.example_2 = RepositoryExample.objects.create(
+            repository_version_language=self.repository.current_version(),
+            text="hello",
+            intent=intent,
+        )
+
+    def row(self, example_id, translation, repository_version=None):
+        return {
+            "id": example_id,
+            "repository_version": repository_version or self.repository_version.pk,
+            "language": languages.LANGUAGE_EN,
+            "text": "",
+            "translation": translation,
+        }
+
+    def request(self, token, rows):
+        file = io.BytesIO()
+        write_translation_xlsx(rows, ["name"], file)
+        data = {
+            "language": languages.LANGUAGE_PT,
+            "file": SimpleUploadedFile("bothub.xlsx", file.getvalue()),
+        }
+        request = self.factory.put(
+            "/v2/repository/translation-export/",
+            encode_multipart(BOUNDARY, data),
+            content_type=MULTIPART_CONTENT,
+            HTTP_AUTHORIZATION="Token {}".format(token.key),
+        )
+        response = RepositoryTranslatedExporterViewSet.as_view({"put": "update"})(
+            request,
+            repository__uuid=self.repository.uuid,
+            pk=self.repository_version.pk,
+        )
+        return response
+
+    def rejected_rows(self, response):
+        workbook = openpyxl.load_workbook(
+            io.BytesIO(b"".join(response.streaming_content))
+        )
+        rows = [
+            [cell.value for cell in row]
+            for row in workbook["Translate"].iter_rows(min_row=15)
+        ]
+        return [row[1:7] for row in rows]
+
+    def test_okay(self):
+        response = self.request(
+            self.owner_token,
+            [
+                self.row(self.example.pk, "ola [maria](name)"),
+                self.row(self.example_2.pk, "ola"),
+                self.row(self.example_2.pk, "ola [mundo](other)"),
+                self.row(0, "ola"),
+            ],
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        translated = RepositoryTranslatedExample.objects.get(
+            original_example=self.example, language=languages.LANGUAGE_PT
+        )
+        self.assertEqual(translated.text, "ola maria")
+        self.assertEqual(
+            [
+                (entity.start, entity.end, entity.entity.value)
+                for entity in translated.entities.all()
+            ],
+            [(4, 9, "name")],
+        )
+        self.assertEqual(
+            RepositoryTranslatedExample.objects.get(
+                original_example=self.example_2
+            ).text,
+            "ola",
+        )
+        self.assertEqual(
+            self.rejected_rows(response),
+            [
+                [
+                    str(self.example_2.pk),
+                    str(self.repository_version.pk),
+                    languages.LANGUAGE_EN,
+                    None,
+                    "ola [mundo](other)",
+                    "Entities must match",
+                ],
+                [
+                    "0",
+                    str(self.repository_version.pk),
+                    languages.LANGUAGE_EN,
+                    None,
+                    "ola",
+                    "Sentence does not exist",
+                ],
+            ],
+        )
+
+    def test_version_mismatch(self):
+        response = self.request(
+            self.owner_token,
+            [
+                self.row(self.example_2.pk, "ola"),
+                self.row(self.example.pk, "ola", self.repository_version.pk + 1),
+            ],
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(
+            RepositoryTranslatedExample.objects.filter(
+                original_example=self.example_2
+            ).exists()
+        )
+
+    def test_permission_denied(self):
+        response = self.request(self.user_token, [])
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
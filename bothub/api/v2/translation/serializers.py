@@ -80,7 +80,7 @@ class RepositoryTranslatedExampleSerializer(serializers.ModelSerializer):
     )
     from_language = serializers.SerializerMethodField(required=False)
     language = serializers.ChoiceField(LANGUAGE_CHOICES, label=_("Language"))
-    has_valid_entities = serializers.SerializerMethodField()
+    has_valid_entities = serializers.BooleanField(read_only=True)
     entities = RepositoryTranslatedExampleEntitySeralizer(
         many=True, style={"text_field": "text"}
     )
@@ -88,9 +88,6 @@ class RepositoryTranslatedExampleSerializer(serializers.ModelSerializer):
     def get_from_language(self, obj):
         return obj.original_example.repository_version_language.language
 
-    def get_has_valid_entities(self, obj):
-        return obj.has_valid_entities
-
     def create(self, validated_data):
         entities_data = validated_data.pop("entities")
 
@@ -123,6 +120,10 @@ class RepositoryTranslatedExporterSerializer(serializers.Serializer):
 
 
 class RepositoryTranslatedImportSerializer(serializers.Serializer):
+    FORMAT_XLSX = "xlsx"
+    FORMAT_CSV = "csv"
+    FORMAT_NDJSON = "ndjson"
+
     of_the_language = serializers.ChoiceField(
         LANGUAGE_CHOICES, label=_("Language"), required=True
     )
@@ -130,3 +131,6 @@ class RepositoryTranslatedImportSerializer(serializers.Serializer):
         LANGUAGE_CHOICES, label=_("Language"), required=True
     )
     with_translation = serializers.BooleanField(default=True)
+    file_format = serializers.ChoiceField(
+        [FORMAT_XLSX, FORMAT_CSV, FORMAT_NDJSON], default=FORMAT_XLSX
+    )
@@ -1,20 +1,19 @@
-import re
+import tempfile
+from zipfile import BadZipFile
 
-import openpyxl
+from django.db import transaction
 from django.db.models import Count, Q
-from django.http import HttpResponse
+from django.http import FileResponse, StreamingHttpResponse
 from django.utils.decorators import method_decorator
 from drf_yasg2 import openapi
 from drf_yasg2.utils import swagger_auto_schema
-from openpyxl.drawing.image import Image
-from openpyxl.writer.excel import save_virtual_workbook
+from openpyxl.utils.exceptions import InvalidFileException
 from rest_framework import mixins
 from rest_framework import permissions
-from rest_framework.exceptions import APIException
+from rest_framework.exceptions import UnsupportedMediaType, ValidationError
 from rest_framework.parsers import MultiPartParser
 from rest_framework.viewsets import GenericViewSet
 
-from bothub import utils, settings
 from bothub.api.v2.metadata import Metadata
 from bothub.api.v2.mixins import MultipleFieldLookupMixin
 from bothub.api.v2.translation.filters import TranslationsFilter
@@ -27,13 +26,17 @@ from bothub.api.v2.translation.serializers import (
     RepositoryTranslatedExporterSerializer,
     RepositoryTranslatedImportSerializer,
 )
-from bothub.common.models import RepositoryExample
-from bothub.common.models import RepositoryExampleEntity
-from bothub.common.models import (
-    RepositoryTranslatedExample,
-    RepositoryVersion,
-    RepositoryTranslatedExampleEntity,
+from bothub.common.exporters import (
+    get_translation_entities,
+    iter_ndjson,
+    iter_translation_csv,
+    iter_translation_rows,
+    write_translation_xlsx,
 )
+from bothub.common.exceptions import TranslationImportVersionMismatch
+from bothub.common.importers import TranslationsImporter
+from bothub.common.models import RepositoryExample
+from bothub.common.models import RepositoryTranslatedExample, RepositoryVersion
 
 
 class RepositoryTranslatedExampleViewSet(
@@ -105,6 +108,13 @@ class RepositoryTranslatedExampleViewSet(
                 type=openapi.TYPE_STRING,
                 required=True,
             ),
+            openapi.Parameter(
+                "file_format",
+                openapi.IN_QUERY,
+                description="Format of the exported file: xlsx, csv or ndjson",
+                type=openapi.TYPE_STRING,
+                default="xlsx",
+            ),
         ]
     ),
 )
@@ -126,7 +136,7 @@ class RepositoryTranslatedExporterViewSet(
     parser_classes = (MultiPartParser,)
     metadata_class = Metadata
 
-    def retrieve(self, request, *args, **kwargs):  # pragma: no cover
+    def retrieve(self, request, *args, **kwargs):
         repository_version = self.get_object()
 
         serializer = RepositoryTranslatedImportSerializer(data=request.query_params)
@@ -158,188 +168,56 @@ class RepositoryTranslatedExporterViewSet(
                 translation_count=0,
             )
 
-        examples = examples.order_by("created_at")
-
-        workbook = openpyxl.load_workbook(
-            f"{settings.STATIC_ROOT}/bothub/exporter/example.xlsx"
-        )
-        worksheet = workbook.get_sheet_by_name("Translate")
-
-        img = Image(f"{settings.STATIC_ROOT}/bothub/exporter/bothub.png")
-        img.width = 210.21
-        img.height = 60.69
-
-        worksheet.add_image(img, "B1")
+        rows = iter_translation_rows(examples, for_the_language)
+        file_format = serializer.data.get("file_format")
 
-        entities_list = []
-
-        for count, example in enumerate(examples, start=14):
-            worksheet.insert_rows(count)
-            worksheet.cell(row=count, column=2, value=str(example.pk))
-            worksheet.cell(
-                row=count,
-                column=3,
-                value=str(example.repository_version_language.repository_version.pk),
+        if file_format == RepositoryTranslatedImportSerializer.FORMAT_CSV:
+            response = StreamingHttpResponse(
+                iter_translation_csv(rows), content_type="text/csv"
             )
-            worksheet.cell(
-                row=count,
-                column=4,
-                value=str(example.repository_version_language.language),
+        elif file_format == RepositoryTranslatedImportSerializer.FORMAT_NDJSON:
+            response = StreamingHttpResponse(
+                iter_ndjson(rows), content_type="application/x-ndjson"
             )
-
-            text = example.text
-            entities = RepositoryExampleEntity.objects.filter(
-                repository_example=example
-            ).order_by("start")
-            count_entity = 0
-            for entity in entities:
-                if entity.entity.value not in entities_list:
-                    entities_list.append(entity.entity.value)
-                text = utils.format_entity(
-                    text=text,
-                    entity=entity.entity.value,
-                    start=entity.start + count_entity,
-                    end=entity.end + count_entity,
-                )
-                count_entity += len(entity.entity.value) + 4
-            worksheet.cell(row=count, column=5, value=str(text))
-
-            translated = RepositoryTranslatedExample.objects.filter(
-                original_example=example.pk, language=for_the_language
+        else:
+            file = tempfile.TemporaryFile()
+            write_translation_xlsx(rows, get_translation_entities(examples), file)
+            file.seek(0)
+            response = FileResponse(
+                file,
+                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             )
-            if translated:
-                translated = translated.first()
-                text_translated = translated.text
-                entities_translate = RepositoryTranslatedExampleEntity.objects.filter(
-                    repository_translated_example=translated
-                ).order_by("start")
-                count_entity = 0
-                for entity in entities_translate:
-                    text_translated = utils.format_entity(
-                        text=text_translated,
-                        entity=entity.entity.value,
-                        start=entity.start + count_entity,
-                        end=entity.end + count_entity,
-                    )
-                    count_entity += len(entity.entity.value) + 4
-                worksheet.cell(row=count, column=6, value=str(text_translated))
-
-        for count, entity in enumerate(entities_list, start=4):
-            worksheet.insert_rows(count)
-            worksheet.cell(row=count, column=2, value=str(entity))
-
-        response = HttpResponse(
-            content=save_virtual_workbook(workbook),
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        response["Content-Disposition"] = "attachment; filename=bothub.{}".format(
+            file_format
         )
-        response["Content-Disposition"] = "attachment; filename=bothub.xlsx"
         return response
 
-    def update(self, request, *args, **kwargs):  # pragma: no cover
+    def update(self, request, *args, **kwargs):
+        repository_version = self.get_object()
+
         serializer = RepositoryTranslatedExporterSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        for_language = serializer.data.get("language", None)
-
-        workbook = openpyxl.load_workbook(filename=request.data.get("file"))
-        worksheet = workbook.get_sheet_by_name("Translate")
-        columns = ["ID", "Repository Version", "Language"]
-
-        examples_success = []
-
-        find = False
-        for count, row in enumerate(worksheet.iter_rows(), start=1):
-            if (
-                row[1].value in columns
-                and row[2].value in columns
-                and row[3].value in columns
-            ):
-                find = True
-                continue
-            if find:
-                example_id = int(re.sub("[^0-9]", "", row[1].value))
-                repository_version = int(row[2].value)
-                text_translated = row[5].value
-
-                if not int(kwargs.get("pk")) == repository_version:
-                    raise APIException(  # pragma: no cover
-                        {
-                            "detail": "Import version is different from the selected version"
-                        },
-                        code=400,
-                    )
-
-                if text_translated:
-                    example = RepositoryExample.objects.filter(
-                        pk=example_id,
-                        repository_version_language__repository_version=repository_version,
-                        repository_version_language__repository_version__repository=kwargs.get(
-                            "repository__uuid"
-                        ),
-                    )
-                    if example.count() == 0:
-                        worksheet.cell(
-                            row=count, column=7, value="Sentence does not exist"
-                        )
-                        continue
-
-                    example = example.first()
-
-                    entity_validation = False
-
-                    for entity in utils.find_entities_in_example(text_translated):
-                        original_text_count_entity = RepositoryExampleEntity.objects.filter(
-                            repository_example=example,
-                            entity__repository_version=kwargs.get("pk"),
-                            entity__value=entity.get("entity"),
-                        ).count()
-
-                        if original_text_count_entity == 0:
-                            entity_validation = True
-                            worksheet.cell(
-                                row=count, column=7, value="Entities must match"
-                            )
-                            break
-
-                    if entity_validation:
-                        continue
-
-                    translated_examples = RepositoryTranslatedExample.objects.filter(
-                        original_example=example, language=for_language
-                    )
-
-                    if translated_examples.count() > 0:
-                        translated_examples.delete()
-
-                    version_language = example.repository_version_language.repository_version.get_version_language(
-                        language=for_language
-                    )
-
-                    translated = RepositoryTranslatedExample.objects.create(
-                        repository_version_language=version_language,
-                        original_example=example,
-                        language=for_language,
-                        text=utils.get_without_entity(text_translated),
-                        clone_repository=True,
-                    )
-
-                    for translated_entity in utils.find_entities_in_example(
-                        text_translated
-                    ):
-                        RepositoryTranslatedExampleEntity.objects.create(
-                            repository_translated_example=translated,
-                            start=translated_entity["start"],
-                            end=translated_entity["end"],
-                            entity=translated_entity["entity"],
-                        )
-
-                examples_success.append(count)
-
-        for r in reversed(examples_success):
-            worksheet.delete_rows(r)
+        importer = TranslationsImporter(
+            repository_version, serializer.validated_data.get("language")
+        )
+        try:
+            with transaction.atomic():
+                importer.import_file(serializer.validated_data.get("file"))
+        except TranslationImportVersionMismatch:
+            raise ValidationError(
+                {"detail": "Import version is different from the selected version"}
+            )
+        except (KeyError, InvalidFileException, BadZipFile):
+            raise UnsupportedMediaType(
+                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
 
-        response = HttpResponse(
-            content=save_virtual_workbook(workbook),
+        file = tempfile.TemporaryFile()
+        importer.save(file)
+        file.seek(0)
+        response = FileResponse(
+            file,
             content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         )
         response["Content-Disposition"] = "attachment; filename=bothub.xlsx"
@@ -4,12 +4,13 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import mixins
 from rest_framework.decorators import action
 from rest_framework.exceptions import PermissionDenied, APIException
-from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.filters import OrderingFilter
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
 from bothub.api.v2.example.serializers import RepositoryExampleSerializer
+from bothub.api.v2.search import IndexedSearchFilter
 from bothub.api.v2.translator.filters import (
     TranslatorExamplesFilter,
     RepositoryTranslatorFilter,
@@ -57,8 +58,8 @@ class TranslatorExamplesViewSet(mixins.ListModelMixin, GenericViewSet):
     queryset = RepositoryExample.objects
     serializer_class = RepositoryExampleSerializer
     filter_class = TranslatorExamplesFilter
-    filter_backends = [OrderingFilter, SearchFilter, DjangoFilterBackend]
-    search_fields = ["$text", "^text", "=text"]
+    filter_backends = [OrderingFilter, IndexedSearchFilter, DjangoFilterBackend]
+    search_fields = ["text"]
     ordering_fields = ["created_at"]
     authentication_classes = [TranslatorAuthentication]
     permission_classes = [RepositoryExampleTranslatorPermission]
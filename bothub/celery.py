@@ -16,6 +16,7 @@ app.conf.beat_schedule = {
         "task": "bothub.common.tasks.trainings_check_task",
         "schedule": 5.0,
     },
+    "dispatch-trains": {"task": "dispatch_trains", "schedule": 10.0},
     "delete-nlp-logs": {
         "task": "bothub.common.tasks.delete_nlp_logs",
         "schedule": schedules.crontab(hour="22", minute=0),
@@ -28,6 +29,11 @@ app.conf.beat_schedule = {
         "task": "bothub.common.tasks.repository_score",
         "schedule": schedules.crontab(minute="*/5"),
     },
+    "flush-usage-counters": {"task": "flush_usage_counters", "schedule": 60.0},
+    "update-dataset-fingerprints": {
+        "task": "update_dataset_fingerprints",
+        "schedule": 60.0,
+    },
 }
 
 
@@ -0,0 +1,77 @@
+import uuid
+from collections import defaultdict
+from datetime import datetime
+
+from django_redis import get_redis_connection
+from redis.exceptions import LockError, ResponseError
+
+# the counters are fields "<report date>:<version language>:<user>:<counter>"
+# of a single hash, the flush moves the hash to FLUSHING_KEY before reading it
+# so the predictions counted during the flush are kept for the next one
+COUNTERS_KEY = "bothub:usage-counters"
+FLUSHING_KEY = "bothub:usage-counters:flushing"
+LOCK_KEY = "bothub:usage-counters:lock"
+LOCK_TIMEOUT = 300
+# field of the flushing hash with the id its counts are saved with
+FLUSH_ID_FIELD = "flush_id"
+
+
+def increment(
+    repository_version_language_id, user_id, report_date, count_reports, count_logs
+):
+    field = f"{report_date.isoformat()}:{repository_version_language_id}:{user_id}"
+    pipeline = get_redis_connection().pipeline(transaction=False)
+    pipeline.hincrby(COUNTERS_KEY, f"{field}:reports", count_reports)
+    if count_logs:
+        pipeline.hincrby(COUNTERS_KEY, f"{field}:logs", count_logs)
+    pipeline.execute()
+
+
+def flush(add_counts):
+    """
+    Passes the counters and the id of the flush to add_counts and deletes them
+    after it returns. The counters of a failed flush are passed again to the
+    next one with the same id, so add_counts can skip the ones it saved
+    """
+    redis = get_redis_connection()
+    lock = redis.lock(LOCK_KEY, timeout=LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        return 0
+    try:
+        try:
+            redis.renamenx(COUNTERS_KEY, FLUSHING_KEY)
+        except ResponseError:
+            # nothing was counted since the last flush
+            pass
+
+        fields = redis.hgetall(FLUSHING_KEY)
+        if not fields:
+            return 0
+        # a hash left by a failed flush keeps its id
+        redis.hsetnx(FLUSHING_KEY, FLUSH_ID_FIELD, str(uuid.uuid4()))
+        flush_id = redis.hget(FLUSHING_KEY, FLUSH_ID_FIELD).decode()
+
+        counts = defaultdict(lambda: [0, 0])
+        for field, value in fields.items():
+            field = field.decode()
+            if field == FLUSH_ID_FIELD:
+                continue
+            report_date, language, user, counter = field.split(":")
+            key = (
+                int(language),
+                int(user),
+                datetime.strptime(report_date, "%Y-%m-%d").date(),
+            )
+            counts[key][counter == "logs"] += int(value)
+
+        add_counts(
+            [(*key, reports, logs) for key, (reports, logs) in counts.items()], flush_id
+        )
+        redis.delete(FLUSHING_KEY)
+        return len(counts)
+    finally:
+        try:
+            lock.release()
+        except LockError:
+            # the lock expired, another flush may be running
+            pass
@@ -0,0 +1,424 @@
+import io
+import json
+import zipfile
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from bothub.common.exceptions import BotHubException
+from bothub.common.models import (
+    RepositoryEntity,
+    RepositoryEntityGroup,
+    RepositoryEvaluate,
+    RepositoryEvaluateEntity,
+    RepositoryEvaluateResult,
+    RepositoryEvaluateResultEntity,
+    RepositoryEvaluateResultIntent,
+    RepositoryEvaluateResultLog,
+    RepositoryEvaluateResultScore,
+    RepositoryExample,
+    RepositoryExampleEntity,
+    RepositoryIntent,
+    RepositoryTranslatedExample,
+    RepositoryTranslatedExampleEntity,
+    RepositoryVersion,
+    RepositoryVersionLanguage,
+)
+
+DUMP_FORMAT = "bothub-dump"
+DUMP_FORMAT_VERSION = 1
+DUMP_BATCH_SIZE = 1000
+MANIFEST = "manifest.json"
+
+SCORE_FIELDS = ["precision", "f1_score", "accuracy", "recall", "support"]
+
+
+class DumpFormatError(BotHubException):
+    pass
+
+
+def score_fields(prefix):
+    return ["{}__{}".format(prefix, field) for field in SCORE_FIELDS]
+
+
+# columns of each table of the dump, the rows of a restored archive can not
+# have any other column
+DUMP_COLUMNS = {
+    "versions": ["id", "name", "is_default"],
+    "version_languages": [
+        "id",
+        "repository_version",
+        "language",
+        "algorithm",
+        "use_analyze_char",
+        "use_name_entities",
+        "use_competing_intents",
+    ],
+    "intents": ["id", "repository_version", "text"],
+    "groups": ["id", "repository_version", "value"],
+    "entities": ["id", "repository_version", "value", "group"],
+    "examples": ["id", "repository_version_language", "text", "intent", "is_corrected"],
+    "example_entities": ["repository_example", "start", "end", "entity"],
+    "translations": [
+        "id",
+        "original_example",
+        "repository_version_language",
+        "language",
+        "text",
+        "has_valid_entities",
+    ],
+    "translation_entities": ["repository_translated_example", "start", "end", "entity"],
+    "evaluates": ["id", "repository_version_language", "text", "intent"],
+    "evaluate_entities": ["repository_evaluate", "start", "end", "entity"],
+    "evaluate_results": [
+        "id",
+        "repository_version_language",
+        "version",
+        "matrix_chart",
+        "confidence_chart",
+        "log",
+        "cross_validation",
+        *score_fields("intent_results"),
+        *score_fields("entity_results"),
+    ],
+    "evaluate_result_intents": ["evaluate_result", "intent", *score_fields("score")],
+    "evaluate_result_entities": ["evaluate_result", "entity", *score_fields("score")],
+    "evaluate_result_logs": [
+        "evaluate_result",
+        "position",
+        "text",
+        "intent",
+        "predicted_intent",
+        "confidence",
+        "status",
+        "is_error",
+        "data",
+    ],
+}
+
+
+def iter_dump_tables(repository, repository_version=None):
+    """
+    Yields the name and the rows (a values queryset) of each table of the
+    dump, a table is only read after the tables it references
+    """
+    versions = RepositoryVersion.objects.filter(repository=repository, is_deleted=False)
+    if repository_version:
+        versions = versions.filter(pk=repository_version.pk)
+    version_languages = RepositoryVersionLanguage.objects.filter(
+        repository_version__in=versions
+    )
+    examples = RepositoryExample.objects.filter(
+        repository_version_language__in=version_languages
+    )
+    translations = RepositoryTranslatedExample.objects.filter(
+        original_example__in=examples
+    )
+    evaluates = RepositoryEvaluate.objects.filter(
+        repository_version_language__in=version_languages
+    )
+    results = RepositoryEvaluateResult.objects.filter(
+        repository_version_language__in=version_languages
+    )
+
+    tables = [
+        ("versions", versions),
+        ("version_languages", version_languages),
+        ("intents", RepositoryIntent.objects.filter(repository_version__in=versions)),
+        (
+            "groups",
+            RepositoryEntityGroup.objects.filter(repository_version__in=versions),
+        ),
+        ("entities", RepositoryEntity.objects.filter(repository_version__in=versions)),
+        ("examples", examples),
+        (
+            "example_entities",
+            RepositoryExampleEntity.objects.filter(repository_example__in=examples),
+        ),
+        ("translations", translations),
+        (
+            "translation_entities",
+            RepositoryTranslatedExampleEntity.objects.filter(
+                repository_translated_example__in=translations
+            ),
+        ),
+        ("evaluates", evaluates),
+        (
+            "evaluate_entities",
+            RepositoryEvaluateEntity.objects.filter(repository_evaluate__in=evaluates),
+        ),
+        ("evaluate_results", results),
+        (
+            "evaluate_result_intents",
+            RepositoryEvaluateResultIntent.objects.filter(evaluate_result__in=results),
+        ),
+        (
+            "evaluate_result_entities",
+            RepositoryEvaluateResultEntity.objects.filter(evaluate_result__in=results),
+        ),
+        (
+            "evaluate_result_logs",
+            RepositoryEvaluateResultLog.objects.filter(evaluate_result__in=results),
+        ),
+    ]
+    for name, queryset in tables:
+        yield name, queryset.values(*DUMP_COLUMNS[name])
+
+
+def dump_repository(file, repository, repository_version=None):
+    """
+    Writes the versions of the repository, or only the given version, to a zip
+    archive with one NDJSON file per table and a manifest. The rows are read
+    with a database cursor and written as they come, so the memory used does
+    not depend on the size of the repository.
+    Returns the manifest
+    """
+    manifest = {
+        "format": DUMP_FORMAT,
+        "version": DUMP_FORMAT_VERSION,
+        "created_at": timezone.now().isoformat(),
+        "repository": {
+            "uuid": str(repository.uuid),
+            "name": repository.name,
+            "slug": repository.slug,
+            "language": repository.language,
+        },
+        "repository_version": repository_version.pk if repository_version else None,
+        "tables": [],
+    }
+
+    with zipfile.ZipFile(file, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, rows in iter_dump_tables(repository, repository_version):
+            filename = "{}.ndjson".format(name)
+            count = 0
+            with archive.open(filename, "w", force_zip64=True) as member:
+                for row in rows.order_by("pk").iterator(chunk_size=DUMP_BATCH_SIZE):
+                    member.write(
+                        json.dumps(
+                            row, cls=DjangoJSONEncoder, ensure_ascii=False
+                        ).encode("utf-8")
+                    )
+                    member.write(b"\n")
+                    count += 1
+            manifest["tables"].append({"name": name, "file": filename, "rows": count})
+        archive.writestr(MANIFEST, json.dumps(manifest, indent=2))
+    return manifest
+
+
+class RepositoryRestorer:
+    """
+    Loads a dump into a repository with bulk_create, the versions are added as
+    new versions and the ids of the dump are remapped to the created rows
+    """
+
+    # table, model, references to the ids of tables restored before and the
+    # score objects created for each row
+    TABLES = [
+        ("versions", RepositoryVersion, {}, []),
+        (
+            "version_languages",
+            RepositoryVersionLanguage,
+            {"repository_version": "versions"},
+            [],
+        ),
+        ("intents", RepositoryIntent, {"repository_version": "versions"}, []),
+        ("groups", RepositoryEntityGroup, {"repository_version": "versions"}, []),
+        (
+            "entities",
+            RepositoryEntity,
+            {"repository_version": "versions", "group": "groups"},
+            [],
+        ),
+        (
+            "examples",
+            RepositoryExample,
+            {"repository_version_language": "version_languages", "intent": "intents"},
+            [],
+        ),
+        (
+            "example_entities",
+            RepositoryExampleEntity,
+            {"repository_example": "examples", "entity": "entities"},
+            [],
+        ),
+        (
+            "translations",
+            RepositoryTranslatedExample,
+            {
+                "original_example": "examples",
+                "repository_version_language": "version_languages",
+            },
+            [],
+        ),
+        (
+            "translation_entities",
+            RepositoryTranslatedExampleEntity,
+            {"repository_translated_example": "translations", "entity": "entities"},
+            [],
+        ),
+        (
+            "evaluates",
+            RepositoryEvaluate,
+            {"repository_version_language": "version_languages"},
+            [],
+        ),
+        (
+            "evaluate_entities",
+            RepositoryEvaluateEntity,
+            {"repository_evaluate": "evaluates", "entity": "entities"},
+            [],
+        ),
+        (
+            "evaluate_results",
+            RepositoryEvaluateResult,
+            {"repository_version_language": "version_languages"},
+            ["intent_results", "entity_results"],
+        ),
+        (
+            "evaluate_result_intents",
+            RepositoryEvaluateResultIntent,
+            {"evaluate_result": "evaluate_results"},
+            ["score"],
+        ),
+        (
+            "evaluate_result_entities",
+            RepositoryEvaluateResultEntity,
+            {"evaluate_result": "evaluate_results", "entity": "entities"},
+            ["score"],
+        ),
+        (
+            "evaluate_result_logs",
+            RepositoryEvaluateResultLog,
+            {"evaluate_result": "evaluate_results"},
+            [],
+        ),
+    ]
+
+    def __init__(self, repository, created_by=None, batch_size=None):
+        self.repository = repository
+        self.created_by = created_by
+        self.batch_size = batch_size or DUMP_BATCH_SIZE
+        self.has_default = repository.versions.filter(
+            is_default=True, is_deleted=False
+        ).exists()
+        self.ids = {}
+        self.counts = {}
+
+    def defaults(self, name, row):
+        now = timezone.now()
+        if name == "versions":
+            return {
+                "repository": self.repository,
+                "created_by": self.created_by,
+                "is_default": row.get("is_default") and not self.has_default,
+            }
+        if name in ["version_languages", "examples"]:
+            return {"last_update": now}
+        return {}
+
+    def build(self, name, model, references, row):
+        fields = dict(row)
+        fields.pop("id", None)
+        for field, table in references.items():
+            value = fields.pop(field)
+            fields["{}_id".format(field)] = (
+                None if value is None else self.ids[table][value]
+            )
+        fields.update(self.defaults(name, row))
+        return model(**fields)
+
+    def restore_batch(self, name, model, references, scores, rows):
+        columns = set(DUMP_COLUMNS[name])
+        for row in rows:
+            if not isinstance(row, dict):
+                raise DumpFormatError("The rows of {} must be objects".format(name))
+            unknown = set(row) - columns
+            if unknown:
+                raise DumpFormatError(
+                    "The table {} has unknown columns: {}".format(
+                        name, ", ".join(sorted(map(str, unknown)))
+                    )
+                )
+
+        for prefix in scores:
+            keys = dict(zip(SCORE_FIELDS, score_fields(prefix)))
+            created = RepositoryEvaluateResultScore.objects.bulk_create(
+                [
+                    RepositoryEvaluateResultScore(
+                        **{field: row.pop(key) for field, key in keys.items()}
+                    )
+                    for row in rows
+                ]
+            )
+            for row, score in zip(rows, created):
+                row["{}_id".format(prefix)] = score.pk
+
+        if name == "evaluate_results":
+            # the versions of the dump are renumbered after the versions the
+            # repository already has, keeping their order
+            last = self.repository.next_evaluate_result_version(len(rows))
+            for version, row in enumerate(
+                sorted(rows, key=lambda row: (row.get("version"), row.get("id"))),
+                start=last - len(rows) + 1,
+            ):
+                row["version"] = version
+
+        objects = model.objects.bulk_create(
+            [self.build(name, model, references, row) for row in rows]
+        )
+        if "id" in rows[0]:
+            ids = self.ids.setdefault(name, {})
+            for row, instance in zip(rows, objects):
+                ids[row["id"]] = instance.pk
+        self.counts[name] = self.counts.get(name, 0) + len(objects)
+
+    def iter_batches(self, archive, filename):
+        batch = []
+        with archive.open(filename) as member:
+            for line in io.TextIOWrapper(member, encoding="utf-8"):
+                if not line.strip():
+                    continue
+                batch.append(json.loads(line))
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def restore(self, file):
+        """
+        Restores the archive in one transaction, returns the number of rows
+        created for each table
+        """
+        with zipfile.ZipFile(file) as archive:
+            try:
+                manifest = json.loads(archive.read(MANIFEST).decode("utf-8"))
+            except (KeyError, ValueError):
+                raise DumpFormatError("The archive does not have a valid manifest")
+            if (
+                manifest.get("format") != DUMP_FORMAT
+                or manifest.get("version") != DUMP_FORMAT_VERSION
+            ):
+                raise DumpFormatError("Unsupported dump format")
+            files = {
+                table.get("name"): table.get("file") for table in manifest["tables"]
+            }
+
+            try:
+                with transaction.atomic():
+                    for name, model, references, scores in self.TABLES:
+                        self.ids.setdefault(name, {})
+                        if not files.get(name):
+                            continue
+                        for rows in self.iter_batches(archive, files[name]):
+                            self.restore_batch(name, model, references, scores, rows)
+            except KeyError as e:
+                raise DumpFormatError(
+                    "The archive references a missing row or field: {}".format(e)
+                )
+        return self.counts
+
+
+def restore_repository(file, repository, created_by=None):
+    return RepositoryRestorer(repository, created_by=created_by).restore(file)
@@ -16,3 +16,7 @@ class TrainingNotAllowed(BotHubException):
 
 class DoesNotHaveTranslation(BotHubException):
     pass
+
+
+class TranslationImportVersionMismatch(BotHubException):
+    pass
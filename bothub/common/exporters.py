@@ -0,0 +1,231 @@
+import csv
+import json
+from copy import copy
+
+import openpyxl
+from django.contrib.staticfiles import finders
+from django.db.models import Prefetch
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.drawing.image import Image
+from openpyxl.worksheet.cell_range import CellRange
+
+from bothub import utils
+from bothub.common.models import (
+    RepositoryEvaluate,
+    RepositoryEvaluateEntity,
+    RepositoryExample,
+    RepositoryExampleEntity,
+    RepositoryTranslatedExample,
+    RepositoryTranslatedExampleEntity,
+)
+
+EXPORT_BATCH_SIZE = 1000
+
+TRANSLATION_TEMPLATE = "bothub/exporter/example.xlsx"
+TRANSLATION_LOGO = "bothub/exporter/bothub.png"
+TRANSLATION_SHEET = "Translate"
+# the list of entities is written between these rows of the template
+TRANSLATION_ENTITIES_ROW = 4
+TRANSLATION_HEADER_ROW = 13
+
+TRANSLATION_COLUMNS = ["id", "repository_version", "language", "text", "translation"]
+
+
+def format_entities(text, entities):
+    """
+    Returns the text with the entities in markdown, entities must be sorted by
+    start
+    """
+    offset = 0
+    for entity in entities:
+        text = utils.format_entity(
+            text=text,
+            entity=entity.entity.value,
+            start=entity.start + offset,
+            end=entity.end + offset,
+        )
+        offset += len(entity.entity.value) + 4
+    return text
+
+
+def iter_translation_rows(examples, language, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Yields one dict per example with its text and the translation for the
+    language, entities and translations are loaded in batches of examples
+    """
+    pks = list(examples.order_by("created_at", "pk").values_list("pk", flat=True))
+    entities = RepositoryExampleEntity.objects.select_related("entity").order_by(
+        "start"
+    )
+    translations = RepositoryTranslatedExample.objects.filter(
+        language=language
+    ).prefetch_related(
+        Prefetch(
+            "entities",
+            queryset=RepositoryTranslatedExampleEntity.objects.select_related(
+                "entity"
+            ).order_by("start"),
+        )
+    )
+
+    for index in range(0, len(pks), batch_size):
+        batch = pks[index : index + batch_size]
+        loaded = RepositoryExample.objects.filter(pk__in=batch).select_related(
+            "repository_version_language"
+        )
+        loaded = loaded.prefetch_related(
+            Prefetch("entities", queryset=entities),
+            Prefetch("translations", queryset=translations, to_attr="exported"),
+        ).in_bulk()
+
+        for pk in batch:
+            example = loaded[pk]
+            translated = example.exported[0] if example.exported else None
+            yield {
+                "id": example.pk,
+                "repository_version": (
+                    example.repository_version_language.repository_version_id
+                ),
+                "language": example.repository_version_language.language,
+                "text": format_entities(example.text, example.entities.all()),
+                "translation": format_entities(
+                    translated.text, translated.entities.all()
+                )
+                if translated
+                else None,
+            }
+
+
+def iter_evaluation_rows(evaluates, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Yields one dict per evaluate sentence with its entities, the entities are
+    loaded in batches of sentences
+    """
+    pks = list(evaluates.order_by("created_at", "pk").values_list("pk", flat=True))
+    entities = RepositoryEvaluateEntity.objects.select_related("entity").order_by(
+        "start"
+    )
+
+    for index in range(0, len(pks), batch_size):
+        batch = pks[index : index + batch_size]
+        loaded = (
+            RepositoryEvaluate.objects.filter(pk__in=batch)
+            .prefetch_related(Prefetch("entities", queryset=entities))
+            .in_bulk()
+        )
+
+        for pk in batch:
+            evaluate = loaded[pk]
+            yield {
+                "text": evaluate.text,
+                "intent": evaluate.intent,
+                "entities": [
+                    {
+                        "start": entity.start,
+                        "end": entity.end,
+                        "value": evaluate.text[entity.start : entity.end],
+                        "entity": entity.entity.value,
+                    }
+                    for entity in evaluate.entities.all()
+                ],
+            }
+
+
+def get_translation_entities(examples):
+    return list(
+        RepositoryExampleEntity.objects.filter(
+            repository_example__in=examples.values("pk")
+        )
+        .values_list("entity__value", flat=True)
+        .distinct()
+        .order_by("entity__value")
+    )
+
+
+def copy_cell(worksheet, cell):
+    copied = WriteOnlyCell(worksheet, value=cell.value)
+    # the empty cells of read-only worksheets have no style
+    if getattr(cell, "has_style", False):
+        copied.font = copy(cell.font)
+        copied.fill = copy(cell.fill)
+        copied.border = copy(cell.border)
+        copied.alignment = copy(cell.alignment)
+        copied.number_format = cell.number_format
+    return copied
+
+
+def write_translation_xlsx(rows, entities, file):
+    """
+    Writes the translation workbook with openpyxl write-only mode, the header
+    of the template is copied and the rows are written in order so the
+    memory used does not grow with the number of examples
+    """
+    template = openpyxl.load_workbook(finders.find(TRANSLATION_TEMPLATE))[
+        TRANSLATION_SHEET
+    ]
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet(TRANSLATION_SHEET)
+
+    def shifted(row):
+        return row + len(entities) if row >= TRANSLATION_ENTITIES_ROW else row
+
+    for key, dimension in template.column_dimensions.items():
+        worksheet.column_dimensions[key].width = dimension.width
+    for row, dimension in template.row_dimensions.items():
+        if dimension.height:
+            worksheet.row_dimensions[shifted(row)].height = dimension.height
+    for merged in template.merged_cells.ranges:
+        worksheet.merged_cells.add(
+            CellRange(
+                min_col=merged.min_col,
+                min_row=shifted(merged.min_row),
+                max_col=merged.max_col,
+                max_row=shifted(merged.max_row),
+            )
+        )
+
+    logo = Image(finders.find(TRANSLATION_LOGO))
+    logo.width = 210.21
+    logo.height = 60.69
+    worksheet.add_image(logo, "B1")
+
+    def template_rows(start, end):
+        for row in template.iter_rows(min_row=start, max_row=end):
+            worksheet.append([copy_cell(worksheet, cell) for cell in row])
+
+    template_rows(1, TRANSLATION_ENTITIES_ROW - 1)
+    for entity in entities:
+        worksheet.append([None, entity])
+    template_rows(TRANSLATION_ENTITIES_ROW, TRANSLATION_HEADER_ROW)
+
+    for row in rows:
+        worksheet.append(
+            [None]
+            + [
+                None if row.get(column) is None else str(row.get(column))
+                for column in TRANSLATION_COLUMNS
+            ]
+        )
+
+    workbook.save(file)
+
+
+class Echo:
+    """
+    File-like object that returns what is written, used to stream csv rows
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_translation_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(TRANSLATION_COLUMNS)
+    for row in rows:
+        yield writer.writerow([row.get(column) for column in TRANSLATION_COLUMNS])
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + "\n"
@@ -0,0 +1,575 @@
+import codecs
+import json
+import re
+from collections import defaultdict
+
+import openpyxl
+from django.contrib.staticfiles import finders
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from bothub import utils
+from bothub.common import languages
+from bothub.common.exceptions import TranslationImportVersionMismatch
+from bothub.common.exporters import TRANSLATION_SHEET, TRANSLATION_TEMPLATE, copy_cell
+from bothub.common.models import (
+    RepositoryEntity,
+    RepositoryExample,
+    RepositoryExampleEntity,
+    RepositoryIntent,
+    RepositoryTranslatedExample,
+    RepositoryTranslatedExampleEntity,
+    RepositoryVersionLanguage,
+    item_key_regex,
+)
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def iter_json_array(stream, chunk_size=READ_CHUNK_SIZE):
+    """
+    Yields the items of a JSON array read from a binary file-like object,
+    only the item being parsed is kept in memory.
+    Raises json.JSONDecodeError when the content is not an array of values.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    eof = False
+    started = False
+    position = 0
+
+    def fill():
+        nonlocal buffer, eof, position
+        data = stream.read(chunk_size)
+        if not data:
+            eof = True
+            buffer = buffer[position:] + utf8.decode(b"", final=True)
+        else:
+            buffer = buffer[position:] + utf8.decode(data)
+        position = 0
+
+    def skip_blank():
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\n\r":
+                position += 1
+            if position < len(buffer) or eof:
+                return
+            fill()
+
+    skip_blank()
+    if buffer[position : position + 1] == "\ufeff":
+        position += 1
+        skip_blank()
+    if buffer[position : position + 1] != "[":
+        raise json.JSONDecodeError("Expecting '['", buffer, position)
+    position += 1
+
+    while True:
+        skip_blank()
+        if buffer[position : position + 1] == "]":
+            return
+        if started:
+            if buffer[position : position + 1] != ",":
+                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, position)
+            position += 1
+            skip_blank()
+
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                skip_blank()
+                continue
+            # a number may be cut at the end of the buffer, so the value is
+            # only accepted when the delimiter after it was read
+            delimiter = end
+            while delimiter < len(buffer) and buffer[delimiter] in " \t\n\r":
+                delimiter += 1
+            if not eof and buffer[delimiter : delimiter + 1] not in [",", "]"]:
+                fill()
+                skip_blank()
+                continue
+            break
+
+        position = end
+        started = True
+        yield item
+
+
+def validate_entities(text, entities):
+    """
+    Validates the entity spans of an example without touching the database,
+    returns the list of (start, end, entity) or None when one is invalid
+    """
+    if not isinstance(entities, list):
+        return None
+
+    valid = []
+    for entity in entities:
+        if not isinstance(entity, dict):
+            return None
+        start = entity.get("start")
+        end = entity.get("end")
+        value = entity.get("entity")
+        if isinstance(value, str):
+            value = value.strip()
+        if (
+            type(start) is not int
+            or type(end) is not int
+            or not 0 <= start < end <= len(text)
+            or not isinstance(value, str)
+            or len(value) > RepositoryEntity._meta.get_field("value").max_length
+            or not item_key_regex.match(value)
+        ):
+            return None
+        valid.append((start, end, value))
+    return valid
+
+
+def get_or_create_values(model, field, keys):
+    """
+    Resolves many (repository_version_id, value) pairs of intents or entities
+    with one query, the missing ones are created in bulk.
+    Returns a dict of the pairs to the primary keys
+    """
+    keys = set(keys)
+    if not keys:
+        return {}
+
+    def fetch(keys):
+        values = defaultdict(set)
+        for repository_version, value in keys:
+            values[repository_version].add(value)
+        query = Q()
+        for repository_version, value in values.items():
+            query |= Q(
+                repository_version=repository_version, **{"{}__in".format(field): value}
+            )
+        return {
+            (repository_version, value): pk
+            for pk, repository_version, value in model.objects.filter(
+                query
+            ).values_list("pk", "repository_version", field)
+        }
+
+    found = fetch(keys)
+    missing = keys - found.keys()
+    if missing:
+        model.objects.bulk_create(
+            [
+                model(repository_version_id=repository_version, **{field: value})
+                for repository_version, value in missing
+            ],
+            ignore_conflicts=True,
+        )
+        found.update(fetch(missing))
+    return found
+
+
+class ExamplesImporter:
+    """
+    Adds many examples to a repository version with a few queries: intents,
+    entities and the existing sentences are loaded once and the new rows are
+    inserted in batches.
+    """
+
+    BATCH_SIZE = 1000
+
+    def __init__(self, repository_version, batch_size=None, language=None):
+        self.repository_version = repository_version
+        self.repository = repository_version.repository
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.language = language
+        self.intent_max_length = RepositoryIntent._meta.get_field("text").max_length
+
+        self.intents = dict(
+            RepositoryIntent.objects.filter(
+                repository_version=repository_version
+            ).values_list("text", "pk")
+        )
+        self.entities = dict(
+            RepositoryEntity.objects.filter(
+                repository_version=repository_version
+            ).values_list("value", "pk")
+        )
+        existing = RepositoryExample.objects.filter(
+            repository_version_language__repository_version=repository_version
+        )
+        if language:
+            existing = existing.filter(repository_version_language__language=language)
+        self.existing = set(
+            existing.values_list(
+                "text", "intent__text", "repository_version_language__language"
+            )
+        )
+        self.version_languages = dict(
+            RepositoryVersionLanguage.objects.filter(
+                repository_version=repository_version
+            ).values_list("language", "pk")
+        )
+
+        self.pending = []
+        self.touched = set()
+        self.added = 0
+        self.not_added = []
+
+    def get_version_language(self, language):
+        if language not in self.version_languages:
+            self.version_languages[
+                language
+            ] = self.repository_version.get_version_language(language).pk
+        return self.version_languages.get(language)
+
+    def clean(self, data):
+        if not isinstance(data, dict):
+            return None
+
+        text = data.get("text")
+        intent = data.get("intent")
+        language = self.language or data.get("language") or self.repository.language
+
+        if not isinstance(text, str) or not text.strip():
+            return None
+        # the text is trimmed as the example serializer does
+        text = text.strip()
+        if (
+            not isinstance(intent, str)
+            or len(intent) > self.intent_max_length
+            or not item_key_regex.match(intent)
+        ):
+            return None
+        if not isinstance(language, str) or not languages.is_valid_language(language):
+            return None
+
+        entities = validate_entities(text, data.get("entities", []))
+        if entities is None:
+            return None
+
+        return text, intent, language, entities
+
+    def add(self, data):
+        cleaned = self.clean(data)
+        if cleaned is None:
+            self.reject(data)
+            return False
+
+        text, intent, language, entities = cleaned
+        if (text, intent, language) in self.existing:
+            self.reject(data)
+            return False
+
+        self.existing.add((text, intent, language))
+        self.pending.append(cleaned)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        return True
+
+    def reject(self, data):
+        self.not_added.append(data)
+
+    def add_many(self, items):
+        for data in items:
+            self.add(data)
+        return self.finish()
+
+    def create_missing(self, model, field, cache, values):
+        missing = [value for value in set(values) if value not in cache]
+        if not missing:
+            return
+        model.objects.bulk_create(
+            [
+                model(repository_version=self.repository_version, **{field: value})
+                for value in missing
+            ],
+            ignore_conflicts=True,
+        )
+        cache.update(
+            model.objects.filter(
+                repository_version=self.repository_version,
+                **{"{}__in".format(field): missing}
+            ).values_list(field, "pk")
+        )
+
+    def flush(self):
+        if not self.pending:
+            return
+
+        with transaction.atomic():
+            self.create_missing(
+                RepositoryIntent,
+                "text",
+                self.intents,
+                [intent for text, intent, language, entities in self.pending],
+            )
+            self.create_missing(
+                RepositoryEntity,
+                "value",
+                self.entities,
+                [
+                    entity[2]
+                    for text, intent, language, entities in self.pending
+                    for entity in entities
+                ],
+            )
+
+            now = timezone.now()
+            examples = RepositoryExample.objects.bulk_create(
+                [
+                    RepositoryExample(
+                        repository_version_language_id=self.get_version_language(
+                            language
+                        ),
+                        text=text,
+                        intent_id=self.intents.get(intent),
+                        last_update=now,
+                    )
+                    for text, intent, language, entities in self.pending
+                ]
+            )
+            RepositoryExampleEntity.objects.bulk_create(
+                [
+                    RepositoryExampleEntity(
+                        repository_example_id=example.pk,
+                        start=start,
+                        end=end,
+                        entity_id=self.entities.get(value),
+                    )
+                    for example, (text, intent, language, entities) in zip(
+                        examples, self.pending
+                    )
+                    for start, end, value in entities
+                ]
+            )
+
+        self.touched.update(
+            example.repository_version_language_id for example in examples
+        )
+        self.added += len(self.pending)
+        self.pending = []
+
+    def finish(self):
+        self.flush()
+        if self.touched:
+            RepositoryVersionLanguage.objects.filter(pk__in=self.touched).update(
+                last_update=timezone.now()
+            )
+            self.touched = set()
+        return {"added": self.added, "not_added": self.not_added}
+
+
+def iter_rasa_examples(stream):
+    """
+    Yields the common examples of a Rasa NLU json file
+    """
+    data = json.load(codecs.getreader("utf-8-sig")(stream))
+    examples = data.get("rasa_nlu_data", {}).get("common_examples")
+    if not isinstance(examples, list):
+        raise json.JSONDecodeError("Expecting rasa_nlu_data.common_examples", "", 0)
+    yield from examples
+
+
+class RejectedExamplesWriter:
+    """
+    Writes the rejected examples to a binary file as a JSON array, so it can be
+    fixed and uploaded again
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.count = 0
+
+    def write(self, data):
+        self.file.write(b",\n" if self.count else b"[\n")
+        self.file.write(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+        self.count += 1
+
+    def close(self):
+        self.file.write(b"\n]\n" if self.count else b"[]\n")
+        self.file.seek(0)
+
+
+class JobExamplesImporter(ExamplesImporter):
+    """
+    Importer used by the background import jobs, the rejected examples are
+    written to a file instead of being kept in memory
+    """
+
+    def __init__(self, repository_version, rejected, **kwargs):
+        super().__init__(repository_version, **kwargs)
+        self.rejected = rejected
+
+    def reject(self, data):
+        self.rejected.write(data)
+
+
+class TranslationsImporter:
+    """
+    Imports the translations of a workbook made by the translation exporter.
+    The upload is read in read-only mode and the rows are validated and saved
+    in batches, the rejected rows are written to a write-only workbook with
+    the reason in the last column.
+    """
+
+    BATCH_SIZE = 1000
+    HEADER = ["ID", "Repository Version", "Language"]
+    # ID, Repository Version, Language, Original Text, Translate, Error
+    COLUMNS = 7
+    ERROR_SENTENCE = "Sentence does not exist"
+    ERROR_ENTITIES = "Entities must match"
+
+    def __init__(self, repository_version, language, batch_size=None):
+        self.repository_version = repository_version
+        self.language = language
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.version_language = repository_version.get_version_language(language)
+        self.entities = dict(
+            RepositoryEntity.objects.filter(
+                repository_version=repository_version
+            ).values_list("value", "pk")
+        )
+
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.worksheet = self.workbook.create_sheet(TRANSLATION_SHEET)
+        template = openpyxl.load_workbook(finders.find(TRANSLATION_TEMPLATE))[
+            TRANSLATION_SHEET
+        ]
+        for key, dimension in template.column_dimensions.items():
+            self.worksheet.column_dimensions[key].width = dimension.width
+
+        self.pending = []
+        self.added = 0
+        self.rejected = 0
+
+    def import_file(self, file):
+        """
+        Reads the rows after the header of the exported workbook, the rows
+        before it are copied to the rejected workbook
+        """
+        try:
+            worksheet = openpyxl.load_workbook(file, read_only=True)[TRANSLATION_SHEET]
+            header = False
+            for row in worksheet.iter_rows():
+                if header:
+                    self.add([cell.value for cell in row])
+                    continue
+                self.worksheet.append([copy_cell(self.worksheet, cell) for cell in row])
+                header = [cell.value for cell in row[1:4]] == self.HEADER
+        except Exception:
+            # the rejected workbook will not be saved, its writer is closed so
+            # the temporary file is not left open
+            self.worksheet.close()
+            raise
+        return self.finish()
+
+    def add(self, values):
+        values = list(values[: self.COLUMNS])
+        values += [None] * (self.COLUMNS - len(values))
+        if not any(values):
+            return
+
+        try:
+            repository_version = int(values[2])
+        except (TypeError, ValueError):
+            repository_version = None
+        if repository_version != self.repository_version.pk:
+            raise TranslationImportVersionMismatch()
+
+        text = values[5]
+        if not text:
+            return
+        example_id = re.sub("[^0-9]", "", str(values[1] or ""))
+        if not example_id:
+            self.reject(values, self.ERROR_SENTENCE)
+            return
+
+        self.pending.append((values, int(example_id), str(text)))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def reject(self, values, error):
+        self.worksheet.append(values[: self.COLUMNS - 1] + [error])
+        self.rejected += 1
+
+    def flush(self):
+        if not self.pending:
+            return
+
+        examples = set(
+            RepositoryExample.objects.filter(
+                pk__in={example_id for values, example_id, text in self.pending},
+                repository_version_language__repository_version=self.repository_version,
+            ).values_list("pk", flat=True)
+        )
+        entities = defaultdict(list)
+        for example_id, value in RepositoryExampleEntity.objects.filter(
+            repository_example__in=examples
+        ).values_list("repository_example", "entity__value"):
+            entities[example_id].append(value)
+
+        # the last row of an example wins, as it did when each row replaced
+        # the translation saved before
+        translations = {}
+        for values, example_id, text in self.pending:
+            if example_id not in examples:
+                self.reject(values, self.ERROR_SENTENCE)
+                continue
+            found = utils.find_entities_in_example(text)
+            if any(entity["entity"] not in entities[example_id] for entity in found):
+                self.reject(values, self.ERROR_ENTITIES)
+                continue
+            translations[example_id] = (utils.get_without_entity(text), found)
+        self.pending = []
+
+        if not translations:
+            return
+
+        with transaction.atomic():
+            RepositoryTranslatedExample.objects.filter(
+                original_example__in=translations.keys(), language=self.language
+            ).delete()
+            created = RepositoryTranslatedExample.objects.bulk_create(
+                [
+                    RepositoryTranslatedExample(
+                        repository_version_language=self.version_language,
+                        original_example_id=example_id,
+                        language=self.language,
+                        text=text,
+                        has_valid_entities=sorted(entities[example_id])
+                        == sorted(entity["entity"] for entity in found),
+                    )
+                    for example_id, (text, found) in translations.items()
+                ]
+            )
+            RepositoryTranslatedExampleEntity.objects.bulk_create(
+                [
+                    RepositoryTranslatedExampleEntity(
+                        repository_translated_example_id=translated.pk,
+                        start=entity["start"],
+                        end=entity["end"],
+                        entity_id=self.entities.get(entity["entity"]),
+                    )
+                    for translated, (text, found) in zip(created, translations.values())
+                    for entity in found
+                ]
+            )
+            RepositoryExample.objects.filter(pk__in=translations.keys()).update(
+                last_update=timezone.now()
+            )
+        self.added += len(translations)
+
+    def finish(self):
+        self.flush()
+        if self.added:
+            RepositoryVersionLanguage.objects.filter(
+                pk=self.version_language.pk
+            ).update(last_update=timezone.now())
+        return {"added": self.added, "rejected": self.rejected}
+
+    def save(self, file):
+        self.workbook.save(file)
@@ -0,0 +1,71 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from bothub.common.models import RepositoryNLPLog, RepositoryNLPLogIntent
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Compresses the payload and the intent ranking of the logs stored in "
+        "the verbose format and fills their intent and confidence with the "
+        "default intent, the ranking rows of the converted logs are deleted"
+    )
+
+    def handle(self, *args, **kwargs):
+        num_updated = 0
+        max_id = -1
+        while True:
+            batch = list(
+                RepositoryNLPLog.objects.filter(
+                    id__gt=max_id, intent_ranking__isnull=True
+                )
+                .order_by("id")
+                .only("id", "nlp_log", "nlp_log_compressed", "intent", "confidence")[
+                    :BATCH_SIZE
+                ]
+            )
+            if not batch:
+                break
+
+            intents = defaultdict(list)
+            for intent in (
+                RepositoryNLPLogIntent.objects.filter(repository_nlp_log__in=batch)
+                .order_by("pk")
+                .values("repository_nlp_log", "intent", "confidence", "is_default")
+            ):
+                intents[intent.pop("repository_nlp_log")].append(intent)
+
+            for log in batch:
+                log.set_nlp_log(log.get_nlp_log())
+                log.set_intent_ranking(intents[log.pk])
+                default = next(
+                    (intent for intent in intents[log.pk] if intent.get("is_default")),
+                    None,
+                )
+                if default is not None:
+                    log.intent = default.get("intent")
+                    log.confidence = default.get("confidence")
+
+            with transaction.atomic():
+                RepositoryNLPLog.objects.bulk_update(
+                    batch,
+                    [
+                        "nlp_log",
+                        "nlp_log_compressed",
+                        "intent_ranking",
+                        "intent",
+                        "confidence",
+                    ],
+                )
+                RepositoryNLPLogIntent.objects.filter(
+                    repository_nlp_log__in=batch
+                ).delete()
+
+            num_updated += len(batch)
+            print(f" > Compacted {num_updated} logs")
+
+            max_id = batch[-1].pk
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bothub.common.dumps import dump_repository
+from bothub.common.models import Repository, RepositoryVersion
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes the versions of a repository to a zip archive of NDJSON files, "
+        "the archive is loaded with the restore_repository command"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("repository", help="UUID of the repository")
+        parser.add_argument("output", help="Path of the archive")
+        parser.add_argument(
+            "--repository-version", type=int, help="Dump only this repository version"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            repository = Repository.objects.get(uuid=options.get("repository"))
+        except (Repository.DoesNotExist, ValueError):
+            raise CommandError("Repository not found")
+
+        repository_version = None
+        if options.get("repository_version"):
+            try:
+                repository_version = repository.versions.get(
+                    pk=options.get("repository_version")
+                )
+            except RepositoryVersion.DoesNotExist:
+                raise CommandError("Version not found in the repository")
+
+        with open(options.get("output"), "wb") as f:
+            manifest = dump_repository(f, repository, repository_version)
+
+        for table in manifest.get("tables"):
+            print(" > {}: {}".format(table.get("name"), table.get("rows")))
@@ -0,0 +1,44 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from bothub.common.models import RepositoryEvaluateResult
+
+BATCH_SIZE = 100
+
+
+class Command(BaseCommand):
+    help = (
+        "Stores the logs of the evaluate results saved in JSON as sentence "
+        "rows, the JSON of the converted results is cleared"
+    )
+
+    def handle(self, *args, **kwargs):
+        num_updated = 0
+        max_id = -1
+        while True:
+            batch = list(
+                RepositoryEvaluateResult.objects.filter(id__gt=max_id)
+                .exclude(log="")
+                .order_by("id")
+                .only("id", "log")[:BATCH_SIZE]
+            )
+            if not batch:
+                break
+
+            for result in batch:
+                try:
+                    log = json.loads(result.log)
+                except ValueError:
+                    print(f" > Invalid log in the evaluate result {result.pk}")
+                    continue
+                with transaction.atomic():
+                    result.evaluate_result_log.all().delete()
+                    result.set_log(log)
+                    RepositoryEvaluateResult.objects.filter(pk=result.pk).update(log="")
+                num_updated += 1
+
+            print(f" > Converted {num_updated} evaluate results")
+
+            max_id = batch[-1].pk
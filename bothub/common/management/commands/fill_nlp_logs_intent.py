@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Subquery
+
+from bothub.common.models import RepositoryNLPLog, RepositoryNLPLogIntent
+
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills the intent and confidence of the logs with the default intent "
+        "of their ranking"
+    )
+
+    def handle(self, *args, **kwargs):
+        default = RepositoryNLPLogIntent.objects.filter(
+            repository_nlp_log=OuterRef("pk"), is_default=True
+        ).order_by("pk")
+
+        num_updated = 0
+        max_id = -1
+        while True:
+            batch = list(
+                RepositoryNLPLog.objects.filter(id__gt=max_id, intent__isnull=True)
+                .order_by("id")
+                .values_list("id", flat=True)[:BATCH_SIZE]
+            )
+            if not batch:
+                break
+
+            RepositoryNLPLog.objects.filter(pk__in=batch).update(
+                intent=Subquery(default.values("intent")[:1]),
+                confidence=Subquery(default.values("confidence")[:1]),
+            )
+
+            num_updated += len(batch)
+            print(f" > Updated {num_updated} logs")
+
+            max_id = batch[-1]
@@ -0,0 +1,62 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from bothub.common.models import (
+    RepositoryExampleEntity,
+    RepositoryTranslatedExample,
+    RepositoryTranslatedExampleEntity,
+)
+
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills the has_valid_entities flag of the translations, comparing the "
+        "entities of each translation with the entities of its original example"
+    )
+
+    def handle(self, *args, **kwargs):
+        num_updated = 0
+        max_id = -1
+        while True:
+            batch = list(
+                RepositoryTranslatedExample.objects.filter(id__gt=max_id)
+                .order_by("id")
+                .values_list("id", "original_example")[:BATCH_SIZE]
+            )
+            if not batch:
+                break
+
+            original_entities = defaultdict(list)
+            for example_id, entity_id in RepositoryExampleEntity.objects.filter(
+                repository_example__in={example_id for pk, example_id in batch}
+            ).values_list("repository_example", "entity"):
+                original_entities[example_id].append(entity_id)
+
+            translated_entities = defaultdict(list)
+            for pk, entity_id in RepositoryTranslatedExampleEntity.objects.filter(
+                repository_translated_example__in=[pk for pk, example_id in batch]
+            ).values_list("repository_translated_example", "entity"):
+                translated_entities[pk].append(entity_id)
+
+            valid = [
+                pk
+                for pk, example_id in batch
+                if sorted(original_entities[example_id])
+                == sorted(translated_entities[pk])
+            ]
+            with transaction.atomic():
+                RepositoryTranslatedExample.objects.filter(pk__in=valid).update(
+                    has_valid_entities=True
+                )
+                RepositoryTranslatedExample.objects.filter(
+                    pk__in=[pk for pk, example_id in batch]
+                ).exclude(pk__in=valid).update(has_valid_entities=False)
+
+            num_updated += len(batch)
+            print(f" > Updated {num_updated} translations")
+
+            max_id = batch[-1][0]
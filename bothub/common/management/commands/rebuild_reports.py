@@ -0,0 +1,101 @@
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from bothub.common.models import RepositoryNLPLog, RepositoryReports
+from bothub.common.tasks import NLP_LOG_RETENTION_DAYS
+
+BATCH_SIZE = 1000
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise CommandError(f"Invalid date {value}, use the format YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the count of stored logs of the daily reports of the date "
+        "range, the count of predictions is only raised when it is lower than "
+        "the logs found"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start-date", required=True, help="YYYY-MM-DD")
+        parser.add_argument("--end-date", required=True, help="YYYY-MM-DD")
+
+    def handle(self, *args, **options):
+        start_date = parse_date(options.get("start_date"))
+        end_date = parse_date(options.get("end_date"))
+        if end_date < start_date:
+            raise CommandError("The end date must be after the start date")
+        first_date = timezone.now().date() - timedelta(days=NLP_LOG_RETENTION_DAYS)
+        if start_date < first_date:
+            raise CommandError(
+                f"The logs before {first_date} were deleted, their reports can "
+                "not be rebuilt"
+            )
+
+        day = start_date
+        while day <= end_date:
+            # reports are dated with the UTC day of the prediction
+            start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+            counts = {
+                (count.get("repository_version_language"), count.get("user")): count
+                for count in RepositoryNLPLog.objects.filter(
+                    created_at__gte=start, created_at__lt=start + timedelta(days=1)
+                )
+                .values(
+                    "repository_version_language",
+                    "user",
+                    "repository_version_language__repository_version__repository",
+                )
+                .annotate(total=Count("id"))
+                .order_by()
+            }
+
+            with transaction.atomic():
+                reports = list(
+                    RepositoryReports.objects.select_for_update().filter(
+                        report_date=day
+                    )
+                )
+                for report in reports:
+                    count = counts.pop(
+                        (report.repository_version_language_id, report.user_id), {}
+                    )
+                    report.count_logs = count.get("total", 0)
+                    # the predictions not logged by the log policies are only
+                    # counted in count_reports, it is never lowered
+                    report.count_reports = max(report.count_reports, report.count_logs)
+                RepositoryReports.objects.bulk_update(
+                    reports, ["count_reports", "count_logs"], batch_size=BATCH_SIZE
+                )
+
+                created = RepositoryReports.objects.bulk_create(
+                    [
+                        RepositoryReports(
+                            repository_id=count.get(
+                                "repository_version_language__repository_version__repository"
+                            ),
+                            repository_version_language_id=count.get(
+                                "repository_version_language"
+                            ),
+                            user_id=count.get("user"),
+                            count_reports=count.get("total"),
+                            count_logs=count.get("total"),
+                            report_date=day,
+                        )
+                        for count in counts.values()
+                    ],
+                    batch_size=BATCH_SIZE,
+                )
+
+            print(f" > {day}: {len(reports)} reports updated, {len(created)} created")
+
+            day += timedelta(days=1)
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bothub.common.dumps import DumpFormatError, restore_repository
+from bothub.common.models import Repository
+
+
+class Command(BaseCommand):
+    help = (
+        "Adds the versions of an archive made by dump_repository to a "
+        "repository, the ids of the archive are remapped to the new rows"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("repository", help="UUID of the target repository")
+        parser.add_argument("input", help="Path of the archive")
+
+    def handle(self, *args, **options):
+        try:
+            repository = Repository.objects.get(uuid=options.get("repository"))
+        except (Repository.DoesNotExist, ValueError):
+            raise CommandError("Repository not found")
+
+        try:
+            with open(options.get("input"), "rb") as f:
+                counts = restore_repository(f, repository)
+        except DumpFormatError as e:
+            raise CommandError(str(e))
+
+        for name, count in counts.items():
+            print(" > {}: {}".format(name, count))
@@ -1,20 +1,31 @@
-import threading
 from django.core.management.base import BaseCommand
 
-from bothub.common.models import RepositoryVersion
+from bothub.common.models import RepositoryVersion, RepositoryTrainSchedule
 
 
 class Command(BaseCommand):
-    def handle(self, *args, **kwargs):
-        repository_version_language = RepositoryVersion.objects.all()
+    help = (
+        "Adds the repository versions ready for train to the training queue, "
+        "the queue is sent to the NLP by the dispatch_trains task"
+    )
 
-        for version in repository_version_language:
-            user_authorization = version.repository.get_user_authorization(
-                user=version.repository.owner
-            )
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--only-default",
+            action="store_true",
+            help="Schedule only the default version of each repository",
+        )
+
+    def handle(self, *args, **options):
+        versions = RepositoryVersion.objects.all()
+        if options.get("only_default"):
+            versions = versions.filter(is_default=True)
+
+        scheduled, skipped = RepositoryTrainSchedule.objects.schedule(versions)
+        depth = RepositoryTrainSchedule.objects.depth()
 
-            t = threading.Thread(
-                target=version.repository.request_nlp_train,
-                args=(user_authorization, {"repository_version": version.pk}),
+        print(
+            "Scheduled: {}, skipped: {}, pending: {}, processing: {}".format(
+                len(scheduled), len(skipped), depth["pending"], depth["processing"]
             )
-            t.start()
+        )
@@ -1,29 +1,127 @@
 import base64
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import connections
 
 from bothub.common.models import RepositoryNLPTrain
-from bothub.utils import send_bot_data_file_aws
+from bothub.utils import aws_credentials_configured, send_bot_data_stream_aws
+
+BATCH_SIZE = 100
+
+
+class RateLimiter:
+    """
+    Spaces the start of the uploads so there are at most `rate` per second
+    between all the workers, 0 disables it
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.next_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+def transfer(pk, limiter):
+    try:
+        # the blob is only loaded inside the worker, one per running upload
+        bot_data = (
+            RepositoryNLPTrain.objects.filter(pk=pk)
+            .values_list("bot_data", flat=True)
+            .first()
+        )
+        if not bot_data or bot_data.startswith("http"):
+            return False
+
+        limiter.wait()
+        url = send_bot_data_stream_aws(pk, io.BytesIO(base64.b64decode(bot_data)))[0]
+        del bot_data
+        RepositoryNLPTrain.objects.filter(pk=pk).update(bot_data=url)
+        return True
+    finally:
+        connections.close_all()
 
 
 class Command(BaseCommand):
-    def handle(self, *args, **kwargs):
-        if settings.AWS_SEND:
-            repo = RepositoryNLPTrain.objects.all().exclude(bot_data__exact="")
-            for update in repo:
-                try:
-                    repository_update = RepositoryNLPTrain.objects.get(pk=update.pk)
-                    bot_data = send_bot_data_file_aws(
-                        update.pk, base64.b64decode(update.bot_data)
-                    )
-                    repository_update.bot_data = bot_data
-                    repository_update.save(update_fields=["bot_data"])
-                    print(
-                        "Updating bot_data repository_update {}".format(str(update.pk))
-                    )
-                except Exception as e:
-                    print("Error " + str(update.pk))
-                    print(str(e))
-        else:
+    help = (
+        "Sends the trained models stored in the database to the bucket, "
+        "the models already sent are skipped so it can be resumed at any time"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            "--rate", type=float, default=0, help="Maximum uploads per second"
+        )
+        parser.add_argument(
+            "--start-id", type=int, default=0, help="Resume after this id"
+        )
+
+    def handle(self, *args, **options):
+        if not settings.AWS_SEND or not aws_credentials_configured():
             print("You need to configure the environment variables for AWS.")
+            return
+
+        # models already sent have the url of the bucket as bot_data
+        trains = (
+            RepositoryNLPTrain.objects.exclude(bot_data__exact="")
+            .exclude(bot_data__startswith="http")
+            .order_by("pk")
+        )
+
+        limiter = RateLimiter(options.get("rate"))
+        start = time.monotonic()
+        transferred = 0
+        skipped = 0
+        failed = []
+        max_id = options.get("start_id")
+
+        with ThreadPoolExecutor(max_workers=options.get("workers")) as executor:
+            while True:
+                batch = list(
+                    trains.filter(pk__gt=max_id).values_list("pk", flat=True)[
+                        : options.get("batch_size")
+                    ]
+                )
+                if not batch:
+                    break
+
+                futures = {executor.submit(transfer, pk, limiter): pk for pk in batch}
+                for future in as_completed(futures):
+                    pk = futures[future]
+                    try:
+                        if future.result():
+                            transferred += 1
+                        else:
+                            skipped += 1
+                    except Exception as e:
+                        failed.append(pk)
+                        print("Error {}: {}".format(pk, str(e)))
+
+                max_id = batch[-1]
+                print(
+                    " > Transferred {} bot_data, last id {}".format(transferred, max_id)
+                )
+
+        print(
+            "Transferred: {}, skipped: {}, failed: {}, elapsed: {:.1f}s".format(
+                transferred, skipped, len(failed), time.monotonic() - start
+            )
+        )
+        if failed:
+            print("Failed ids: {}".format(", ".join(map(str, failed))))
@@ -1,9 +1,21 @@
+import contextlib
 import logging
+import re
 from abc import ABCMeta
 
+from django.core.files.storage import default_storage
+
 logger = logging.getLogger(__name__)
 
 
+def normalize_name(name):
+    """
+    Converts the intent and entity names of other providers to the names
+    accepted in the repository, roles ("contact:friend") are removed
+    """
+    return re.sub(r"[^-a-z0-9_]", "_", str(name).split(":")[0].strip().lower())
+
+
 class ClassifierType(metaclass=ABCMeta):
     """
     ClassifierType is our abstract base type for custom NLU providers. Each provider will
@@ -16,12 +28,50 @@ class ClassifierType(metaclass=ABCMeta):
     # the short code for this classifier type (< 16 chars, lowercase)
     slug = None
 
+    # the provider is read from an uploaded file instead of an api token
+    requires_file = False
+
     repository_version = None
     auth_token = None
     language = None
+    file = None
+
+    @contextlib.contextmanager
+    def open_source(self):
+        """
+        Opens the binary file read by iter_records, by default the uploaded file
+        """
+        with default_storage.open(self.file, "rb") as f:
+            yield f
 
-    def migrate(self):
+    def iter_records(self, source):
         """
-        Must implement every classifier rule to receive phrases, intentions and consequently entities
+        Must yield the phrases of the provider as dicts with text, intent and
+        entities (entity, start and end)
+        """
+        raise NotImplementedError("classifier types must implement iter_records")
+
+    def migrate(self, progress=None):
         """
-        raise NotImplementedError("classifier types must implement migrate")
+        Adds the records of the provider to the repository version in batches,
+        progress is called with the number of processed, added and rejected
+        phrases after each batch
+        """
+        from bothub.common.importers import ExamplesImporter
+
+        importer = ExamplesImporter(self.repository_version, language=self.language)
+        processed = 0
+        with self.open_source() as source:
+            for record in self.iter_records(source):
+                importer.add(record)
+                processed += 1
+                if progress and processed % importer.batch_size == 0:
+                    progress(processed, importer.added, len(importer.not_added))
+
+        result = importer.finish()
+        if progress:
+            progress(processed, importer.added, len(importer.not_added))
+        logger.info(
+            "%s migration: %s processed, %s added", self.slug, processed, importer.added
+        )
+        return result
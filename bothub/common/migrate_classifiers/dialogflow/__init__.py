@@ -0,0 +1 @@
+from .type import DialogflowType  # noqa
@@ -0,0 +1,50 @@
+import json
+import re
+import zipfile
+
+from bothub.common.migrate_classifiers.classifiers import ClassifierType, normalize_name
+
+USERSAYS_REGEX = re.compile(
+    r"intents/(?P<intent>.+)_usersays_(?P<language>[^/]+)\.json$"
+)
+
+
+class DialogflowType(ClassifierType):
+    name = "Dialogflow"
+    slug = "dialogflow"
+    requires_file = True
+
+    def get_language_codes(self):
+        language = self.language.lower().replace("_", "-")
+        return {language, language.split("-")[0]}
+
+    def iter_records(self, source):
+        """
+        Reads the training phrases of an agent export zip, each intent has one
+        intents/<name>_usersays_<language>.json file per language
+        """
+        languages = self.get_language_codes()
+        with zipfile.ZipFile(source) as thezip:
+            for zipinfo in thezip.infolist():
+                match = USERSAYS_REGEX.search(zipinfo.filename)
+                if not match or match.group("language").lower() not in languages:
+                    continue
+                with thezip.open(zipinfo) as thefile:
+                    phrases = json.loads(thefile.read().decode("utf-8-sig"))
+
+                intent = normalize_name(match.group("intent"))
+                for phrase in phrases:
+                    text = ""
+                    entities = []
+                    for part in phrase.get("data", []):
+                        part_text = part.get("text", "")
+                        if part.get("meta"):
+                            entities.append(
+                                {
+                                    "entity": normalize_name(part["meta"].lstrip("@")),
+                                    "start": len(text),
+                                    "end": len(text) + len(part_text),
+                                }
+                            )
+                        text += part_text
+                    yield {"text": text, "intent": intent, "entities": entities}
@@ -0,0 +1 @@
+from .type import RasaMarkdownType  # noqa
@@ -0,0 +1,71 @@
+import codecs
+import json
+import re
+
+from bothub.common.migrate_classifiers.classifiers import ClassifierType, normalize_name
+
+SECTION_REGEX = re.compile(r"^##\s*(?P<type>[^:]+):(?P<name>.+)$")
+ITEM_REGEX = re.compile(r"^\s*[-*+]\s+(?P<text>.+)$")
+ENTITY_REGEX = re.compile(
+    r"\[(?P<text>[^\]]+)\](?:\((?P<entity>[^)]+)\)|(?P<json>\{[^}]+\}))"
+)
+
+
+def parse_example(line):
+    """
+    Converts a markdown example with [text](entity), [text](entity:value) or
+    [text]{"entity": "entity"} annotations to the plain text and its spans
+    """
+    text = ""
+    entities = []
+    position = 0
+    for match in ENTITY_REGEX.finditer(line):
+        text += line[position : match.start()]
+        if match.group("json"):
+            try:
+                entity = json.loads(match.group("json")).get("entity", "")
+            except ValueError:
+                entity = ""
+        else:
+            entity = match.group("entity")
+        entities.append(
+            {
+                "entity": normalize_name(entity),
+                "start": len(text),
+                "end": len(text) + len(match.group("text")),
+            }
+        )
+        text += match.group("text")
+        position = match.end()
+    text += line[position:]
+    return text.strip(), entities
+
+
+class RasaMarkdownType(ClassifierType):
+    name = "Rasa Markdown"
+    slug = "rasa_markdown"
+    requires_file = True
+
+    def iter_records(self, source):
+        """
+        Reads the examples of the "## intent:<name>" sections line by line, the
+        synonym, regex and lookup sections are skipped
+        """
+        intent = None
+        for line in codecs.getreader("utf-8-sig")(source):
+            line = line.strip()
+            section = SECTION_REGEX.match(line)
+            if section:
+                intent = (
+                    normalize_name(section.group("name").split("/")[0])
+                    if section.group("type").strip() == "intent"
+                    else None
+                )
+                continue
+
+            item = ITEM_REGEX.match(line)
+            if intent is None or not item:
+                continue
+
+            text, entities = parse_example(item.group("text"))
+            yield {"text": text, "intent": intent, "entities": entities}
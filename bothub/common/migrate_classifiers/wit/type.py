@@ -1,83 +1,65 @@
-import io
+import contextlib
 import json
 import re
+import shutil
+import tempfile
 import zipfile
 
 import requests
 
-from bothub.common.migrate_classifiers.classifiers import ClassifierType
+from bothub.common.migrate_classifiers.classifiers import ClassifierType, normalize_name
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
 
 
 class WitType(ClassifierType):
     name = "Wit.ai"
     slug = "wit"
 
-    def migrate(self):
-        from bothub.common.models import RepositoryExample
-        from bothub.common.models import RepositoryIntent
-        from bothub.common.models import RepositoryEntity
-        from bothub.common.models import RepositoryExampleEntity
-
-        try:
-            request_api = requests.get(
-                url="https://api.wit.ai/export",
-                headers={"Authorization": "Bearer {}".format(self.auth_token)},
-            ).json()
-
-            expressions = ""
-            response = requests.get(request_api.get("uri"))
-            with zipfile.ZipFile(io.BytesIO(response.content)) as thezip:
-                for zipinfo in thezip.infolist():
-                    with thezip.open(zipinfo) as thefile:
-                        if re.search("utterances.*", thefile.name):
-                            for line in thefile.readlines():
-                                expressions += line.decode("utf-8", "replace").replace(
-                                    '\\"', ""
-                                )
+    @contextlib.contextmanager
+    def open_source(self):
+        """
+        Downloads the export of the app to a temporary file
+        """
+        request_api = requests.get(
+            url="https://api.wit.ai/export",
+            headers={"Authorization": "Bearer {}".format(self.auth_token)},
+        ).json()
 
-            for data in json.loads(expressions).get("utterances", []):
-                text = str(data.get("text").encode("utf-8", "replace").decode("utf-8"))
-                intent_text = data.get("intent")
+        with tempfile.TemporaryFile() as export:
+            with requests.get(request_api.get("uri"), stream=True) as response:
+                response.raise_for_status()
+                response.raw.decode_content = True
+                shutil.copyfileobj(response.raw, export, DOWNLOAD_CHUNK_SIZE)
+            export.seek(0)
+            yield export
 
-                if RepositoryExample.objects.filter(
-                    text=text,
-                    intent__text=intent_text,
-                    repository_version_language__repository_version__repository=self.repository_version.repository,
-                    repository_version_language__repository_version=self.repository_version,
-                    repository_version_language__language=self.language,
-                ):
+    def iter_records(self, source):
+        """
+        Each utterances file of the zip is parsed on its own
+        """
+        with zipfile.ZipFile(source) as thezip:
+            for zipinfo in thezip.infolist():
+                if not re.search("utterances.*", zipinfo.filename):
                     continue
+                with thezip.open(zipinfo) as thefile:
+                    data = json.loads(thefile.read().decode("utf-8"))
 
-                intent, created = RepositoryIntent.objects.get_or_create(
-                    text=intent_text, repository_version=self.repository_version
-                )
-                example_id = RepositoryExample.objects.create(
-                    repository_version_language=self.repository_version.get_version_language(
-                        language=self.language
-                    ),
-                    text=text,
-                    intent=intent,
-                )
-
-                for entities in data.get("entities", []):
-                    entity_text = (
-                        entities.get("entity").split(":")[0].replace(" ", "_").lower()
-                    )
-                    start = entities.get("start")
-                    end = entities.get("end")
-
-                    entity, created = RepositoryEntity.objects.get_or_create(
-                        repository_version=self.repository_version, value=entity_text
-                    )
-                    RepositoryExampleEntity.objects.create(
-                        repository_example=example_id,
-                        start=start,
-                        end=end,
-                        entity=entity,
-                    )
-
-            return True
-        except requests.ConnectionError:
-            return False
-        except json.JSONDecodeError:
-            return False
+                for utterance in data.get("utterances", []):
+                    if not isinstance(utterance, dict) or not isinstance(
+                        utterance.get("intent"), str
+                    ):
+                        continue
+                    yield {
+                        "text": utterance.get("text"),
+                        "intent": normalize_name(utterance.get("intent")),
+                        "entities": [
+                            {
+                                "entity": normalize_name(entity.get("entity", "")),
+                                "start": entity.get("start"),
+                                "end": entity.get("end"),
+                            }
+                            for entity in utterance.get("entities") or []
+                            if isinstance(entity, dict)
+                        ],
+                    }
@@ -0,0 +1,79 @@
+# Generated by Django 2.2.17 on 2026-10-19 09:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0006_auto_20200729_1220"),
+        ("common", "0102_repositoryevaluateresult_cross_validation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RepositoryTrainSchedule",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "priority",
+                    models.PositiveIntegerField(
+                        choices=[(0, "Default version"), (1, "Version")],
+                        default=1,
+                        verbose_name="priority",
+                    ),
+                ),
+                (
+                    "status",
+                    models.PositiveIntegerField(
+                        choices=[
+                            (0, "Pending"),
+                            (1, "Processing"),
+                            (2, "Success"),
+                            (3, "Failed"),
+                        ],
+                        default=0,
+                        verbose_name="status",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="created at"),
+                ),
+                ("sent_at", models.DateTimeField(null=True, verbose_name="sent at")),
+                ("response", models.TextField(blank=True, verbose_name="response")),
+                (
+                    "owner",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="authentication.RepositoryOwner",
+                    ),
+                ),
+                (
+                    "repository_version",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="train_schedules",
+                        to="common.RepositoryVersion",
+                    ),
+                ),
+            ],
+            options={"verbose_name": "repository train schedule"},
+        ),
+        migrations.AddIndex(
+            model_name="repositorytrainschedule",
+            index=models.Index(
+                fields=["status", "priority", "created_at"],
+                name="common_repo_train_sched_idx",
+            ),
+        ),
+    ]
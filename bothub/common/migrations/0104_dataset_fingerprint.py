@@ -0,0 +1,33 @@
+# Generated by Django 2.2.17 on 2026-10-19 09:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("common", "0103_repositorytrainschedule")]
+
+    operations = [
+        migrations.AddField(
+            model_name="repositorynlptrain",
+            name="dataset_fingerprint",
+            field=models.CharField(
+                blank=True, max_length=64, verbose_name="dataset fingerprint"
+            ),
+        ),
+        migrations.AddField(
+            model_name="repositoryversionlanguage",
+            name="dataset_fingerprint",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=64,
+                verbose_name="dataset fingerprint",
+            ),
+        ),
+        migrations.AddField(
+            model_name="repositoryversionlanguage",
+            name="dataset_fingerprint_at",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+    ]
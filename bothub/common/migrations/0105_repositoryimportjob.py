@@ -0,0 +1,113 @@
+# Generated by Django 2.2.17 on 2026-10-19 09:56
+
+import bothub.common.languages
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0006_auto_20200729_1220"),
+        ("common", "0104_dataset_fingerprint"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="repositoryqueuetask",
+            name="type_processing",
+            field=models.PositiveIntegerField(
+                choices=[
+                    (0, "NLP Tranining"),
+                    (1, "Repository Auto Translation"),
+                    (2, "Repository Examples Import"),
+                ],
+                verbose_name="Type Processing",
+            ),
+        ),
+        migrations.CreateModel(
+            name="RepositoryImportJob",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "file_format",
+                    models.CharField(
+                        choices=[("examples", "Bothub examples"), ("rasa", "Rasa NLU")],
+                        max_length=16,
+                        verbose_name="file format",
+                    ),
+                ),
+                (
+                    "language",
+                    models.CharField(
+                        blank=True,
+                        max_length=5,
+                        validators=[bothub.common.languages.validate_language],
+                        verbose_name="language",
+                    ),
+                ),
+                ("file", models.FileField(upload_to="imports/", verbose_name="file")),
+                (
+                    "rejected_file",
+                    models.FileField(
+                        blank=True,
+                        upload_to="imports/rejected/",
+                        verbose_name="rejected examples",
+                    ),
+                ),
+                (
+                    "phase",
+                    models.PositiveIntegerField(
+                        choices=[(0, "Uploaded"), (1, "Importing"), (2, "Finished")],
+                        default=0,
+                        verbose_name="phase",
+                    ),
+                ),
+                (
+                    "processed",
+                    models.PositiveIntegerField(default=0, verbose_name="processed"),
+                ),
+                ("added", models.PositiveIntegerField(default=0, verbose_name="added")),
+                (
+                    "rejected",
+                    models.PositiveIntegerField(default=0, verbose_name="rejected"),
+                ),
+                ("error", models.TextField(blank=True, verbose_name="error")),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="authentication.RepositoryOwner",
+                    ),
+                ),
+                (
+                    "repository_version",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="import_jobs",
+                        to="common.RepositoryVersion",
+                    ),
+                ),
+                (
+                    "task",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="import_job",
+                        to="common.RepositoryQueueTask",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "repository import job",
+                "verbose_name_plural": "repository import jobs",
+            },
+        ),
+    ]
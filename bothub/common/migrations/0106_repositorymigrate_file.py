@@ -0,0 +1,23 @@
+# Generated by Django 2.2.17 on 2026-10-19 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("common", "0105_repositoryimportjob")]
+
+    operations = [
+        migrations.AddField(
+            model_name="repositorymigrate",
+            name="file",
+            field=models.FileField(
+                blank=True, upload_to="migrations/", verbose_name="file"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="repositorymigrate",
+            name="auth_token",
+            field=models.TextField(blank=True),
+        ),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 2.2.17 on 2026-10-19 10:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0006_auto_20200729_1220"),
+        ("common", "0106_repositorymigrate_file"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="repositoryqueuetask",
+            name="type_processing",
+            field=models.PositiveIntegerField(
+                choices=[
+                    (0, "NLP Tranining"),
+                    (1, "Repository Auto Translation"),
+                    (2, "Repository Examples Import"),
+                    (3, "Repository Dump"),
+                    (4, "Repository Restore"),
+                ],
+                verbose_name="Type Processing",
+            ),
+        ),
+        migrations.CreateModel(
+            name="RepositoryDump",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "dump_type",
+                    models.PositiveIntegerField(
+                        choices=[(0, "Dump"), (1, "Restore")],
+                        default=0,
+                        verbose_name="type",
+                    ),
+                ),
+                (
+                    "file",
+                    models.FileField(
+                        blank=True, upload_to="dumps/", verbose_name="file"
+                    ),
+                ),
+                ("manifest", models.TextField(blank=True, verbose_name="manifest")),
+                ("error", models.TextField(blank=True, verbose_name="error")),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="authentication.RepositoryOwner",
+                    ),
+                ),
+                (
+                    "repository",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="dumps",
+                        to="common.Repository",
+                    ),
+                ),
+                (
+                    "repository_version",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Dump only this version, all the versions when empty",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="dumps",
+                        to="common.RepositoryVersion",
+                    ),
+                ),
+                (
+                    "task",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="dump",
+                        to="common.RepositoryQueueTask",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "repository dump",
+                "verbose_name_plural": "repository dumps",
+            },
+        ),
+    ]
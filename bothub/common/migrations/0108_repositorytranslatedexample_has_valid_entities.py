@@ -0,0 +1,28 @@
+# Generated by Django 2.2.17 on 2026-10-19 10:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("common", "0107_repositorydump")]
+
+    operations = [
+        migrations.AddField(
+            model_name="repositorytranslatedexample",
+            name="has_valid_entities",
+            field=models.BooleanField(
+                default=True,
+                editable=False,
+                help_text="The translation has the same entities of the original example",
+                verbose_name="has valid entities",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="repositorytranslatedexample",
+            index=models.Index(
+                fields=["language", "has_valid_entities"],
+                name="common_translated_valid_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.17 on 2026-10-19 11:40
+from django.db import migrations
+
+from bothub.common.search import CreateSearchIndex
+
+
+class Migration(migrations.Migration):
+
+    # the indexes are created concurrently, that can not run in a transaction
+    atomic = False
+
+    dependencies = [
+        ("common", "0108_repositorytranslatedexample_has_valid_entities"),
+        ("authentication", "0006_auto_20200729_1220"),
+    ]
+
+    operations = [
+        CreateSearchIndex("common_repositorynlplog", "text"),
+        CreateSearchIndex("common_repositoryexample", "text"),
+        CreateSearchIndex("common_repository_evaluate", "text"),
+        CreateSearchIndex("common_repository", "name"),
+        CreateSearchIndex("authentication_repositoryowner", "name"),
+        CreateSearchIndex("authentication_repositoryowner", "nickname"),
+    ]
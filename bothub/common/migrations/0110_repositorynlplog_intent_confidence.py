@@ -0,0 +1,45 @@
+# Generated by Django 2.2.17 on 2026-10-19 10:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("common", "0109_search_indexes")]
+
+    operations = [
+        migrations.AddField(
+            model_name="repositorynlplog",
+            name="confidence",
+            field=models.FloatField(
+                editable=False,
+                help_text="Confidence of the intent selected",
+                null=True,
+                verbose_name="confidence",
+            ),
+        ),
+        migrations.AddField(
+            model_name="repositorynlplog",
+            name="intent",
+            field=models.TextField(
+                editable=False,
+                help_text="Intent selected",
+                null=True,
+                verbose_name="intent",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="repositorynlplog",
+            index=models.Index(
+                fields=["repository_version_language", "intent", "-created_at"],
+                name="common_nlp_log_intent_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="repositorynlplog",
+            index=models.Index(
+                fields=["repository_version_language", "confidence", "-created_at"],
+                name="common_nlp_log_confidence_idx",
+            ),
+        ),
+    ]
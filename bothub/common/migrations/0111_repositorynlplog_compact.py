@@ -0,0 +1,25 @@
+# Generated by Django 2.2.17 on 2026-10-19 10:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("common", "0110_repositorynlplog_intent_confidence")]
+
+    operations = [
+        migrations.AddField(
+            model_name="repositorynlplog",
+            name="intent_ranking",
+            field=models.BinaryField(
+                help_text="Compressed list of intent, confidence and is default",
+                null=True,
+                verbose_name="intent ranking",
+            ),
+        ),
+        migrations.AddField(
+            model_name="repositorynlplog",
+            name="nlp_log_compressed",
+            field=models.BinaryField(null=True, verbose_name="NLP log compressed"),
+        ),
+    ]
@@ -0,0 +1,130 @@
+# Generated by Django 2.2.17 on 2026-10-19 10:40
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import F
+
+
+def noop(apps, schema_editor):  # pragma: no cover
+    pass
+
+
+def count_logs(apps, schema_editor):  # pragma: no cover
+    # every prediction was stored as a log before the policies
+    RepositoryReports = apps.get_model("common", "RepositoryReports")
+    RepositoryReports.objects.update(count_logs=F("count_reports"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("common", "0111_repositorynlplog_compact")]
+
+    operations = [
+        migrations.AddField(
+            model_name="repositoryreports",
+            name="count_logs",
+            field=models.IntegerField(
+                default=0, help_text="Predictions stored as logs"
+            ),
+        ),
+        migrations.RunPython(count_logs, noop),
+        migrations.CreateModel(
+            name="RepositoryNLPLogPolicy",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "sample_rate",
+                    models.FloatField(
+                        default=1.0,
+                        help_text="Fraction of the predictions stored",
+                        validators=[
+                            django.core.validators.MinValueValidator(0.0),
+                            django.core.validators.MaxValueValidator(1.0),
+                        ],
+                        verbose_name="sample rate",
+                    ),
+                ),
+                (
+                    "max_confidence",
+                    models.FloatField(
+                        blank=True,
+                        help_text="Only store predictions with a confidence below this value",
+                        null=True,
+                        validators=[
+                            django.core.validators.MinValueValidator(0.0),
+                            django.core.validators.MaxValueValidator(1.0),
+                        ],
+                        verbose_name="max confidence",
+                    ),
+                ),
+                (
+                    "skip_from_backend",
+                    models.BooleanField(
+                        default=False,
+                        help_text="Do not store the predictions made from the backend",
+                        verbose_name="skip from backend",
+                    ),
+                ),
+                (
+                    "daily_limit",
+                    models.PositiveIntegerField(
+                        blank=True,
+                        help_text="Maximum number of logs stored per day",
+                        null=True,
+                        verbose_name="daily limit",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="created at"),
+                ),
+                (
+                    "repository",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="nlp_log_policies",
+                        to="common.Repository",
+                    ),
+                ),
+                (
+                    "repository_authorization",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Authorization of the policy, empty for the whole repository",
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="nlp_log_policies",
+                        to="common.RepositoryAuthorization",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "repository nlp log policy",
+                "verbose_name_plural": "repository nlp log policies",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="repositorynlplogpolicy",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(repository_authorization__isnull=True),
+                fields=("repository",),
+                name="common_nlp_log_policy_repository_unique",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="repositorynlplogpolicy",
+            constraint=models.UniqueConstraint(
+                fields=("repository_authorization",),
+                name="common_nlp_log_policy_authorization_unique",
+            ),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 2.2.17 on 2026-10-19 10:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import OuterRef, Subquery
+
+
+def noop(apps, schema_editor):  # pragma: no cover
+    pass
+
+
+def fill_repository(apps, schema_editor):  # pragma: no cover
+    RepositoryReports = apps.get_model("common", "RepositoryReports")
+    RepositoryVersionLanguage = apps.get_model("common", "RepositoryVersionLanguage")
+    RepositoryReports.objects.update(
+        repository=Subquery(
+            RepositoryVersionLanguage.objects.filter(
+                pk=OuterRef("repository_version_language")
+            ).values("repository_version__repository")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("common", "0112_repositorynlplogpolicy")]
+
+    operations = [
+        migrations.AddField(
+            model_name="repositoryreports",
+            name="repository",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="reports",
+                to="common.Repository",
+            ),
+        ),
+        migrations.RunPython(fill_repository, noop),
+        migrations.AddIndex(
+            model_name="repositoryreports",
+            index=models.Index(
+                fields=["user", "report_date", "repository"],
+                name="common_reports_user_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="repositoryreports",
+            index=models.Index(
+                fields=["repository", "report_date"],
+                name="common_reports_repo_date_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 2.2.17 on 2026-10-19 10:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("common", "0113_repositoryreports_repository")]
+
+    operations = [
+        migrations.CreateModel(
+            name="RepositoryEvaluateResultLog",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "position",
+                    models.PositiveIntegerField(
+                        help_text="Position of the sentence in the log sent by the NLP"
+                    ),
+                ),
+                ("text", models.TextField(blank=True, verbose_name="text")),
+                ("intent", models.TextField(blank=True, verbose_name="intent")),
+                (
+                    "predicted_intent",
+                    models.TextField(blank=True, verbose_name="predicted intent"),
+                ),
+                ("confidence", models.FloatField(null=True, verbose_name="confidence")),
+                (
+                    "status",
+                    models.CharField(blank=True, max_length=32, verbose_name="status"),
+                ),
+                ("is_error", models.BooleanField(default=False)),
+                (
+                    "data",
+                    models.TextField(
+                        help_text="The sentence as sent by the NLP, in JSON"
+                    ),
+                ),
+                (
+                    "evaluate_result",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="evaluate_result_log",
+                        to="common.RepositoryEvaluateResult",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "common_repository_evaluate_result_log",
+                "ordering": ["-is_error", "position"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="repositoryevaluateresultlog",
+            index=models.Index(
+                fields=["evaluate_result", "-is_error", "position"],
+                name="common_eval_log_order_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="repositoryevaluateresultlog",
+            index=models.Index(
+                fields=["evaluate_result", "intent", "confidence"],
+                name="common_eval_log_intent_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="repositoryevaluateresultlog",
+            index=models.Index(
+                fields=["evaluate_result", "confidence"],
+                name="common_eval_log_confidence_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 2.2.17 on 2026-10-19 11:01
+
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def noop(apps, schema_editor):  # pragma: no cover
+    pass
+
+
+def fill_evaluate_results_version(apps, schema_editor):  # pragma: no cover
+    Repository = apps.get_model("common", "Repository")
+    RepositoryEvaluateResult = apps.get_model("common", "RepositoryEvaluateResult")
+
+    last_version = (
+        RepositoryEvaluateResult.objects.filter(
+            repository_version_language__repository_version__repository=OuterRef("pk")
+        )
+        .order_by()
+        .values("repository_version_language__repository_version__repository")
+        .annotate(last_version=Max("version"))
+        .values("last_version")
+    )
+    Repository.objects.update(
+        evaluate_results_version=Coalesce(Subquery(last_version[:1]), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("common", "0114_repositoryevaluateresultlog")]
+
+    operations = [
+        migrations.AddField(
+            model_name="repository",
+            name="evaluate_results_version",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                verbose_name="Version of the last evaluate result",
+            ),
+        ),
+        migrations.RunPython(fill_evaluate_results_version, noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 2.2.17 on 2026-10-19 11:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("common", "0115_repository_evaluate_results_version")]
+
+    operations = [
+        migrations.AddField(
+            model_name="repositoryversionlanguage",
+            name="evaluations_version",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                verbose_name="version of the evaluate sentences",
+            ),
+        )
+    ]
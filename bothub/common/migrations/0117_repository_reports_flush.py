@@ -0,0 +1,31 @@
+# Generated by Django 2.2.17 on 2026-10-19 11:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("common", "0116_repositoryversionlanguage_evaluations_version")]
+
+    operations = [
+        migrations.CreateModel(
+            name="RepositoryReportsFlush",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("flush_id", models.CharField(max_length=36, unique=True)),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="created at"),
+                ),
+            ],
+            options={"db_table": "common_repository_reports_flush"},
+        )
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 2.2.17 on 2026-10-19 11:44
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def noop(apps, schema_editor):  # pragma: no cover
+    pass
+
+
+def fail_duplicated_schedules(apps, schema_editor):  # pragma: no cover
+    """
+    Keeps the oldest queued schedule of each version, the repeated ones are
+    marked as failed
+    """
+    RepositoryTrainSchedule = apps.get_model("common", "RepositoryTrainSchedule")
+
+    queued = RepositoryTrainSchedule.objects.filter(status__in=[0, 1])
+    older = queued.filter(
+        repository_version=OuterRef("repository_version"), pk__lt=OuterRef("pk")
+    )
+    duplicated = (
+        queued.annotate(duplicated=Exists(older)).filter(duplicated=True).values("pk")
+    )
+    RepositoryTrainSchedule.objects.filter(pk__in=duplicated).update(
+        status=3, response="Duplicated schedule"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("common", "0117_repository_reports_flush")]
+
+    operations = [
+        migrations.RunPython(fail_duplicated_schedules, noop),
+        migrations.AddConstraint(
+            model_name="repositorytrainschedule",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(status__in=[0, 1]),
+                fields=("repository_version",),
+                name="common_repo_train_sched_queued",
+            ),
+        ),
+    ]
@@ -1,13 +1,22 @@
+import hashlib
+import json
+import random
 import uuid
+import zlib
 from functools import reduce
 
 import requests
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.mail import send_mail
-from django.core.validators import RegexValidator, _lazy_re_compile
-from django.db import models
-from django.db.models import Sum, Q, IntegerField, Case, When
+from django.core.validators import (
+    MaxValueValidator,
+    MinValueValidator,
+    RegexValidator,
+    _lazy_re_compile,
+)
+from django.db import connections, models, transaction
+from django.db.models import Sum, Q, F, Exists, OuterRef
 from django.dispatch import receiver
 from django.template.loader import render_to_string
 from django.utils import timezone
@@ -16,6 +25,7 @@ from rest_framework import status
 from rest_framework.exceptions import APIException
 
 from bothub.authentication.models import User, RepositoryOwner
+from . import counters
 from . import languages
 from .exceptions import DoesNotHaveTranslation
 from .exceptions import RepositoryUpdateAlreadyStartedTraining
@@ -80,22 +90,17 @@ class RepositoryQuerySet(models.QuerySet):
         )
 
     def count_logs(self, start_date=None, end_date=None, user=None, *args, **kwargs):
-        return self.annotate(
-            total_count=Sum(
-                Case(
-                    When(
-                        versions__repositoryversionlanguage__repository_reports__user=user,
-                        versions__repositoryversionlanguage__repository_reports__report_date__range=(
-                            start_date,
-                            end_date,
-                        ),
-                        then="versions__repositoryversionlanguage__repository_reports__count_reports",
-                    ),
-                    default=0,
-                    output_field=IntegerField(),
-                )
+        """
+        Annotates the repositories used by the user in the date range with the
+        total of predictions, read from the daily reports
+        """
+        return (
+            self.filter(
+                reports__user=user, reports__report_date__range=(start_date, end_date)
             )
-        ).filter(*args, **kwargs)
+            .annotate(total_count=Sum("reports__count_reports"))
+            .filter(*args, **kwargs)
+        )
 
 
 class RepositoryManager(models.Manager):
@@ -341,6 +346,9 @@ class Repository(models.Model):
     count_authorizations = models.IntegerField(
         _("Authorization count calculated by celery"), default=0
     )
+    evaluate_results_version = models.PositiveIntegerField(
+        _("Version of the last evaluate result"), default=0, editable=False
+    )
 
     objects = RepositoryManager()
 
@@ -715,6 +723,23 @@ class Repository(models.Model):
         )
         return query
 
+    def next_evaluate_result_version(self, count=1):
+        """
+        Increments the version counter of the evaluate results by count and
+        returns the last reserved version, the repository row stays locked
+        until the end of the transaction
+        """
+        with transaction.atomic():
+            Repository.objects.filter(pk=self.pk).update(
+                evaluate_results_version=F("evaluate_results_version") + count
+            )
+            self.evaluate_results_version = (
+                Repository.objects.filter(pk=self.pk)
+                .values_list("evaluate_results_version", flat=True)
+                .get()
+            )
+        return self.evaluate_results_version
+
     def language_status(self, language):
         is_base_language = self.language == language
         examples = self.examples(language)
@@ -838,6 +863,31 @@ class RepositoryVersion(models.Model):
     def version_languages(self):
         return RepositoryVersionLanguage.objects.filter(repository_version=self)
 
+    @property
+    def ready_for_train(self):
+        return any(
+            version_language.ready_for_train
+            for version_language in self.version_languages
+        )
+
+    @property
+    def already_trained(self):
+        return self.is_already_trained()
+
+    def is_already_trained(self, compute=False):
+        """
+        True when there is nothing to train because the trained languages
+        have the same dataset of their last training, compute updates their
+        stale fingerprints first
+        """
+        version_languages = list(self.version_languages)
+        if compute:
+            for version_language in version_languages:
+                version_language.is_already_trained(compute=True)
+        return not self.ready_for_train and any(
+            version_language.already_trained for version_language in version_languages
+        )
+
     def get_version_language(self, language):
         version_language, created = RepositoryVersionLanguage.objects.get_or_create(
             repository_version=self, language=language
@@ -972,6 +1022,13 @@ class RepositoryVersionLanguage(models.Model):
     total_training_end = models.IntegerField(
         _("total training end"), default=0, blank=False, null=False
     )
+    dataset_fingerprint = models.CharField(
+        _("dataset fingerprint"), max_length=64, blank=True, editable=False
+    )
+    dataset_fingerprint_at = models.DateTimeField(null=True, editable=False)
+    evaluations_version = models.PositiveIntegerField(
+        _("version of the evaluate sentences"), default=0, editable=False
+    )
 
     @property
     def examples(self):
@@ -1093,6 +1150,8 @@ class RepositoryVersionLanguage(models.Model):
             and not from_nlp
         ):
             raise RepositoryUpdateAlreadyStartedTraining()
+        if not from_nlp and self.already_trained:
+            raise RepositoryUpdateAlreadyTrained()
         if by:
             authorization = self.repository_version.repository.get_user_authorization(
                 by
@@ -1102,6 +1161,8 @@ class RepositoryVersionLanguage(models.Model):
 
     def start_training(self, created_by):
         self.validate_init_train(created_by, from_nlp=True)
+        # keeps the fingerprint of the dataset sent to the NLP up to date
+        self.get_dataset_fingerprint()
         self.training_started_at = timezone.now()
         self.algorithm = self.repository_version.repository.algorithm
         self.use_competing_intents = (
@@ -1134,23 +1195,157 @@ class RepositoryVersionLanguage(models.Model):
         )
         return trainer
 
-    def update_trainer(self, bot_data, rasa_version):
+    def update_trainer(self, bot_data, rasa_version, dataset_fingerprint=""):
         trainer, created = RepositoryNLPTrain.objects.get_or_create(
             repositoryversionlanguage=self, rasa_version=rasa_version
         )
         trainer.bot_data = bot_data
-        trainer.save(update_fields=["bot_data"])
+        trainer.dataset_fingerprint = dataset_fingerprint
+        trainer.save(update_fields=["bot_data", "dataset_fingerprint"])
 
     def save_training(self, bot_data, rasa_version):
         last_time = timezone.now()
+        update_fields = ["total_training_end", "training_end_at", "last_update"]
+
+        # the stored fingerprint only describes the trained dataset when
+        # nothing changed since the training started
+        last_update, fingerprint, fingerprint_at = self.dataset_fingerprint_state()
+        trained_fingerprint = ""
+        if (
+            fingerprint_at is not None
+            and (last_update is None or last_update <= fingerprint_at)
+            and self.training_started_at is not None
+            and fingerprint_at <= self.training_started_at
+        ):
+            trained_fingerprint = fingerprint
+            self.dataset_fingerprint = fingerprint
+            self.dataset_fingerprint_at = last_time
+            update_fields += ["dataset_fingerprint", "dataset_fingerprint_at"]
 
         self.training_end_at = last_time
         self.last_update = last_time
-        self.update_trainer(bot_data, rasa_version=rasa_version)
+        self.update_trainer(
+            bot_data, rasa_version=rasa_version, dataset_fingerprint=trained_fingerprint
+        )
         self.total_training_end += 1
-        self.save(
-            update_fields=["total_training_end", "training_end_at", "last_update"]
+        self.save(update_fields=update_fields)
+
+    def compute_dataset_fingerprint(self):
+        """
+        sha256 of the data sent to train: examples text, intent and entities
+        in this language, plus the algorithm flags of the repository.
+        The examples hashes are summed so their order does not matter.
+        """
+        repository = self.repository_version.repository
+        examples = self.examples
+        entity_fields = ["start", "end", "entity__value", "entity__group__value"]
+
+        dataset = {}
+        for pk, text, intent in examples.filter(
+            repository_version_language__language=self.language
+        ).values_list("pk", "text", "intent__text"):
+            dataset[("example", pk)] = [text, intent, []]
+        for pk, text, intent in (
+            RepositoryTranslatedExample.objects.filter(
+                original_example__in=examples.values("pk"), language=self.language
+            )
+            .exclude(
+                original_example__repository_version_language__language=self.language
+            )
+            .values_list("pk", "text", "original_example__intent__text")
+        ):
+            dataset[("translation", pk)] = [text, intent, []]
+
+        for key, entities in [
+            (
+                "example",
+                RepositoryExampleEntity.objects.filter(
+                    repository_example__in=examples.filter(
+                        repository_version_language__language=self.language
+                    ).values("pk")
+                ).values_list("repository_example", *entity_fields),
+            ),
+            (
+                "translation",
+                RepositoryTranslatedExampleEntity.objects.filter(
+                    repository_translated_example__language=self.language,
+                    repository_translated_example__original_example__in=examples.values(
+                        "pk"
+                    ),
+                ).values_list("repository_translated_example", *entity_fields),
+            ),
+        ]:
+            for pk, start, end, entity, group in entities:
+                if (key, pk) in dataset:
+                    dataset[(key, pk)][2].append([start, end, entity, group or ""])
+
+        digest = 0
+        for text, intent, entities in dataset.values():
+            item = json.dumps([text, intent, sorted(entities)])
+            digest += int(hashlib.sha256(item.encode()).hexdigest(), 16)
+
+        header = json.dumps(
+            [
+                self.language,
+                repository.algorithm,
+                repository.use_name_entities,
+                repository.use_competing_intents,
+                repository.use_analyze_char,
+            ]
+        )
+        return hashlib.sha256(
+            "{}:{:x}".format(header, digest % 2 ** 256).encode()
+        ).hexdigest()
+
+    def dataset_fingerprint_state(self):
+        return (
+            RepositoryVersionLanguage.objects.filter(pk=self.pk)
+            .values_list("last_update", "dataset_fingerprint", "dataset_fingerprint_at")
+            .get()
+        )
+
+    def get_dataset_fingerprint(self, compute=True):
+        """
+        Fingerprint of the current dataset, it is only computed again when the
+        dataset changed (last_update moved or the fingerprint was invalidated).
+        Without compute a stale fingerprint is not computed and None is returned
+        """
+        last_update, fingerprint, fingerprint_at = self.dataset_fingerprint_state()
+        if fingerprint_at is not None and (
+            last_update is None or last_update <= fingerprint_at
+        ):
+            return fingerprint
+        if not compute:
+            return None
+
+        computed_at = last_update or timezone.now()
+        fingerprint = self.compute_dataset_fingerprint()
+        RepositoryVersionLanguage.objects.filter(pk=self.pk).update(
+            dataset_fingerprint=fingerprint, dataset_fingerprint_at=computed_at
         )
+        self.dataset_fingerprint = fingerprint
+        self.dataset_fingerprint_at = computed_at
+        return fingerprint
+
+    @property
+    def already_trained(self):
+        return self.is_already_trained()
+
+    def is_already_trained(self, compute=False):
+        """
+        True when the dataset is the one of the last training. The requests
+        only read the stored fingerprint, a stale one counts as a changed
+        dataset until the update_dataset_fingerprints task computes it
+        """
+        trained_fingerprint = (
+            self.trainers.filter(rasa_version=settings.BOTHUB_NLP_RASA_VERSION)
+            .exclude(dataset_fingerprint="")
+            .values_list("dataset_fingerprint", flat=True)
+            .first()
+        )
+        if not trained_fingerprint:
+            return False
+        return trained_fingerprint == self.get_dataset_fingerprint(compute=compute)
 
     @property
     def get_bot_data(self):
@@ -1172,6 +1367,9 @@ class RepositoryNLPTrain(models.Model):
     )
     rasa_version = models.CharField(_("Rasa Version Code"), max_length=20)
     created_at = models.DateTimeField(_("created at"), auto_now_add=True)
+    dataset_fingerprint = models.CharField(
+        _("dataset fingerprint"), max_length=64, blank=True
+    )
 
 
 class RepositoryQueueTask(models.Model):
@@ -1194,9 +1392,15 @@ class RepositoryQueueTask(models.Model):
     ]
     TYPE_PROCESSING_TRAINING = 0
     TYPE_PROCESSING_AUTO_TRANSLATE = 1
+    TYPE_PROCESSING_IMPORT = 2
+    TYPE_PROCESSING_DUMP = 3
+    TYPE_PROCESSING_RESTORE = 4
     TYPE_PROCESSING_CHOICES = [
         (TYPE_PROCESSING_TRAINING, _("NLP Tranining")),
         (TYPE_PROCESSING_AUTO_TRANSLATE, _("Repository Auto Translation")),
+        (TYPE_PROCESSING_IMPORT, _("Repository Examples Import")),
+        (TYPE_PROCESSING_DUMP, _("Repository Dump")),
+        (TYPE_PROCESSING_RESTORE, _("Repository Restore")),
     ]
 
     repositoryversionlanguage = models.ForeignKey(
@@ -1217,6 +1421,294 @@ class RepositoryQueueTask(models.Model):
     )
 
 
+class RepositoryImportJob(models.Model):
+    class Meta:
+        verbose_name = _("repository import job")
+        verbose_name_plural = _("repository import jobs")
+
+    FORMAT_EXAMPLES = "examples"
+    FORMAT_RASA = "rasa"
+    FORMAT_CHOICES = [
+        (FORMAT_EXAMPLES, _("Bothub examples")),
+        (FORMAT_RASA, _("Rasa NLU")),
+    ]
+
+    PHASE_UPLOADED = 0
+    PHASE_IMPORTING = 1
+    PHASE_FINISHED = 2
+    PHASE_CHOICES = [
+        (PHASE_UPLOADED, _("Uploaded")),
+        (PHASE_IMPORTING, _("Importing")),
+        (PHASE_FINISHED, _("Finished")),
+    ]
+
+    task = models.OneToOneField(
+        RepositoryQueueTask, models.CASCADE, related_name="import_job"
+    )
+    repository_version = models.ForeignKey(
+        RepositoryVersion, models.CASCADE, related_name="import_jobs"
+    )
+    created_by = models.ForeignKey(RepositoryOwner, models.CASCADE)
+    file_format = models.CharField(
+        _("file format"), max_length=16, choices=FORMAT_CHOICES
+    )
+    language = models.CharField(
+        _("language"),
+        max_length=5,
+        validators=[languages.validate_language],
+        blank=True,
+    )
+    file = models.FileField(_("file"), upload_to="imports/")
+    rejected_file = models.FileField(
+        _("rejected examples"), upload_to="imports/rejected/", blank=True
+    )
+    phase = models.PositiveIntegerField(
+        _("phase"), choices=PHASE_CHOICES, default=PHASE_UPLOADED
+    )
+    processed = models.PositiveIntegerField(_("processed"), default=0)
+    added = models.PositiveIntegerField(_("added"), default=0)
+    rejected = models.PositiveIntegerField(_("rejected"), default=0)
+    error = models.TextField(_("error"), blank=True)
+
+
+class RepositoryDump(models.Model):
+    class Meta:
+        verbose_name = _("repository dump")
+        verbose_name_plural = _("repository dumps")
+
+    TYPE_DUMP = 0
+    TYPE_RESTORE = 1
+    TYPE_CHOICES = [(TYPE_DUMP, _("Dump")), (TYPE_RESTORE, _("Restore"))]
+
+    task = models.OneToOneField(
+        RepositoryQueueTask, models.CASCADE, related_name="dump"
+    )
+    repository = models.ForeignKey(Repository, models.CASCADE, related_name="dumps")
+    repository_version = models.ForeignKey(
+        RepositoryVersion,
+        models.SET_NULL,
+        related_name="dumps",
+        blank=True,
+        null=True,
+        help_text=_("Dump only this version, all the versions when empty"),
+    )
+    created_by = models.ForeignKey(RepositoryOwner, models.CASCADE)
+    dump_type = models.PositiveIntegerField(
+        _("type"), choices=TYPE_CHOICES, default=TYPE_DUMP
+    )
+    file = models.FileField(_("file"), upload_to="dumps/", blank=True)
+    manifest = models.TextField(_("manifest"), blank=True)
+    error = models.TextField(_("error"), blank=True)
+
+
+class RepositoryTrainScheduleManager(models.Manager):
+    def ready_for_train(self, versions):
+        """
+        Pks of the versions with a language ready for train. The languages
+        without new examples, already trained since their last update or with
+        a train in the queue are discarded with a single query, only the
+        others run the checks of ready_for_train
+        """
+        queue = RepositoryQueueTask.objects.filter(
+            repositoryversionlanguage=OuterRef("pk"),
+            status__in=[
+                RepositoryQueueTask.STATUS_PENDING,
+                RepositoryQueueTask.STATUS_PROCESSING,
+            ],
+            type_processing=RepositoryQueueTask.TYPE_PROCESSING_TRAINING,
+        )
+        candidates = (
+            RepositoryVersionLanguage.objects.filter(repository_version__in=versions)
+            .annotate(
+                has_added=Exists(
+                    RepositoryExample.objects.filter(
+                        repository_version_language=OuterRef("pk")
+                    )
+                ),
+                has_translated_added=Exists(
+                    RepositoryTranslatedExample.objects.filter(
+                        repository_version_language=OuterRef("pk")
+                    )
+                ),
+                in_queue=Exists(queue),
+            )
+            .filter(Q(has_added=True) | Q(has_translated_added=True), in_queue=False)
+            .exclude(
+                training_end_at__isnull=False,
+                last_update__isnull=False,
+                last_update__lte=F("training_end_at"),
+            )
+            .select_related("repository_version__repository")
+            .order_by("repository_version", "pk")
+        )
+
+        ready = set()
+        for version_language in candidates:
+            if version_language.repository_version_id in ready:
+                continue
+            if version_language.ready_for_train:
+                ready.add(version_language.repository_version_id)
+        return ready
+
+    def schedule(self, versions):
+        """
+        Adds the versions ready for train to the training queue, versions
+        already waiting in the queue are skipped. The ready versions are
+        locked while the queue is checked, so concurrent calls do not queue a
+        version twice
+        """
+        ready = self.ready_for_train(versions)
+
+        with transaction.atomic():
+            versions = list(
+                versions.filter(pk__in=ready)
+                .select_for_update(of=("self",))
+                .select_related("repository")
+                .order_by("pk")
+            ) + list(versions.exclude(pk__in=ready).order_by("pk"))
+            queued = set(
+                self.filter(
+                    repository_version__in=ready,
+                    status__in=[
+                        RepositoryTrainSchedule.STATUS_PENDING,
+                        RepositoryTrainSchedule.STATUS_PROCESSING,
+                    ],
+                ).values_list("repository_version", flat=True)
+            )
+
+            schedules = []
+            skipped = []
+            for version in versions:
+                if version.pk in queued or version.pk not in ready:
+                    skipped.append(version.pk)
+                    continue
+                schedules.append(
+                    RepositoryTrainSchedule(
+                        repository_version=version,
+                        owner_id=version.repository.owner_id,
+                        priority=RepositoryTrainSchedule.PRIORITY_DEFAULT_VERSION
+                        if version.is_default
+                        else RepositoryTrainSchedule.PRIORITY_VERSION,
+                    )
+                )
+                queued.add(version.pk)
+
+            return self.bulk_create(schedules), skipped
+
+    def depth(self):
+        counts = dict(
+            self.filter(
+                status__in=[
+                    RepositoryTrainSchedule.STATUS_PENDING,
+                    RepositoryTrainSchedule.STATUS_PROCESSING,
+                ]
+            )
+            .values_list("status")
+            .annotate(count=models.Count("pk"))
+            .order_by()
+        )
+        return {
+            "pending": counts.get(RepositoryTrainSchedule.STATUS_PENDING, 0),
+            "processing": counts.get(RepositoryTrainSchedule.STATUS_PROCESSING, 0),
+        }
+
+    def next_to_dispatch(self, limit):
+        """
+        Ids of the next pending trains, default versions first and inside the
+        same priority one train per owner at a time (round robin), so a single
+        organization with many repositories does not hold the queue
+        """
+        if limit <= 0:
+            return []
+
+        pending = self.filter(status=RepositoryTrainSchedule.STATUS_PENDING).order_by(
+            "priority", "created_at", "pk"
+        )
+
+        selected = []
+        for priority in [
+            RepositoryTrainSchedule.PRIORITY_DEFAULT_VERSION,
+            RepositoryTrainSchedule.PRIORITY_VERSION,
+        ]:
+            owners = {}
+            for pk, owner in pending.filter(priority=priority).values_list(
+                "pk", "owner"
+            ):
+                owners.setdefault(owner, []).append(pk)
+
+            queues = list(owners.values())
+            while queues and len(selected) < limit:
+                for queue in queues:
+                    selected.append(queue.pop(0))
+                    if len(selected) >= limit:
+                        break
+                queues = [queue for queue in queues if queue]
+
+            if len(selected) >= limit:
+                break
+
+        return selected
+
+
+class RepositoryTrainSchedule(models.Model):
+    class Meta:
+        verbose_name = _("repository train schedule")
+        indexes = [
+            models.Index(
+                name="common_repo_train_sched_idx",
+                fields=("status", "priority", "created_at"),
+            )
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                name="common_repo_train_sched_queued",
+                fields=("repository_version",),
+                condition=Q(status__in=[0, 1]),
+            )
+        ]
+
+    STATUS_PENDING = 0
+    STATUS_PROCESSING = 1
+    STATUS_SUCCESS = 2
+    STATUS_FAILED = 3
+    STATUS_CHOICES = [
+        (STATUS_PENDING, _("Pending")),
+        (STATUS_PROCESSING, _("Processing")),
+        (STATUS_SUCCESS, _("Success")),
+        (STATUS_FAILED, _("Failed")),
+    ]
+
+    PRIORITY_DEFAULT_VERSION = 0
+    PRIORITY_VERSION = 1
+    PRIORITY_CHOICES = [
+        (PRIORITY_DEFAULT_VERSION, _("Default version")),
+        (PRIORITY_VERSION, _("Version")),
+    ]
+
+    repository_version = models.ForeignKey(
+        RepositoryVersion, models.CASCADE, related_name="train_schedules"
+    )
+    owner = models.ForeignKey(RepositoryOwner, models.CASCADE)
+    priority = models.PositiveIntegerField(
+        _("priority"), choices=PRIORITY_CHOICES, default=PRIORITY_VERSION
+    )
+    status = models.PositiveIntegerField(
+        _("status"), choices=STATUS_CHOICES, default=STATUS_PENDING
+    )
+    created_at = models.DateTimeField(_("created at"), auto_now_add=True)
+    sent_at = models.DateTimeField(_("sent at"), null=True)
+    response = models.TextField(_("response"), blank=True)
+
+    objects = RepositoryTrainScheduleManager()
+
+    def request_train(self):
+        repository = self.repository_version.repository
+        user_authorization = repository.get_user_authorization(repository.owner)
+        return repository.request_nlp_train(
+            user_authorization, {"repository_version": self.repository_version.pk}
+        )
+
+
 class RepositoryNLPLog(models.Model):
     class Meta:
         verbose_name = _("repository nlp logs")
@@ -1225,7 +1717,15 @@ class RepositoryNLPLog(models.Model):
                 name="common_repo_nlp_log_idx",
                 fields=("repository_version_language", "user"),
                 condition=Q(from_backend=False),
-            )
+            ),
+            models.Index(
+                name="common_nlp_log_intent_idx",
+                fields=("repository_version_language", "intent", "-created_at"),
+            ),
+            models.Index(
+                name="common_nlp_log_confidence_idx",
+                fields=("repository_version_language", "confidence", "-created_at"),
+            ),
         ]
         ordering = ["-created_at"]
 
@@ -1242,12 +1742,79 @@ class RepositoryNLPLog(models.Model):
     nlp_log = models.TextField(help_text=_("NLP Log"), blank=True)
     user = models.ForeignKey(RepositoryOwner, models.CASCADE)
     created_at = models.DateTimeField(_("created at"), auto_now_add=True)
+    intent = models.TextField(
+        _("intent"), help_text=_("Intent selected"), null=True, editable=False
+    )
+    confidence = models.FloatField(
+        _("confidence"),
+        help_text=_("Confidence of the intent selected"),
+        null=True,
+        editable=False,
+    )
+    nlp_log_compressed = models.BinaryField(
+        _("NLP log compressed"), null=True, editable=False
+    )
+    intent_ranking = models.BinaryField(
+        _("intent ranking"),
+        help_text=_("Compressed list of intent, confidence and is default"),
+        null=True,
+        editable=False,
+    )
 
     def intents(self, repository_nlp_log):
         return RepositoryNLPLogIntent.objects.filter(
             repository_nlp_log=repository_nlp_log
         ).order_by("-is_default")
 
+    def set_nlp_log(self, nlp_log, compact=True):
+        if compact:
+            self.nlp_log = ""
+            self.nlp_log_compressed = zlib.compress(nlp_log.encode("utf-8"))
+        else:
+            self.nlp_log = nlp_log
+            self.nlp_log_compressed = None
+
+    def get_nlp_log(self):
+        if self.nlp_log_compressed is None:
+            return self.nlp_log
+        return zlib.decompress(bytes(self.nlp_log_compressed)).decode("utf-8")
+
+    def set_intent_ranking(self, intents):
+        self.intent_ranking = zlib.compress(
+            json.dumps(
+                [
+                    [
+                        intent.get("intent"),
+                        intent.get("confidence"),
+                        bool(intent.get("is_default")),
+                    ]
+                    for intent in intents
+                ],
+                separators=(",", ":"),
+            ).encode("utf-8")
+        )
+
+    def get_intents(self):
+        """
+        Returns the ranking of the log, the default intent first. The id is the
+        pk of the RepositoryNLPLogIntent or the position in the compact ranking
+        """
+        if self.intent_ranking is None:
+            return list(
+                self.intents(self).values("id", "intent", "confidence", "is_default")
+            )
+        ranking = json.loads(zlib.decompress(bytes(self.intent_ranking)))
+        intents = [
+            {
+                "id": position,
+                "intent": intent,
+                "confidence": confidence,
+                "is_default": is_default,
+            }
+            for position, (intent, confidence, is_default) in enumerate(ranking, 1)
+        ]
+        return sorted(intents, key=lambda intent: not intent.get("is_default"))
+
 
 class RepositoryNLPLogIntent(models.Model):
     class Meta:
@@ -1265,12 +1832,82 @@ class RepositoryNLPLogIntent(models.Model):
     )
 
 
+class RepositoryReportsFlush(models.Model):
+    """
+    Flush of the Redis usage counters added to the reports, a flush that is
+    retried after its counts were saved is not added again
+    """
+
+    class Meta:
+        db_table = "common_repository_reports_flush"
+
+    flush_id = models.CharField(max_length=36, unique=True)
+    created_at = models.DateTimeField(_("created at"), auto_now_add=True)
+
+
+class RepositoryReportsManager(models.Manager):
+    def add_counts(self, counts, flush_id=None):
+        """
+        Adds the counts, tuples of (repository_version_language_id, user_id,
+        report_date, count_reports, count_logs), to the reports with an upsert
+        for each report, the missing reports are created. The counts are
+        added in a single transaction, with the flush_id of the counters they
+        come from. Returns False when that flush was already added
+        """
+        table = self.model._meta.db_table
+        sql = (
+            f"INSERT INTO {table} (repository_id, repository_version_language_id, "
+            "user_id, report_date, count_reports, count_logs) "
+            "SELECT version.repository_id, version_language.id, %s, %s, %s, %s "
+            f"FROM {RepositoryVersionLanguage._meta.db_table} version_language "
+            f"INNER JOIN {RepositoryVersion._meta.db_table} version "
+            "ON version.id = version_language.repository_version_id "
+            "WHERE version_language.id = %s "
+            "ON CONFLICT (repository_version_language_id, user_id, report_date) "
+            f"DO UPDATE SET count_reports = {table}.count_reports "
+            "+ EXCLUDED.count_reports, "
+            f"count_logs = {table}.count_logs + EXCLUDED.count_logs"
+        )
+        with transaction.atomic(using=self.db), connections[self.db].cursor() as cursor:
+            if flush_id is not None:
+                flush, created = RepositoryReportsFlush.objects.using(
+                    self.db
+                ).get_or_create(flush_id=flush_id)
+                if not created:
+                    return False
+            cursor.executemany(
+                sql,
+                [
+                    (user, report_date, count_reports, count_logs, language)
+                    for language, user, report_date, count_reports, count_logs in counts
+                ],
+            )
+        return True
+
+
 class RepositoryReports(models.Model):
+    """
+    Daily usage of a version language by a user, updated at each prediction
+    """
+
     class Meta:
         verbose_name = _("repository report")
         verbose_name_plural = _("repository reports")
         unique_together = ["repository_version_language", "user", "report_date"]
+        indexes = [
+            models.Index(
+                name="common_reports_user_date_idx",
+                fields=["user", "report_date", "repository"],
+            ),
+            models.Index(
+                name="common_reports_repo_date_idx",
+                fields=["repository", "report_date"],
+            ),
+        ]
 
+    repository = models.ForeignKey(
+        Repository, models.CASCADE, editable=False, null=True, related_name="reports"
+    )
     repository_version_language = models.ForeignKey(
         RepositoryVersionLanguage,
         models.CASCADE,
@@ -1279,8 +1916,132 @@ class RepositoryReports(models.Model):
     )
     user = models.ForeignKey(RepositoryOwner, models.CASCADE)
     count_reports = models.IntegerField(default=0)
+    count_logs = models.IntegerField(
+        default=0, help_text=_("Predictions stored as logs")
+    )
     report_date = models.DateField(_("report date"))
 
+    objects = RepositoryReportsManager()
+
+    @classmethod
+    def count_prediction(cls, repository_version_language, user, logged=True):
+        """
+        Adds a prediction to the report of the day, with
+        BOTHUB_USAGE_COUNTERS_REDIS the prediction is counted in Redis and
+        added to the report by the flush_usage_counters task
+        """
+        count = (
+            repository_version_language.pk,
+            user.pk,
+            timezone.now().date(),
+            1,
+            1 if logged else 0,
+        )
+        if settings.BOTHUB_USAGE_COUNTERS_REDIS:
+            counters.increment(*count)
+        else:
+            cls.objects.add_counts([count])
+
+
+class RepositoryNLPLogPolicy(models.Model):
+    """
+    Decides which predictions of a repository, or of one of its
+    authorizations, are stored as logs
+    """
+
+    class Meta:
+        verbose_name = _("repository nlp log policy")
+        verbose_name_plural = _("repository nlp log policies")
+        constraints = [
+            models.UniqueConstraint(
+                name="common_nlp_log_policy_repository_unique",
+                fields=["repository"],
+                condition=Q(repository_authorization__isnull=True),
+            ),
+            models.UniqueConstraint(
+                name="common_nlp_log_policy_authorization_unique",
+                fields=["repository_authorization"],
+            ),
+        ]
+
+    repository = models.ForeignKey(
+        Repository, models.CASCADE, related_name="nlp_log_policies"
+    )
+    repository_authorization = models.ForeignKey(
+        "RepositoryAuthorization",
+        models.CASCADE,
+        related_name="nlp_log_policies",
+        null=True,
+        blank=True,
+        help_text=_("Authorization of the policy, empty for the whole repository"),
+    )
+    sample_rate = models.FloatField(
+        _("sample rate"),
+        default=1.0,
+        validators=[MinValueValidator(0.0), MaxValueValidator(1.0)],
+        help_text=_("Fraction of the predictions stored"),
+    )
+    max_confidence = models.FloatField(
+        _("max confidence"),
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0.0), MaxValueValidator(1.0)],
+        help_text=_("Only store predictions with a confidence below this value"),
+    )
+    skip_from_backend = models.BooleanField(
+        _("skip from backend"),
+        default=False,
+        help_text=_("Do not store the predictions made from the backend"),
+    )
+    daily_limit = models.PositiveIntegerField(
+        _("daily limit"),
+        null=True,
+        blank=True,
+        help_text=_("Maximum number of logs stored per day"),
+    )
+    created_at = models.DateTimeField(_("created at"), auto_now_add=True)
+
+    @classmethod
+    def get_policy(cls, repository_authorization):
+        """
+        Returns the policy of the authorization or, if it has none, the policy
+        of its repository
+        """
+        policies = cls.objects.filter(
+            Q(repository_authorization=repository_authorization)
+            | Q(
+                repository=repository_authorization.repository_id,
+                repository_authorization__isnull=True,
+            )
+        )
+        policies = sorted(
+            policies, key=lambda policy: policy.repository_authorization_id is None
+        )
+        return policies[0] if policies else None
+
+    def count_logs_today(self):
+        reports = RepositoryReports.objects.filter(
+            repository=self.repository_id, report_date=timezone.now().date()
+        )
+        if self.repository_authorization_id:
+            reports = reports.filter(user=self.repository_authorization.user_id)
+        return reports.aggregate(total=Sum("count_logs")).get("total") or 0
+
+    def should_log(self, from_backend, confidence):
+        if self.skip_from_backend and from_backend:
+            return False
+        if (
+            self.max_confidence is not None
+            and confidence is not None
+            and confidence >= self.max_confidence
+        ):
+            return False
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return False
+        if self.daily_limit is not None:
+            return self.count_logs_today() < self.daily_limit
+        return True
+
 
 class RepositoryIntent(models.Model):
     class Meta:
@@ -1398,6 +2159,12 @@ class RepositoryTranslatedExample(models.Model):
         verbose_name_plural = _("repository translated examples")
         unique_together = ["original_example", "language"]
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                name="common_translated_valid_idx",
+                fields=("language", "has_valid_entities"),
+            )
+        ]
 
     repository_version_language = models.ForeignKey(
         RepositoryVersionLanguage,
@@ -1421,10 +2188,19 @@ class RepositoryTranslatedExample(models.Model):
     )
     text = models.TextField(_("text"), help_text=_("Translation text"))
     created_at = models.DateTimeField(_("created at"), auto_now_add=True)
+    has_valid_entities = models.BooleanField(
+        _("has valid entities"),
+        default=True,
+        editable=False,
+        help_text=_("The translation has the same entities of the original example"),
+    )
 
     objects = RepositoryTranslatedExampleManager()
 
     def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "has_valid_entities" in update_fields:
+            self.has_valid_entities = self.get_entities_validity()
         self.original_example.last_update = timezone.now()
         self.original_example.save(update_fields=["last_update"])
         self.repository_version_language.last_update = timezone.now()
@@ -1466,13 +2242,21 @@ class RepositoryTranslatedExample(models.Model):
             )
         return r
 
-    @property
-    def has_valid_entities(self):
-        original_entities = self.original_example.entities.all()
-        my_entities = self.entities.all()
-        return RepositoryTranslatedExample.same_entities_validator(
-            list(map(lambda x: x.to_dict, original_entities)),
-            list(map(lambda x: x.to_dict, my_entities)),
+    def get_entities_validity(self):
+        """
+        True when the translation has the same entities of the original
+        example, the same rule of same_entities_validator
+        """
+        original_entities = RepositoryExampleEntity.objects.filter(
+            repository_example=self.original_example_id
+        ).values_list("entity", flat=True)
+        my_entities = self.entities.values_list("entity", flat=True) if self.pk else []
+        return sorted(original_entities) == sorted(my_entities)
+
+    def update_has_valid_entities(self):
+        self.has_valid_entities = self.get_entities_validity()
+        RepositoryTranslatedExample.objects.filter(pk=self.pk).update(
+            has_valid_entities=self.has_valid_entities
         )
 
 
@@ -1862,7 +2646,8 @@ class RepositoryMigrate(models.Model):
     language = models.CharField(
         _("language"), max_length=5, validators=[languages.validate_language]
     )
-    auth_token = models.TextField()
+    auth_token = models.TextField(blank=True)
+    file = models.FileField(_("file"), upload_to="migrations/", blank=True)
     classifier = models.CharField(
         _("classifier"),
         max_length=16,
@@ -2080,10 +2865,23 @@ class RepositoryEvaluateResult(models.Model):
     cross_validation = models.BooleanField(_("cross validation"), default=False)
 
     def save(self, *args, **kwargs):
-        repository = self.repository_version_language.repository_version.repository
-        self.version = repository.evaluations_results().count() + 1
+        if self._state.adding and not self.version:
+            repository = self.repository_version_language.repository_version.repository
+            self.version = repository.next_evaluate_result_version()
         return super().save(*args, **kwargs)
 
+    def set_log(self, log):
+        """
+        Stores the sentences of the log sent by the NLP as rows
+        """
+        RepositoryEvaluateResultLog.objects.bulk_create(
+            [
+                RepositoryEvaluateResultLog.from_entry(self, position, entry)
+                for position, entry in enumerate(log)
+            ],
+            batch_size=1000,
+        )
+
 
 class RepositoryEvaluateResultIntent(models.Model):
     class Meta:
@@ -2130,6 +2928,65 @@ class RepositoryEvaluateResultEntity(models.Model):
     objects = EntityBaseManager()
 
 
+class RepositoryEvaluateResultLog(models.Model):
+    """
+    Sentence of the log of an evaluation, the errors come first
+    """
+
+    class Meta:
+        db_table = "common_repository_evaluate_result_log"
+        ordering = ["-is_error", "position"]
+        indexes = [
+            models.Index(
+                name="common_eval_log_order_idx",
+                fields=["evaluate_result", "-is_error", "position"],
+            ),
+            models.Index(
+                name="common_eval_log_intent_idx",
+                fields=["evaluate_result", "intent", "confidence"],
+            ),
+            models.Index(
+                name="common_eval_log_confidence_idx",
+                fields=["evaluate_result", "confidence"],
+            ),
+        ]
+
+    evaluate_result = models.ForeignKey(
+        RepositoryEvaluateResult, models.CASCADE, related_name="evaluate_result_log"
+    )
+    position = models.PositiveIntegerField(
+        help_text=_("Position of the sentence in the log sent by the NLP")
+    )
+    text = models.TextField(_("text"), blank=True)
+    intent = models.TextField(_("intent"), blank=True)
+    predicted_intent = models.TextField(_("predicted intent"), blank=True)
+    confidence = models.FloatField(_("confidence"), null=True)
+    status = models.CharField(_("status"), max_length=32, blank=True)
+    is_error = models.BooleanField(default=False)
+    data = models.TextField(help_text=_("The sentence as sent by the NLP, in JSON"))
+
+    @classmethod
+    def from_entry(cls, evaluate_result, position, entry):
+        prediction = entry.get("intent_prediction") or {}
+        confidence = prediction.get("confidence")
+        statuses = [
+            entry.get("intent_status"),
+            entry.get("entity_status"),
+            entry.get("status"),
+        ]
+        return cls(
+            evaluate_result=evaluate_result,
+            position=position,
+            text=entry.get("text") or "",
+            intent=entry.get("intent") or "",
+            predicted_intent=prediction.get("name") or "",
+            confidence=None if confidence is None else float(confidence),
+            status=entry.get("intent_status") or entry.get("status") or "",
+            is_error="error" in statuses,
+            data=json.dumps(entry),
+        )
+
+
 class RepositoryTranslator(models.Model):
     class Meta:
         verbose_name = _("repository translator")
@@ -2204,13 +3061,78 @@ def send_request_rejected_email(instance, **kwargs):
     instance.send_request_rejected_email()
 
 
-@receiver(models.signals.post_save, sender=RepositoryNLPLog)
-def save_log_nlp(instance, created, **kwargs):
-    if created:
-        report, created = RepositoryReports.objects.get_or_create(
-            repository_version_language=instance.repository_version_language,
-            user=instance.user,
-            report_date=timezone.now().date(),
+@receiver(models.signals.post_save, sender=RepositoryNLPLogIntent)
+def update_nlp_log_default_intent(instance, **kwargs):
+    if instance.is_default and instance.repository_nlp_log_id:
+        RepositoryNLPLog.objects.filter(pk=instance.repository_nlp_log_id).update(
+            intent=instance.intent, confidence=instance.confidence
         )
-        report.count_reports += 1
-        report.save(update_fields=["count_reports"])
+
+
+@receiver(models.signals.post_save, sender=RepositoryIntent)
+@receiver(models.signals.post_save, sender=RepositoryEntity)
+@receiver(models.signals.post_save, sender=RepositoryEntityGroup)
+def invalidate_version_dataset_fingerprint(instance, **kwargs):
+    RepositoryVersionLanguage.objects.filter(
+        repository_version=instance.repository_version_id
+    ).update(dataset_fingerprint_at=None)
+
+
+@receiver(models.signals.post_save, sender=RepositoryExampleEntity)
+@receiver(models.signals.post_delete, sender=RepositoryExampleEntity)
+def invalidate_example_dataset_fingerprint(instance, **kwargs):
+    RepositoryVersionLanguage.objects.filter(
+        added=instance.repository_example_id
+    ).update(dataset_fingerprint_at=None)
+
+
+@receiver(models.signals.post_save, sender=RepositoryTranslatedExampleEntity)
+@receiver(models.signals.post_delete, sender=RepositoryTranslatedExampleEntity)
+def invalidate_translated_example_dataset_fingerprint(instance, **kwargs):
+    RepositoryVersionLanguage.objects.filter(
+        translated_added=instance.repository_translated_example_id
+    ).update(dataset_fingerprint_at=None)
+
+
+@receiver(models.signals.post_save, sender=RepositoryEvaluate)
+@receiver(models.signals.post_delete, sender=RepositoryEvaluate)
+def update_evaluations_version(instance, **kwargs):
+    RepositoryVersionLanguage.objects.filter(
+        pk=instance.repository_version_language_id
+    ).update(evaluations_version=F("evaluations_version") + 1)
+
+
+@receiver(models.signals.post_save, sender=RepositoryEvaluateEntity)
+@receiver(models.signals.post_delete, sender=RepositoryEvaluateEntity)
+def update_evaluate_entity_evaluations_version(instance, **kwargs):
+    RepositoryVersionLanguage.objects.filter(
+        added_evaluate=instance.repository_evaluate_id
+    ).update(evaluations_version=F("evaluations_version") + 1)
+
+
+@receiver(models.signals.post_save, sender=RepositoryEntity)
+def update_entity_evaluations_version(instance, **kwargs):
+    # the evaluate sentences are sent with the value of their entities
+    RepositoryVersionLanguage.objects.filter(
+        repository_version=instance.repository_version_id
+    ).update(evaluations_version=F("evaluations_version") + 1)
+
+
+@receiver(models.signals.post_save, sender=RepositoryExampleEntity)
+@receiver(models.signals.post_delete, sender=RepositoryExampleEntity)
+def update_translations_valid_entities(instance, **kwargs):
+    for translated in RepositoryTranslatedExample.objects.filter(
+        original_example=instance.repository_example_id
+    ):
+        translated.update_has_valid_entities()
+
+
+@receiver(models.signals.post_save, sender=RepositoryTranslatedExampleEntity)
+@receiver(models.signals.post_delete, sender=RepositoryTranslatedExampleEntity)
+def update_translated_example_valid_entities(instance, **kwargs):
+    try:
+        translated = instance.repository_translated_example
+    except RepositoryTranslatedExample.DoesNotExist:
+        # deleted together with the translation
+        return
+    translated.update_has_valid_entities()
@@ -0,0 +1,244 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db import connection
+from django.db.migrations.operations.base import Operation
+from django.db.models import Q, TextField
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Upper
+
+from bothub.common import languages
+
+SEARCH_PREFIX = "prefix"
+SEARCH_EXACT = "exact"
+SEARCH_FUZZY = "fuzzy"
+SEARCH_WORDS = "words"
+SEARCH_CONTAINS = "contains"
+SEARCH_TYPES = [
+    SEARCH_CONTAINS,
+    SEARCH_PREFIX,
+    SEARCH_EXACT,
+    SEARCH_FUZZY,
+    SEARCH_WORDS,
+]
+
+# the full text index uses the simple configuration, it only lowercases the
+# words so the same index serves every language
+TEXT_SEARCH_CONFIG = "simple"
+
+# languages written without spaces between the words can not be split in
+# words, the trigram index is used for them
+NO_SPACE_LANGUAGES = [
+    languages.LANGUAGE_JA,
+    languages.LANGUAGE_ZH,
+    languages.LANGUAGE_TH,
+    languages.LANGUAGE_KH,
+    languages.LANGUAGE_MY,
+]
+
+WORD_REGEX = re.compile(r"\w+")
+
+
+def fts_table(table, column):
+    return "{}_{}_fts".format(table, column)
+
+
+class CreateSearchIndex(Operation):
+    """
+    Creates the search indexes of a text column: trigram and tsvector GIN
+    indexes on PostgreSQL or a FTS5 table kept by triggers on SQLite
+    """
+
+    reduces_to_sql = True
+    reversible = True
+
+    def __init__(self, table, column, full_text=True):
+        self.table = table
+        self.column = column
+        self.full_text = full_text
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def index_name(self, kind):
+        return "{}_{}_{}_idx".format(self.table, self.column, kind)[-63:]
+
+    def postgresql_forwards(self, schema_editor):
+        # the case insensitive lookups of django compare UPPER(column::text)
+        schema_editor.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS {} ON {} "
+            "USING gin (UPPER({}::text) gin_trgm_ops)".format(
+                schema_editor.quote_name(self.index_name("trgm")),
+                schema_editor.quote_name(self.table),
+                schema_editor.quote_name(self.column),
+            )
+        )
+        if self.full_text:
+            schema_editor.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS {} ON {} "
+                "USING gin (to_tsvector('{}'::regconfig, COALESCE({}, '')))".format(
+                    schema_editor.quote_name(self.index_name("tsv")),
+                    schema_editor.quote_name(self.table),
+                    TEXT_SEARCH_CONFIG,
+                    schema_editor.quote_name(self.column),
+                )
+            )
+
+    def sqlite_forwards(self, schema_editor):
+        if not self.full_text:
+            return
+        values = {
+            "fts": schema_editor.quote_name(fts_table(self.table, self.column)),
+            "table": schema_editor.quote_name(self.table),
+            "column": schema_editor.quote_name(self.column),
+            "trigger": fts_table(self.table, self.column),
+        }
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({column}, "
+            "content={table}, content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')".format(**values)
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER IF NOT EXISTS {trigger}_ai AFTER INSERT ON {table} "
+            "BEGIN INSERT INTO {fts}(rowid, {column}) "
+            "VALUES (new.id, new.{column}); END".format(**values)
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER IF NOT EXISTS {trigger}_ad AFTER DELETE ON {table} "
+            "BEGIN INSERT INTO {fts}({fts}, rowid, {column}) "
+            "VALUES ('delete', old.id, old.{column}); END".format(**values)
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER IF NOT EXISTS {trigger}_au AFTER UPDATE ON {table} "
+            "BEGIN INSERT INTO {fts}({fts}, rowid, {column}) "
+            "VALUES ('delete', old.id, old.{column}); "
+            "INSERT INTO {fts}(rowid, {column}) "
+            "VALUES (new.id, new.{column}); END".format(**values)
+        )
+        schema_editor.execute(
+            "INSERT INTO {fts}({fts}) VALUES ('rebuild')".format(**values)
+        )
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        vendor = schema_editor.connection.vendor
+        if vendor == "postgresql":
+            self.postgresql_forwards(schema_editor)
+        elif vendor == "sqlite":
+            self.sqlite_forwards(schema_editor)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        vendor = schema_editor.connection.vendor
+        if vendor == "postgresql":
+            for kind in ["trgm", "tsv"]:
+                schema_editor.execute(
+                    "DROP INDEX CONCURRENTLY IF EXISTS {}".format(
+                        schema_editor.quote_name(self.index_name(kind))
+                    )
+                )
+        elif vendor == "sqlite" and self.full_text:
+            for suffix in ["ai", "ad", "au"]:
+                schema_editor.execute(
+                    "DROP TRIGGER IF EXISTS {}_{}".format(
+                        fts_table(self.table, self.column), suffix
+                    )
+                )
+            schema_editor.execute(
+                "DROP TABLE IF EXISTS {}".format(
+                    schema_editor.quote_name(fts_table(self.table, self.column))
+                )
+            )
+
+    def describe(self):
+        return "Create search indexes on {}.{}".format(self.table, self.column)
+
+
+def splits_words(language):
+    return language not in NO_SPACE_LANGUAGES
+
+
+def words_lookup(model, field, words):
+    """
+    Returns the annotations and the query of the rows with all the words in the
+    field, the last letters of each word may be missing
+    """
+    if connection.vendor == "sqlite":
+        table = fts_table(model._meta.db_table, field)
+        return (
+            {},
+            Q(
+                pk__in=RawSQL(
+                    "SELECT rowid FROM {0} WHERE {0} MATCH %s".format(table),
+                    [" AND ".join('"{}"*'.format(word) for word in words)],
+                )
+            ),
+        )
+
+    vector = "_search_{}".format(field)
+    return (
+        {vector: SearchVector(field, config=TEXT_SEARCH_CONFIG)},
+        Q(
+            **{
+                vector: SearchQuery(
+                    " & ".join("{}:*".format(word) for word in words),
+                    config=TEXT_SEARCH_CONFIG,
+                    search_type="raw",
+                )
+            }
+        ),
+    )
+
+
+def search_queryset(queryset, fields, text, search_type=None, language=None):
+    """
+    Filters the rows with the text in any of the fields using lookups served
+    by the search indexes:
+    - contains: each word of the text is in one of the fields (trigram)
+    - prefix: the field starts with the text (trigram)
+    - exact: the field is the text, ignoring the case (trigram)
+    - fuzzy: the field is similar to the text (trigram, PostgreSQL only)
+    - words: the field has words starting with the words of the text
+      (tsvector), languages written without spaces use contains
+    """
+    search_type = search_type or SEARCH_CONTAINS
+    if search_type == SEARCH_WORDS and not splits_words(language):
+        search_type = SEARCH_CONTAINS
+    if search_type == SEARCH_FUZZY and connection.vendor != "postgresql":
+        search_type = SEARCH_CONTAINS
+
+    if search_type == SEARCH_WORDS:
+        words = [word.lower() for word in WORD_REGEX.findall(text)]
+        if not words:
+            return queryset.none()
+        annotations = {}
+        query = Q()
+        for field in fields:
+            annotation, lookup = words_lookup(queryset.model, field, words)
+            annotations.update(annotation)
+            query |= lookup
+        return queryset.annotate(**annotations).filter(query)
+
+    if search_type == SEARCH_CONTAINS:
+        for word in text.split():
+            query = Q()
+            for field in fields:
+                query |= Q(**{"{}__icontains".format(field): word})
+            queryset = queryset.filter(query)
+        return queryset
+
+    query = Q()
+    for field in fields:
+        if search_type == SEARCH_PREFIX:
+            query |= Q(**{"{}__istartswith".format(field): text})
+        elif search_type == SEARCH_EXACT:
+            # the icontains lookup lets the trigram index find the rows
+            query |= Q(
+                **{
+                    "{}__icontains".format(field): text,
+                    "{}__iexact".format(field): text,
+                }
+            )
+        else:
+            upper = "_upper_{}".format(field)
+            queryset = queryset.annotate(**{upper: Upper(Cast(field, TextField()))})
+            query |= Q(**{"{}__trigram_similar".format(upper): text})
+    return queryset.filter(query)
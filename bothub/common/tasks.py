@@ -1,15 +1,28 @@
 import json
 import random
+import tempfile
+import zipfile
+
 import requests
 from datetime import timedelta
 from urllib.parse import urlencode
 from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
 from django.db import transaction
-from django.db.models import Q, Count
+from django.db.models import F, Q, Count
 from django.utils import timezone
 
 from bothub import translate
 from bothub.celery import app
+from bothub.common import counters
+from bothub.common.dumps import DumpFormatError, dump_repository, restore_repository
+from bothub.common.importers import (
+    JobExamplesImporter,
+    RejectedExamplesWriter,
+    iter_json_array,
+    iter_rasa_examples,
+)
 from bothub.common.models import (
     RepositoryQueueTask,
     RepositoryVersion,
@@ -25,7 +38,13 @@ from bothub.common.models import (
     RepositoryIntent,
     Repository,
     RepositoryNLPLog,
+    RepositoryNLPTrain,
+    RepositoryReports,
+    RepositoryReportsFlush,
     RepositoryScore,
+    RepositoryTrainSchedule,
+    RepositoryImportJob,
+    RepositoryDump,
 )
 from bothub.utils import (
     intentions_balance_score,
@@ -75,6 +94,46 @@ def trainings_check_task():
             train.save(update_fields=["status", "end_training"])
 
 
+@app.task(name="dispatch_trains")
+def dispatch_trains():
+    # train requests not answered by the workers in 10 minutes were lost
+    RepositoryTrainSchedule.objects.filter(
+        status=RepositoryTrainSchedule.STATUS_PROCESSING,
+        sent_at__lte=timezone.now() - timedelta(minutes=10),
+    ).update(status=RepositoryTrainSchedule.STATUS_FAILED)
+
+    processing = RepositoryTrainSchedule.objects.depth().get("processing")
+    for schedule_id in RepositoryTrainSchedule.objects.next_to_dispatch(
+        settings.BOTHUB_TRAIN_SCHEDULER_CONCURRENCY - processing
+    ):
+        dispatched = RepositoryTrainSchedule.objects.filter(
+            pk=schedule_id, status=RepositoryTrainSchedule.STATUS_PENDING
+        ).update(
+            status=RepositoryTrainSchedule.STATUS_PROCESSING, sent_at=timezone.now()
+        )
+        if dispatched:
+            request_train.delay(schedule_id)
+
+
+@app.task(name="request_train")
+def request_train(schedule_id):
+    schedule = RepositoryTrainSchedule.objects.select_related(
+        "repository_version__repository"
+    ).get(pk=schedule_id)
+    try:
+        response = schedule.request_train()
+        schedule.status = (
+            RepositoryTrainSchedule.STATUS_SUCCESS
+            if response.status_code == 200
+            else RepositoryTrainSchedule.STATUS_FAILED
+        )
+        schedule.response = response.text
+    except Exception as e:
+        schedule.status = RepositoryTrainSchedule.STATUS_FAILED
+        schedule.response = str(e)
+    schedule.save(update_fields=["status", "response"])
+
+
 @app.task(name="clone_version")
 def debug_parse_text(instance_id, id_clone, repository, *args, **kwargs):
     clone = RepositoryVersion.objects.get(pk=id_clone, repository=repository)
@@ -101,7 +160,9 @@ def debug_parse_text(instance_id, id_clone, repository, *args, **kwargs):
         version_language = instance.get_version_language(version.language)
 
         version_language.update_trainer(
-            version.get_bot_data.bot_data, version.get_bot_data.rasa_version
+            version.get_bot_data.bot_data,
+            version.get_bot_data.rasa_version,
+            version.get_bot_data.dataset_fingerprint,
         )
 
         examples = RepositoryExample.objects.filter(repository_version_language=version)
@@ -234,12 +295,16 @@ def debug_parse_text(instance_id, id_clone, repository, *args, **kwargs):
     return True
 
 
+# days of logs kept by delete_nlp_logs besides the current day
+NLP_LOG_RETENTION_DAYS = 90
+
+
 @app.task()
 def delete_nlp_logs():
     BATCH_SIZE = 5000
     logs = RepositoryNLPLog.objects.filter(
         created_at__lt=timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        - timezone.timedelta(days=90)
+        - timezone.timedelta(days=NLP_LOG_RETENTION_DAYS)
     )
 
     num_updated = 0
@@ -259,6 +324,43 @@ def delete_nlp_logs():
         print(f" > deleted {num_updated} nlp logs")
 
 
+@app.task(name="update_dataset_fingerprints")
+def update_dataset_fingerprints():
+    """
+    Computes the stale dataset fingerprints of the trained version languages,
+    so the requests that check if a version is already trained do not
+    """
+    trained = RepositoryNLPTrain.objects.filter(
+        rasa_version=settings.BOTHUB_NLP_RASA_VERSION
+    ).exclude(dataset_fingerprint="")
+    stale = (
+        RepositoryVersionLanguage.objects.filter(
+            Q(dataset_fingerprint_at__isnull=True)
+            | Q(last_update__gt=F("dataset_fingerprint_at")),
+            trainers__in=trained,
+        )
+        .distinct()
+        .order_by("pk")
+    )
+
+    count = 0
+    for version_language in stale.iterator():
+        version_language.get_dataset_fingerprint()
+        count += 1
+    return count
+
+
+@app.task(name="flush_usage_counters")
+def flush_usage_counters():
+    if not settings.BOTHUB_USAGE_COUNTERS_REDIS:
+        return 0
+    # a failed flush is retried by the next run, a day later it is gone
+    RepositoryReportsFlush.objects.filter(
+        created_at__lt=timezone.now() - timedelta(days=1)
+    ).delete()
+    return counters.flush(RepositoryReports.objects.add_counts)
+
+
 @app.task()
 def repositories_count_authorizations():
     for repository in Repository.objects.all():
@@ -343,6 +445,134 @@ def auto_translation(
     task_queue.save(update_fields=["status", "end_training"])
 
 
+@app.task(name="repository_dump")
+def repository_dump(dump_id):
+    dump = RepositoryDump.objects.select_related(
+        "repository", "repository_version", "task"
+    ).get(pk=dump_id)
+    task_queue = dump.task
+    task_queue.status = RepositoryQueueTask.STATUS_PROCESSING
+    task_queue.save(update_fields=["status"])
+
+    try:
+        with tempfile.TemporaryFile() as archive:
+            manifest = dump_repository(
+                archive, dump.repository, dump.repository_version
+            )
+            archive.seek(0)
+            dump.file.save("{}.zip".format(dump.pk), File(archive), save=False)
+        dump.manifest = json.dumps(manifest)
+        task_queue.status = RepositoryQueueTask.STATUS_SUCCESS
+    except Exception as e:
+        dump.error = str(e)
+        dump.save(update_fields=["error"])
+        task_queue.status = RepositoryQueueTask.STATUS_FAILED
+        task_queue.end_training = timezone.now()
+        task_queue.save(update_fields=["status", "end_training"])
+        raise
+
+    dump.save(update_fields=["file", "manifest"])
+    task_queue.end_training = timezone.now()
+    task_queue.save(update_fields=["status", "end_training"])
+
+
+@app.task(name="repository_restore")
+def repository_restore(dump_id):
+    dump = RepositoryDump.objects.select_related(
+        "repository", "created_by", "task"
+    ).get(pk=dump_id)
+    task_queue = dump.task
+    task_queue.status = RepositoryQueueTask.STATUS_PROCESSING
+    task_queue.save(update_fields=["status"])
+
+    try:
+        with dump.file.open("rb") as f:
+            counts = restore_repository(f, dump.repository, dump.created_by)
+        dump.manifest = json.dumps(counts)
+        task_queue.status = RepositoryQueueTask.STATUS_SUCCESS
+    except (DumpFormatError, zipfile.BadZipFile) as e:
+        dump.error = str(e)
+        task_queue.status = RepositoryQueueTask.STATUS_FAILED
+    except Exception as e:
+        dump.error = str(e)
+        dump.save(update_fields=["error"])
+        task_queue.status = RepositoryQueueTask.STATUS_FAILED
+        task_queue.end_training = timezone.now()
+        task_queue.save(update_fields=["status", "end_training"])
+        raise
+
+    dump.file.delete(save=False)
+    dump.save(update_fields=["file", "manifest", "error"])
+    task_queue.end_training = timezone.now()
+    task_queue.save(update_fields=["status", "end_training"])
+
+
+@app.task(name="import_examples")
+def import_examples(job_id):
+    job = RepositoryImportJob.objects.select_related(
+        "repository_version__repository", "task"
+    ).get(pk=job_id)
+    task_queue = job.task
+
+    task_queue.status = RepositoryQueueTask.STATUS_PROCESSING
+    task_queue.save(update_fields=["status"])
+    job.phase = RepositoryImportJob.PHASE_IMPORTING
+    job.save(update_fields=["phase"])
+
+    readers = {
+        RepositoryImportJob.FORMAT_EXAMPLES: iter_json_array,
+        RepositoryImportJob.FORMAT_RASA: iter_rasa_examples,
+    }
+
+    try:
+        with tempfile.TemporaryFile() as rejected_file:
+            rejected = RejectedExamplesWriter(rejected_file)
+            importer = JobExamplesImporter(
+                job.repository_version, rejected, language=job.language or None
+            )
+            try:
+                with job.file.open("rb") as f:
+                    for data in readers.get(job.file_format)(f):
+                        importer.add(data)
+                        job.processed += 1
+                        if job.processed % importer.batch_size == 0:
+                            job.added = importer.added
+                            job.rejected = rejected.count
+                            job.save(update_fields=["processed", "added", "rejected"])
+                importer.finish()
+                task_queue.status = RepositoryQueueTask.STATUS_SUCCESS
+            except (json.decoder.JSONDecodeError, UnicodeDecodeError) as e:
+                importer.finish()
+                job.error = str(e)
+                task_queue.status = RepositoryQueueTask.STATUS_FAILED
+            except Exception as e:
+                job.error = str(e)
+                job.phase = RepositoryImportJob.PHASE_FINISHED
+                job.save(update_fields=["error", "phase"])
+                task_queue.status = RepositoryQueueTask.STATUS_FAILED
+                task_queue.end_training = timezone.now()
+                task_queue.save(update_fields=["status", "end_training"])
+                raise
+
+            rejected.close()
+            if rejected.count:
+                job.rejected_file.save(
+                    "{}.json".format(job.pk), File(rejected_file), save=False
+                )
+    finally:
+        # the upload is not kept after the import, even when it failed
+        job.file.delete(save=False)
+        job.save(update_fields=["file"])
+
+    job.added = importer.added
+    job.rejected = rejected.count
+    job.phase = RepositoryImportJob.PHASE_FINISHED
+    job.save()
+
+    task_queue.end_training = timezone.now()
+    task_queue.save(update_fields=["status", "end_training"])
+
+
 @app.task()
 def repository_score():  # pragma: no cover
     for version in RepositoryVersion.objects.filter(is_default=True):
@@ -472,13 +702,49 @@ def word_suggestions(repository_example_id, authorization_token):  # pragma: no
 
 
 @app.task(name="migrate_repository")
-def migrate_repository(repository_version, auth_token, language, name_classifier):
+def migrate_repository(
+    repository_version, auth_token, language, name_classifier, file=None
+):
     version = RepositoryVersion.objects.get(pk=repository_version)
     instance = version.get_migration_types().get(name_classifier)
     instance.repository_version = version
     instance.auth_token = auth_token
     instance.language = language
-    return instance.migrate()
+    instance.file = file
+
+    task_queue = version.get_version_language(language=language).create_task(
+        id_queue=app.current_task.request.id,
+        from_queue=RepositoryQueueTask.QUEUE_CELERY,
+        type_processing=RepositoryQueueTask.TYPE_PROCESSING_IMPORT,
+    )
+
+    def progress(processed, added, rejected):
+        app.current_task.update_state(
+            state="PROGRESS",
+            meta={"processed": processed, "added": added, "rejected": rejected},
+        )
+
+    try:
+        result = instance.migrate(progress=progress)
+        task_queue.status = RepositoryQueueTask.STATUS_SUCCESS
+    except (
+        requests.RequestException,
+        zipfile.BadZipFile,
+        ValueError,
+        UnicodeDecodeError,
+    ):
+        result = False
+        task_queue.status = RepositoryQueueTask.STATUS_FAILED
+    except Exception:
+        task_queue.status = RepositoryQueueTask.STATUS_FAILED
+        raise
+    finally:
+        task_queue.end_training = timezone.now()
+        task_queue.save(update_fields=["status", "end_training"])
+        if file:
+            default_storage.delete(file)
+
+    return result
 
 
 @app.task(name="intent_suggestions")
@@ -1,21 +1,49 @@
+import io
+import json
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
+
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
 from django.test import TestCase
+from django.test import override_settings
 from django.utils import timezone
 
 from bothub.authentication.models import User
 from . import languages
+from .dumps import DumpFormatError, dump_repository, restore_repository
 from .exceptions import DoesNotHaveTranslation
 from .exceptions import TrainingNotAllowed
+from .importers import iter_json_array
 from .models import Repository, RepositoryIntent
 from .models import RepositoryAuthorization
 from .models import RepositoryEntity
 from .models import RepositoryEntityGroup
+from .models import RepositoryEvaluate
+from .models import RepositoryEvaluateEntity
+from .models import RepositoryEvaluateResult
+from .models import RepositoryEvaluateResultIntent
+from .models import RepositoryEvaluateResultScore
 from .models import RepositoryExample
 from .models import RepositoryExampleEntity
 from .models import RepositoryTranslatedExample
 from .models import RepositoryTranslatedExampleEntity
 from .models import RequestRepositoryAuthorization
+from .models import RepositoryQueueTask
+from .models import RepositoryTrainSchedule
+from .models import RepositoryVersion
+from .models import RepositoryVersionLanguage
+from .tasks import (
+    dispatch_trains,
+    migrate_repository,
+    request_train,
+    update_dataset_fingerprints,
+)
 
 
 class RepositoryVersionTestCase(TestCase):
@@ -177,6 +205,40 @@ class TranslateTestCase(TestCase):
         with self.assertRaises(DoesNotHaveTranslation):
             self.example.get_translation(languages.LANGUAGE_NL)
 
+    def test_valid_entities_updated(self):
+        language = languages.LANGUAGE_PT
+        translate = RepositoryTranslatedExample.objects.create(
+            original_example=self.example, language=language, text="meu nome é User"
+        )
+        translate.refresh_from_db()
+        self.assertEqual(translate.has_valid_entities, True)
+
+        entity = RepositoryExampleEntity.objects.create(
+            repository_example=self.example, start=11, end=15, entity="name"
+        )
+        translate.refresh_from_db()
+        self.assertEqual(translate.has_valid_entities, False)
+
+        entity.delete()
+        translate.refresh_from_db()
+        self.assertEqual(translate.has_valid_entities, True)
+
+    def test_fill_translations_valid_entities(self):
+        RepositoryExampleEntity.objects.create(
+            repository_example=self.example, start=11, end=15, entity="name"
+        )
+        translate = RepositoryTranslatedExample.objects.create(
+            original_example=self.example, language=languages.LANGUAGE_PT, text="oi"
+        )
+        RepositoryTranslatedExample.objects.filter(pk=translate.pk).update(
+            has_valid_entities=True
+        )
+
+        with mock.patch("builtins.print"):
+            call_command("fill_translations_valid_entities")
+        translate.refresh_from_db()
+        self.assertEqual(translate.has_valid_entities, False)
+
 
 class RepositoryTestCase(TestCase):
     def setUp(self):
@@ -1310,3 +1372,611 @@ class RepositorySupportedLanguageQueryTestCase(TestCase):
         example.delete()
         q = Repository.objects.all().supported_language(e_language)
         self.assertEqual(q.count(), 0)
+
+
+class RepositoryTrainScheduleTestCase(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner@user.com", "owner")
+        self.other_owner = User.objects.create_user("other@user.com", "other")
+
+        self.repositories = []
+        for owner, slug in [
+            (self.owner, "first"),
+            (self.owner, "second"),
+            (self.other_owner, "third"),
+        ]:
+            self.repositories.append(
+                Repository.objects.create(
+                    owner=owner.repository_owner,
+                    name=slug,
+                    slug=slug,
+                    language=languages.LANGUAGE_EN,
+                )
+            )
+
+    def schedule(self, repository, is_default=True):
+        version = repository.current_version().repository_version
+        if not is_default:
+            version = RepositoryVersion.objects.create(
+                repository=repository, is_default=False
+            )
+        return RepositoryTrainSchedule.objects.create(
+            repository_version=version,
+            owner=repository.owner,
+            priority=RepositoryTrainSchedule.PRIORITY_DEFAULT_VERSION
+            if is_default
+            else RepositoryTrainSchedule.PRIORITY_VERSION,
+        )
+
+    def add_examples(self, repository):
+        version_language = repository.current_version()
+        for intent, texts in [("greet", ["hi", "hello"]), ("bye", ["bye", "good bye"])]:
+            intent = RepositoryIntent.objects.create(
+                text=intent, repository_version=version_language.repository_version
+            )
+            for text in texts:
+                RepositoryExample.objects.create(
+                    repository_version_language=version_language,
+                    text=text,
+                    intent=intent,
+                )
+
+    def test_schedule(self):
+        self.add_examples(self.repositories[0])
+        for repository in self.repositories[1:]:
+            repository.current_version()
+        ready = self.repositories[0].current_version().repository_version
+
+        self.assertEqual(
+            RepositoryTrainSchedule.objects.ready_for_train(
+                RepositoryVersion.objects.all()
+            ),
+            {
+                version.pk
+                for version in RepositoryVersion.objects.all()
+                if version.ready_for_train
+            },
+        )
+        scheduled, skipped = RepositoryTrainSchedule.objects.schedule(
+            RepositoryVersion.objects.all()
+        )
+        self.assertEqual(
+            [schedule.repository_version for schedule in scheduled], [ready]
+        )
+        self.assertEqual(len(skipped), 2)
+        self.assertEqual(scheduled[0].owner, self.repositories[0].owner)
+
+        scheduled, skipped = RepositoryTrainSchedule.objects.schedule(
+            RepositoryVersion.objects.all()
+        )
+        self.assertEqual(scheduled, [])
+        self.assertIn(ready.pk, skipped)
+
+    def test_skip_trained_since_last_update(self):
+        self.add_examples(self.repositories[0])
+        version_language = self.repositories[0].current_version()
+        RepositoryVersionLanguage.objects.filter(pk=version_language.pk).update(
+            training_end_at=timezone.now()
+        )
+        self.assertEqual(
+            RepositoryTrainSchedule.objects.ready_for_train(
+                RepositoryVersion.objects.all()
+            ),
+            set(),
+        )
+
+    def test_queued_once(self):
+        schedule = self.schedule(self.repositories[0])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.schedule(self.repositories[0])
+
+        schedule.status = RepositoryTrainSchedule.STATUS_SUCCESS
+        schedule.save(update_fields=["status"])
+        self.schedule(self.repositories[0])
+
+    def test_skip_not_ready_for_train(self):
+        for repository in self.repositories:
+            repository.current_version()
+        scheduled, skipped = RepositoryTrainSchedule.objects.schedule(
+            RepositoryVersion.objects.all()
+        )
+        self.assertEqual(scheduled, [])
+        self.assertEqual(len(skipped), 3)
+
+    def test_next_to_dispatch(self):
+        not_default = self.schedule(self.repositories[0], is_default=False)
+        first = self.schedule(self.repositories[0])
+        second = self.schedule(self.repositories[1])
+        third = self.schedule(self.repositories[2])
+
+        self.assertEqual(
+            RepositoryTrainSchedule.objects.next_to_dispatch(4),
+            [first.pk, third.pk, second.pk, not_default.pk],
+        )
+        self.assertEqual(
+            RepositoryTrainSchedule.objects.next_to_dispatch(2), [first.pk, third.pk]
+        )
+        self.assertEqual(RepositoryTrainSchedule.objects.next_to_dispatch(0), [])
+
+    @override_settings(BOTHUB_TRAIN_SCHEDULER_CONCURRENCY=2)
+    def test_dispatch_trains(self):
+        for repository in self.repositories:
+            self.schedule(repository)
+
+        with mock.patch("bothub.common.tasks.request_train.delay") as delay:
+            dispatch_trains()
+            dispatch_trains()
+        self.assertEqual(delay.call_count, 2)
+        self.assertEqual(
+            RepositoryTrainSchedule.objects.depth(), {"pending": 1, "processing": 2}
+        )
+
+    def test_request_train(self):
+        schedule = self.schedule(self.repositories[0])
+        with mock.patch.object(
+            Repository,
+            "request_nlp_train",
+            return_value=mock.Mock(status_code=200, text="{}"),
+        ):
+            request_train(schedule.pk)
+        schedule.refresh_from_db()
+        self.assertEqual(schedule.status, RepositoryTrainSchedule.STATUS_SUCCESS)
+
+
+class RepositoryDatasetFingerprintTestCase(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner@user.com", "user")
+
+        self.repository = Repository.objects.create(
+            owner=self.owner.repository_owner,
+            name="Test",
+            slug="test",
+            language=languages.LANGUAGE_EN,
+        )
+        self.version_language = self.repository.current_version()
+
+        for intent, texts in [("greet", ["hi", "hello"]), ("bye", ["bye", "see ya"])]:
+            repository_intent = RepositoryIntent.objects.create(
+                text=intent, repository_version=self.version_language.repository_version
+            )
+            for text in texts:
+                self.example = RepositoryExample.objects.create(
+                    repository_version_language=self.version_language,
+                    text=text,
+                    intent=repository_intent,
+                )
+
+        self.version_language.start_training(self.owner)
+        self.version_language.save_training(
+            "bot_data", settings.BOTHUB_NLP_RASA_VERSION
+        )
+
+    def test_trained_fingerprint(self):
+        self.assertEqual(
+            self.version_language.get_bot_data.dataset_fingerprint,
+            self.version_language.compute_dataset_fingerprint(),
+        )
+        self.assertTrue(self.version_language.already_trained)
+
+    def test_already_trained_after_revert(self):
+        example = RepositoryExample.objects.create(
+            repository_version_language=self.version_language,
+            text="good morning",
+            intent=self.example.intent,
+        )
+        self.assertTrue(self.repository.current_version().ready_for_train)
+
+        example.delete()
+        version_language = self.repository.current_version()
+        # the stale fingerprint is not computed by the requests
+        self.assertTrue(version_language.ready_for_train)
+
+        self.assertEqual(update_dataset_fingerprints(), 1)
+        self.assertFalse(version_language.ready_for_train)
+        self.assertIn(
+            "This bot version has already been trained.",
+            version_language.requirements_to_train,
+        )
+        self.assertTrue(version_language.repository_version.already_trained)
+
+    def test_algorithm_flags(self):
+        self.repository.use_analyze_char = not self.repository.use_analyze_char
+        self.repository.save()
+        self.assertTrue(self.repository.current_version().ready_for_train)
+
+        self.repository.use_analyze_char = not self.repository.use_analyze_char
+        self.repository.save()
+        update_dataset_fingerprints()
+        self.assertFalse(self.repository.current_version().ready_for_train)
+
+    def test_stale_fingerprint_not_computed(self):
+        RepositoryExample.objects.create(
+            repository_version_language=self.version_language,
+            text="good morning",
+            intent=self.example.intent,
+        )
+        with mock.patch.object(
+            RepositoryVersionLanguage, "compute_dataset_fingerprint"
+        ) as compute:
+            self.assertTrue(self.repository.current_version().ready_for_train)
+            self.assertFalse(self.version_language.repository_version.already_trained)
+        compute.assert_not_called()
+
+        self.assertEqual(update_dataset_fingerprints(), 1)
+        self.assertEqual(update_dataset_fingerprints(), 0)
+
+    def test_already_trained_computed_by_train(self):
+        example = RepositoryExample.objects.create(
+            repository_version_language=self.version_language,
+            text="good morning",
+            intent=self.example.intent,
+        )
+        example.delete()
+        version = self.version_language.repository_version
+        self.assertFalse(version.already_trained)
+        self.assertTrue(version.is_already_trained(compute=True))
+
+    def test_entity_changes_fingerprint(self):
+        fingerprint = self.version_language.get_dataset_fingerprint()
+        RepositoryExampleEntity.objects.create(
+            repository_example=self.example, start=0, end=3, entity="name"
+        )
+        self.assertNotEqual(
+            self.version_language.get_dataset_fingerprint(), fingerprint
+        )
+        self.assertFalse(self.version_language.already_trained)
+
+
+class IterJsonArrayTestCase(TestCase):
+    def test_items(self):
+        items = [{"text": "olá ação", "n": 12345}, [1, 2], "text", 1.5, True, None]
+        content = json.dumps(items, ensure_ascii=False).encode()
+        for chunk_size in [1, 3, 7, 1024]:
+            self.assertEqual(
+                list(iter_json_array(io.BytesIO(content), chunk_size=chunk_size)), items
+            )
+
+    def test_empty(self):
+        self.assertEqual(list(iter_json_array(io.BytesIO(b" [ ] "))), [])
+
+    def test_invalid(self):
+        for content in [b"", b"{}", b'[{"a": 1}', b"[1 2]"]:
+            with self.assertRaises(json.JSONDecodeError):
+                list(iter_json_array(io.BytesIO(content), chunk_size=2))
+
+
+class MigrateClassifiersTestCase(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner@user.com", "user")
+        self.repository = Repository.objects.create(
+            owner=self.owner, name="Test", slug="test", language=languages.LANGUAGE_EN
+        )
+        self.version = self.repository.current_version().repository_version
+
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def zip(self, files):
+        content = io.BytesIO()
+        with zipfile.ZipFile(content, "w") as thezip:
+            for name, data in files.items():
+                thezip.writestr(name, json.dumps(data))
+        content.seek(0)
+        return content
+
+    def migrate(self, classifier, content, auth_token=""):
+        file = default_storage.save("migrations/export", io.BytesIO(content))
+        return migrate_repository.apply(
+            args=[self.version.pk, auth_token, languages.LANGUAGE_EN, classifier, file]
+        ).get()
+
+    def examples(self):
+        return RepositoryExample.objects.filter(
+            repository_version_language__repository_version=self.version
+        )
+
+    def test_wit(self):
+        export = self.zip(
+            {
+                "app/utterances/utterances-1.json": {
+                    "utterances": [
+                        {
+                            "text": 'say "hi" to Mary',
+                            "intent": "Greet",
+                            "entities": [
+                                {
+                                    "entity": "wit$contact:contact",
+                                    "start": 12,
+                                    "end": 16,
+                                }
+                            ],
+                        },
+                        {"text": "hello", "intent": "greet", "entities": []},
+                    ]
+                },
+                "app/utterances/utterances-2.json": {
+                    "utterances": [
+                        {"text": "hello", "intent": "greet", "entities": []},
+                        {"text": "bye", "intent": "bye"},
+                    ]
+                },
+                "app/app.json": {"name": "app"},
+            }
+        )
+        response = mock.MagicMock(raw=export)
+        response.__enter__.return_value = response
+        with mock.patch(
+            "bothub.common.migrate_classifiers.wit.type.requests.get",
+            side_effect=[mock.Mock(json=lambda: {"uri": "http://export"}), response],
+        ):
+            result = migrate_repository.apply(
+                args=[self.version.pk, "token", languages.LANGUAGE_EN, "wit"]
+            ).get()
+
+        self.assertEqual(result.get("added"), 3)
+        self.assertEqual(len(result.get("not_added")), 1)
+        entity = self.examples().get(text='say "hi" to Mary').entities.get()
+        self.assertEqual(entity.entity.value, "wit_contact")
+        self.assertEqual(entity.value, "Mary")
+
+        task = RepositoryQueueTask.objects.get()
+        self.assertEqual(
+            task.type_processing, RepositoryQueueTask.TYPE_PROCESSING_IMPORT
+        )
+        self.assertEqual(task.status, RepositoryQueueTask.STATUS_SUCCESS)
+
+    def test_dialogflow(self):
+        export = self.zip(
+            {
+                "agent/intents/Book Flight.json": {"name": "Book Flight"},
+                "agent/intents/Book Flight_usersays_en.json": [
+                    {
+                        "data": [
+                            {"text": "fly to ", "userDefined": False},
+                            {"text": "Paris", "meta": "@sys.geo-city"},
+                        ]
+                    },
+                    {"data": [{"text": "book a flight"}]},
+                ],
+                "agent/intents/Book Flight_usersays_pt-br.json": [
+                    {"data": [{"text": "reservar um voo"}]}
+                ],
+            }
+        )
+        result = self.migrate("dialogflow", export.read())
+
+        self.assertEqual(result.get("added"), 2)
+        example = self.examples().get(text="fly to Paris")
+        self.assertEqual(example.intent.text, "book_flight")
+        entity = example.entities.get()
+        self.assertEqual(entity.entity.value, "sys_geo-city")
+        self.assertEqual(entity.value, "Paris")
+        self.assertFalse(default_storage.exists("migrations/export"))
+
+    def test_rasa_markdown(self):
+        content = "\n".join(
+            [
+                "## intent:greet",
+                "- hey",
+                "- hello [Mary](name)",
+                "",
+                "## intent:restaurant_search",
+                '* [chinese]{"entity": "cuisine", "value": "chinese"} food',
+                "- [centre](location:center) please",
+                "",
+                "## synonym:chinese",
+                "- chines",
+                "",
+                "## regex:zipcode",
+                "- [0-9]{5}",
+            ]
+        ).encode()
+        result = self.migrate("rasa_markdown", content)
+
+        self.assertEqual(result.get("added"), 4)
+        self.assertEqual(
+            set(self.examples().values_list("text", "intent__text")),
+            {
+                ("hey", "greet"),
+                ("hello Mary", "greet"),
+                ("chinese food", "restaurant_search"),
+                ("centre please", "restaurant_search"),
+            },
+        )
+        entity = self.examples().get(text="centre please").entities.get()
+        self.assertEqual((entity.entity.value, entity.value), ("location", "centre"))
+
+    def test_invalid_file(self):
+        self.assertFalse(self.migrate("dialogflow", b"not a zip"))
+        self.assertEqual(
+            RepositoryQueueTask.objects.get().status, RepositoryQueueTask.STATUS_FAILED
+        )
+
+
+class RepositoryDumpTestCase(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner@user.com", "user")
+        self.repository = Repository.objects.create(
+            owner=self.owner, name="Test", slug="test", language=languages.LANGUAGE_EN
+        )
+        self.version_language = self.repository.current_version()
+        version = self.version_language.repository_version
+
+        group = RepositoryEntityGroup.objects.create(
+            repository_version=version, value="person"
+        )
+        entity = RepositoryEntity.objects.create(
+            repository_version=version, value="name", group=group
+        )
+        example = RepositoryExample.objects.create(
+            repository_version_language=self.version_language,
+            text="hi mary",
+            intent=RepositoryIntent.objects.create(
+                text="greet", repository_version=version
+            ),
+        )
+        RepositoryExampleEntity.objects.create(
+            repository_example=example, start=3, end=7, entity=entity
+        )
+        translated = RepositoryTranslatedExample.objects.create(
+            original_example=example, language=languages.LANGUAGE_PT, text="oi mary"
+        )
+        RepositoryTranslatedExampleEntity.objects.create(
+            repository_translated_example=translated, start=3, end=7, entity=entity
+        )
+        evaluate = RepositoryEvaluate.objects.create(
+            repository_version_language=self.version_language,
+            text="hello john",
+            intent="greet",
+        )
+        RepositoryEvaluateEntity.objects.create(
+            repository_evaluate=evaluate, start=6, end=10, entity=entity
+        )
+        result = RepositoryEvaluateResult.objects.create(
+            repository_version_language=self.version_language,
+            intent_results=RepositoryEvaluateResultScore.objects.create(
+                precision=0.5, support=2
+            ),
+            entity_results=RepositoryEvaluateResultScore.objects.create(),
+            matrix_chart="https://bothub.it/matrix.png",
+            confidence_chart="https://bothub.it/confidence.png",
+        )
+        RepositoryEvaluateResultIntent.objects.create(
+            evaluate_result=result,
+            intent="greet",
+            score=RepositoryEvaluateResultScore.objects.create(f1_score=1),
+        )
+        result.set_log([{"text": "hello john", "intent": "greet", "status": "success"}])
+
+        self.target = Repository.objects.create(
+            owner=self.owner, name="Copy", slug="copy", language=languages.LANGUAGE_EN
+        )
+
+    def dump(self, **kwargs):
+        archive = io.BytesIO()
+        manifest = dump_repository(archive, self.repository, **kwargs)
+        archive.seek(0)
+        return archive, manifest
+
+    def test_dump(self):
+        archive, manifest = self.dump()
+        tables = {table["name"]: table["rows"] for table in manifest["tables"]}
+        self.assertEqual(tables["versions"], 1)
+        self.assertEqual(tables["version_languages"], 2)
+        self.assertEqual(tables["example_entities"], 1)
+        self.assertEqual(tables["evaluate_result_intents"], 1)
+
+        with zipfile.ZipFile(archive) as thezip:
+            self.assertEqual(
+                json.loads(thezip.read("manifest.json"))["tables"], manifest["tables"]
+            )
+            example = json.loads(thezip.read("examples.ndjson").decode().strip())
+        self.assertEqual(example["text"], "hi mary")
+
+    def test_restore(self):
+        archive, manifest = self.dump()
+        default_version = self.target.current_version().repository_version
+        counts = restore_repository(archive, self.target)
+        self.assertEqual(counts["examples"], 1)
+
+        version = self.target.versions.exclude(pk=default_version.pk).get()
+        self.assertFalse(version.is_default)
+
+        example = RepositoryExample.objects.get(
+            repository_version_language__repository_version=version
+        )
+        self.assertEqual(example.text, "hi mary")
+        self.assertEqual(example.intent.repository_version, version)
+        entity = example.entities.get()
+        self.assertEqual(entity.entity.repository_version, version)
+        self.assertEqual(entity.entity.group.value, "person")
+
+        translated = example.translations.get()
+        self.assertEqual(translated.text, "oi mary")
+        self.assertEqual(
+            translated.repository_version_language.repository_version, version
+        )
+        self.assertEqual(translated.entities.get().entity, entity.entity)
+
+        evaluate = RepositoryEvaluate.objects.get(
+            repository_version_language__repository_version=version
+        )
+        self.assertEqual(evaluate.entities.get().entity, entity.entity)
+
+        result = RepositoryEvaluateResult.objects.get(
+            repository_version_language__repository_version=version
+        )
+        self.assertEqual(result.version, 1)
+        self.assertEqual(float(result.intent_results.precision), 0.5)
+        self.assertEqual(result.evaluate_result_intent.get().score.f1_score, 1)
+        self.assertEqual(result.evaluate_result_log.get().text, "hello john")
+
+    def test_restore_then_evaluate(self):
+        RepositoryEvaluateResult.objects.create(
+            repository_version_language=self.target.current_version(),
+            intent_results=RepositoryEvaluateResultScore.objects.create(),
+            entity_results=RepositoryEvaluateResultScore.objects.create(),
+        )
+        archive, manifest = self.dump()
+        restore_repository(archive, self.target)
+
+        result = RepositoryEvaluateResult.objects.create(
+            repository_version_language=self.target.current_version(),
+            intent_results=RepositoryEvaluateResultScore.objects.create(),
+            entity_results=RepositoryEvaluateResultScore.objects.create(),
+        )
+        self.assertEqual(result.version, 3)
+        self.assertEqual(
+            sorted(
+                self.target.evaluations_results(version_default=False).values_list(
+                    "version", flat=True
+                )
+            ),
+            [1, 2, 3],
+        )
+
+    def test_restore_unknown_columns(self):
+        archive, manifest = self.dump()
+        victim = Repository.objects.create(
+            owner=User.objects.create_user("victim@user.com", "victim"),
+            name="Victim",
+            slug="victim",
+            language=languages.LANGUAGE_EN,
+        )
+        versions = RepositoryVersion.objects.count()
+        for table, column, value in [
+            ("versions", "repository_id", str(victim.uuid)),
+            ("versions", "created_by_id", victim.owner.pk),
+            ("examples", "repository_version_language_id", 1),
+        ]:
+            crafted = io.BytesIO()
+            with zipfile.ZipFile(archive) as source, zipfile.ZipFile(
+                crafted, "w"
+            ) as target:
+                for item in source.infolist():
+                    content = source.read(item.filename)
+                    if item.filename == "{}.ndjson".format(table):
+                        row = json.loads(content.decode().splitlines()[0])
+                        row[column] = value
+                        content = json.dumps(row).encode()
+                    target.writestr(item.filename, content)
+            crafted.seek(0)
+
+            with self.assertRaises(DumpFormatError):
+                restore_repository(crafted, self.target)
+
+        self.assertEqual(RepositoryVersion.objects.count(), versions)
+        self.assertFalse(victim.versions.exists())
+
+    def test_restore_invalid_archive(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as thezip:
+            thezip.writestr("manifest.json", json.dumps({"format": "other"}))
+        archive.seek(0)
+        with self.assertRaises(DumpFormatError):
+            restore_repository(archive, self.target)
@@ -50,6 +50,7 @@ env = environ.Env(
     BOTHUB_ENGINE_AWS_S3_BUCKET_NAME=(str, ""),
     BOTHUB_ENGINE_AWS_REGION_NAME=(str, "us-east-1"),
     BOTHUB_ENGINE_AWS_SEND=(bool, False),
+    BOTHUB_ENGINE_AWS_MULTIPART_CHUNK_SIZE=(int, 8 * 1024 * 1024),
     BASE_URL=(str, "http://api.bothub.it"),
     BOTHUB_BOT_EMAIL=(str, "bot_repository@bothub.it"),
     BOTHUB_BOT_NAME=(str, "Bot Repository"),
@@ -57,6 +58,11 @@ env = environ.Env(
     BOTHUB_ENGINE_USE_SENTRY=(bool, False),
     BOTHUB_ENGINE_SENTRY=(str, None),
     BOTHUB_NLP_RASA_VERSION=(str, "1.4.3"),
+    BOTHUB_NLP_LOG_COMPACT=(bool, True),
+    BOTHUB_USAGE_COUNTERS_REDIS=(bool, False),
+    BOTHUB_EVALUATIONS_CACHE=(bool, False),
+    BOTHUB_TRAIN_SCHEDULER_CONCURRENCY=(int, 10),
+    MEDIA_ROOT=(str, None),
     CELERY_BROKER_URL=(str, "redis://localhost:6379/0"),
     TOKEN_SEARCH_REPOSITORIES=(str, None),
     GOOGLE_API_TRANSLATION_KEY=(str, None),
@@ -207,6 +213,12 @@ STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 
+# Uploaded files, the import jobs keep the uploads here until they are processed,
+# it must be shared between the web and the celery workers
+
+MEDIA_ROOT = env.str("MEDIA_ROOT") or os.path.join(BASE_DIR, "media")
+
+
 # rest framework
 
 REST_FRAMEWORK = {
@@ -354,6 +366,7 @@ AWS_ACCESS_KEY_ID = env.str("BOTHUB_ENGINE_AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = env.str("BOTHUB_ENGINE_AWS_SECRET_ACCESS_KEY")
 AWS_BUCKET_NAME = env.str("BOTHUB_ENGINE_AWS_S3_BUCKET_NAME")
 AWS_REGION_NAME = env.str("BOTHUB_ENGINE_AWS_REGION_NAME")
+AWS_MULTIPART_CHUNK_SIZE = env.int("BOTHUB_ENGINE_AWS_MULTIPART_CHUNK_SIZE")
 
 
 # Account System for bots deleted
@@ -381,6 +394,26 @@ if BOTHUB_ENGINE_USE_SENTRY:
 BOTHUB_NLP_RASA_VERSION = env.str("BOTHUB_NLP_RASA_VERSION")
 
 
+# NLP Logs
+
+BOTHUB_NLP_LOG_COMPACT = env.bool("BOTHUB_NLP_LOG_COMPACT")
+
+
+# Usage Reports
+
+BOTHUB_USAGE_COUNTERS_REDIS = env.bool("BOTHUB_USAGE_COUNTERS_REDIS")
+
+
+# Evaluations Dataset
+
+BOTHUB_EVALUATIONS_CACHE = env.bool("BOTHUB_EVALUATIONS_CACHE")
+
+
+# Train Scheduler
+
+BOTHUB_TRAIN_SCHEDULER_CONCURRENCY = env.int("BOTHUB_TRAIN_SCHEDULER_CONCURRENCY")
+
+
 # Celery
 
 CELERY_RESULT_BACKEND = "django-db"
@@ -398,7 +431,11 @@ TOKEN_SEARCH_REPOSITORIES = env.str("TOKEN_SEARCH_REPOSITORIES")
 GOOGLE_API_TRANSLATION_KEY = env.str("GOOGLE_API_TRANSLATION_KEY")
 
 
-BASE_MIGRATIONS_TYPES = ["bothub.common.migrate_classifiers.wit.WitType"]
+BASE_MIGRATIONS_TYPES = [
+    "bothub.common.migrate_classifiers.wit.WitType",
+    "bothub.common.migrate_classifiers.dialogflow.DialogflowType",
+    "bothub.common.migrate_classifiers.rasa_markdown.RasaMarkdownType",
+]
 
 
 # Suggestion Languages
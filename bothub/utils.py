@@ -1,3 +1,5 @@
+import base64
+import hashlib
 import io
 import math
 import random
@@ -9,6 +11,7 @@ import matplotlib.pyplot as plt
 import numpy as np
 import requests
 from collections import OrderedDict
+from functools import lru_cache
 from botocore.exceptions import ClientError
 from django.conf import settings
 from django.db.models import IntegerField, Subquery
@@ -30,27 +33,44 @@ def cast_empty_str_to_none(value):
     return value or None
 
 
-def send_bot_data_file_aws(id, bot_data):
-    confmat_url = ""
-
-    if all(
+def aws_credentials_configured():
+    return all(
         [
             settings.AWS_ACCESS_KEY_ID,
             settings.AWS_SECRET_ACCESS_KEY,
             settings.AWS_BUCKET_NAME,
         ]
-    ):
-        confmat_filename = f"repository_{str(id)}/bot_data_{uuid.uuid4()}.tar.gz"
+    )
+
+
+@lru_cache(maxsize=None)
+def get_s3_client():
+    """
+    boto3 clients are thread safe and expensive to build, so a single client
+    is shared by every upload of the process
+    """
+    return boto3.client(
+        "s3",
+        endpoint_url=settings.AWS_ACCESS_ENDPOINT_URL,
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=settings.AWS_REGION_NAME,
+    )
+
+
+def bot_data_file_name(id):
+    return f"repository_{str(id)}/bot_data_{uuid.uuid4()}.tar.gz"
+
+
+def send_bot_data_file_aws(id, bot_data):
+    confmat_url = ""
+
+    if aws_credentials_configured():
+        confmat_filename = bot_data_file_name(id)
 
         botdata = io.BytesIO(bot_data)
 
-        s3_client = boto3.client(
-            "s3",
-            endpoint_url=settings.AWS_ACCESS_ENDPOINT_URL,
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_REGION_NAME,
-        )
+        s3_client = get_s3_client()
         try:
             s3_client.upload_fileobj(
                 botdata,
@@ -67,6 +87,107 @@ def send_bot_data_file_aws(id, bot_data):
     return confmat_url
 
 
+def read_stream_chunks(stream, chunk_size):
+    """
+    Reads a file-like object in chunks of exactly chunk_size bytes (the last
+    one may be smaller), streams from sockets can return less than requested
+    """
+    buffer = bytearray()
+    while True:
+        data = stream.read(chunk_size - len(buffer))
+        if not data:
+            break
+        buffer.extend(data)
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer = bytearray()
+    if buffer:
+        yield bytes(buffer)
+
+
+def validate_checksum(checksum, expected_checksum):
+    if expected_checksum and checksum.hexdigest() != expected_checksum.lower():
+        raise ValidationError(
+            {"checksum": [_("The checksum of the uploaded bot data does not match.")]}
+        )
+
+
+def send_bot_data_stream_aws(id, stream, expected_checksum=None):
+    """
+    Uploads the trained model read from a file-like object to the bucket with
+    a multipart upload, only one part is held in memory at a time and the
+    content is hashed (sha256) while it is sent.
+    Returns the url of the file and the hexdigest of the content.
+    """
+    s3_client = get_s3_client()
+    confmat_filename = bot_data_file_name(id)
+    checksum = hashlib.sha256()
+
+    multipart = s3_client.create_multipart_upload(
+        Bucket=settings.AWS_BUCKET_NAME,
+        Key=confmat_filename,
+        ContentType="application/gzip",
+    )
+    upload_id = multipart.get("UploadId")
+
+    try:
+        parts = []
+        chunks = read_stream_chunks(stream, settings.AWS_MULTIPART_CHUNK_SIZE)
+        for part_number, chunk in enumerate(chunks, start=1):
+            checksum.update(chunk)
+            part = s3_client.upload_part(
+                Bucket=settings.AWS_BUCKET_NAME,
+                Key=confmat_filename,
+                PartNumber=part_number,
+                UploadId=upload_id,
+                Body=chunk,
+            )
+            parts.append({"ETag": part.get("ETag"), "PartNumber": part_number})
+
+        if not parts:
+            raise ValidationError({"bot_data": [_("The bot data is empty.")]})
+
+        validate_checksum(checksum, expected_checksum)
+
+        s3_client.complete_multipart_upload(
+            Bucket=settings.AWS_BUCKET_NAME,
+            Key=confmat_filename,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+    except Exception:
+        s3_client.abort_multipart_upload(
+            Bucket=settings.AWS_BUCKET_NAME, Key=confmat_filename, UploadId=upload_id
+        )
+        raise
+
+    confmat_url = "{}/{}/{}".format(
+        s3_client.meta.endpoint_url, settings.AWS_BUCKET_NAME, confmat_filename
+    )
+    return confmat_url, checksum.hexdigest()
+
+
+def encode_bot_data_stream(stream, expected_checksum=None):
+    """
+    Fallback of send_bot_data_stream_aws when the object storage is not
+    configured, the model is stored base64 encoded as the NLP service sends it.
+    Chunks are multiple of 3 bytes so they can be encoded separately.
+    """
+    checksum = hashlib.sha256()
+    encoded = []
+    chunk_size = settings.AWS_MULTIPART_CHUNK_SIZE // 3 * 3
+    for chunk in read_stream_chunks(stream, chunk_size):
+        checksum.update(chunk)
+        encoded.append(base64.b64encode(chunk).decode())
+
+    if not encoded:
+        raise ValidationError({"bot_data": [_("The bot data is empty.")]})
+
+    validate_checksum(checksum, expected_checksum)
+
+    return "".join(encoded), checksum.hexdigest()
+
+
 def unique_slug_generator(validated_data, Repository, new_slug=None):
     """
     This is for a Django project and it assumes your instance